@@ -0,0 +1,733 @@
+# ======================================================
+# ALMACENAMIENTO – dónde viven los eventos y la config
+# ------------------------------------------------------
+# * HojaGoogle: Google Sheets (con snapshot local + delta, ver cache_local)
+# * SQLiteLocal: base local con índices y consultas por rango de fechas;
+#   sirve para volúmenes grandes y para trabajar sin credenciales
+# ======================================================
+
+import os, time, uuid, random, sqlite3, datetime, threading, functools
+from contextlib import contextmanager
+import gspread
+import pandas as pd
+from gspread.utils import rowcol_to_a1
+import cache_local, metricas, recurrencia
+from nucleo import COLUMNS, norm, conteos_de_filas, parse_fechas
+
+DATA_SHEET   = "Data"
+CONFIG_SHEET = "Config"
+CONFIG_INICIAL = [["Instagram", "5", "IG"], ["Facebook", "5", "FB"],
+                  ["TikTok", "3", ""],     ["Blog", "1", ""]]
+
+
+def nuevo_id() -> str:
+    # Prefijo alfabético: evita que gspread "numericise" IDs como 12e45…
+    return "ev" + uuid.uuid4().hex[:12]
+
+def _iso(v) -> str:
+    """Fecha en ISO YYYY-MM-DD; texto tal cual; vacío si no hay fecha."""
+    if isinstance(v, (datetime.date, datetime.datetime)) or hasattr(v, "strftime"):
+        try:
+            return v.strftime("%Y-%m-%d")
+        except ValueError:      # NaT
+            return ""
+    return "" if v is None else str(v)
+
+def _fila(ev, head) -> list:
+    """Serializa un evento en el orden de columnas `head` (Fecha en ISO)."""
+    fila = []
+    for c in head:
+        v = ev.get(c, "")
+        if c == "Fecha":
+            v = _iso(v)
+        fila.append("" if v is None or v != v else v)   # v != v → NaN
+    return fila
+
+def _ahora() -> str:
+    """Sello de edición: ISO UTC con milisegundos."""
+    return datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="milliseconds")
+
+def _texto(c, v) -> str:
+    """Valor tal como queda en el almacén (para comparar df ↔ hoja)."""
+    return str(_fila({c: v}, [c])[0])
+
+def _igual(c, a, b) -> bool:
+    """¿`a` y `b` guardan lo mismo en la columna `c`? Fecha se compara ya
+    parseada: "05/03/2026" en la hoja y 2026-03-05 desde el df son iguales."""
+    ta, tb = _texto(c, a), _texto(c, b)
+    if ta == tb or c != "Fecha":
+        return ta == tb
+    fa, fb = parse_fechas(pd.Series([ta, tb]))[0]
+    return not pd.isna(fa) and fa == fb
+
+def como_texto(fila) -> dict:
+    """Columnas presentes de `fila` (dict o Series) tal como quedan en el
+    almacén; serializable a JSON."""
+    return {c: _texto(c, fila.get(c, "")) for c in COLUMNS if c in fila}
+
+def editados(anterior, nuevo: dict) -> dict:
+    """Columnas editables de `nuevo` que difieren de `anterior`."""
+    return {c: v for c, v in nuevo.items()
+            if c in COLUMNS and c not in ("ID", "Rev", "Actualizado")
+            and not _igual(c, v, anterior.get(c, ""))}
+
+def _misma_version(anterior, actual) -> bool:
+    return all(_texto(c, anterior.get(c, "")) == _texto(c, actual.get(c, ""))
+               for c in ("Rev", "Actualizado"))
+
+
+class Conflicto(Exception):
+    """Otra sesión cambió (o borró) la fila después de que se leyó.
+    `actual` es la fila guardada (dict, None si se borró) y `campos` las
+    columnas que ambas sesiones cambiaron con valores distintos."""
+
+    def __init__(self, eid, actual, campos):
+        super().__init__(f"El evento {eid} fue modificado por otra sesión"
+                         + (f" ({', '.join(campos)})" if campos else ""))
+        self.eid, self.actual, self.campos = eid, actual, list(campos)
+
+def _fusion(anterior, actual, mios: dict) -> dict:
+    """Cambios a escribir sobre la fila guardada `actual` para aplicar `mios`
+    (editados respecto a `anterior`). Si otra sesión cambió la fila en otros
+    campos se conservan sus cambios; si tocó los mismos con otro valor → Conflicto."""
+    if actual is None:
+        raise Conflicto(anterior["ID"], None, [])
+    if not _misma_version(anterior, actual):
+        ajenos = {c for c in COLUMNS if not _igual(c, actual.get(c, ""), anterior.get(c, ""))}
+        choques = [c for c in mios if c in ajenos and not _igual(c, mios[c], actual.get(c, ""))]
+        if choques:
+            raise Conflicto(anterior["ID"], actual, choques)
+        mios = {c: v for c, v in mios.items() if not _igual(c, v, actual.get(c, ""))}
+    if not mios:
+        return {}
+    # Rev marca la fila como cambiada para la sincronización por delta
+    return {**mios, "Rev": int(actual.get("Rev") or 0) + 1, "Actualizado": _ahora()}
+
+
+class Almacen:
+    """Interfaz común. `clave` identifica el almacén en las cachés de la app;
+    `filtra_fechas` indica si eventos(desde, hasta) filtra en el origen."""
+    clave = ""
+    filtra_fechas = False
+
+    def eventos(self, desde=None, hasta=None):
+        """(encabezado, filas) con filas como listas de strings."""
+        raise NotImplementedError
+    def anios(self):
+        """Años con eventos, o None si el almacén no lo sabe sin leer todo."""
+        return None
+    def buscar(self, desde, hasta, plataformas=(), estados=(), texto="", offset=0, limite=50):
+        """Una página de eventos filtrada en el origen: (total, encabezado, filas),
+        o None si el almacén no sabe filtrar (la app filtra en memoria).
+        `plataformas`, `estados` y `texto` llegan normalizados con nucleo.norm."""
+        return None
+    def conteos(self, desde, hasta) -> tuple:
+        """Resumen sin cargar la tabla en la app: ([(plataforma, estado, n)] de
+        los eventos del rango que no son series, (encabezado, filas con Repetir))."""
+        head, rows = self.eventos(desde, hasta)
+        conteos, series = conteos_de_filas(head, rows, desde, hasta)
+        return conteos, (head, series)
+    def config_rows(self) -> list:
+        """Filas [Red, Requerido, Alias] (sin encabezado)."""
+        raise NotImplementedError
+    def agregar(self, ev: dict) -> str:
+        raise NotImplementedError
+    def actualizar(self, anterior, nuevo: dict):
+        """Escribe los campos de `nuevo` que difieren de `anterior` (la fila
+        como se leyó). Lanza Conflicto si otra sesión la cambió en los mismos
+        campos o la borró."""
+        raise NotImplementedError
+    def eliminar(self, eid, anterior=None):
+        """Con `anterior`, el borrado se rechaza (Conflicto) si la fila cambió."""
+        raise NotImplementedError
+    def aplicar_lote(self, altas: list, cambios: list, bajas: list) -> dict:
+        """Aplica `altas` [ev], `cambios` [(anterior, nuevo)] y `bajas`
+        [(eid, anterior o None)]; una entrada por evento. Las altas cuyo ID
+        ya existe se ignoran (reintento tras una caída). Devuelve
+        {eid: Conflicto} de lo que no se aplicó.
+        No es atómico: esta versión genérica escribe evento por evento y una
+        falla a mitad de camino deja aplicado lo anterior. SQLiteLocal lo
+        hace en una sola transacción; HojaGoogle agrupa los pedidos pero
+        Sheets no tiene transacciones."""
+        choques = {}
+        for ev in altas:
+            self.agregar(ev)
+        for anterior, nuevo in cambios:
+            try:
+                self.actualizar(anterior, nuevo)
+            except Conflicto as e:
+                choques[anterior["ID"]] = e
+        for eid, anterior in bajas:
+            try:
+                self.eliminar(eid, anterior)
+            except Conflicto as e:
+                choques[eid] = e
+        return choques
+    def reescribir(self, filas: list):
+        """Compactar: reemplaza todos los eventos por `filas` (orden COLUMNS)."""
+        raise NotImplementedError
+    def guardar_config(self, cfg: dict, alias: dict):
+        raise NotImplementedError
+    def invalidar(self):
+        """Descarta copias locales (si las hay) para releer todo del origen."""
+
+
+# ---------- GOOGLE SHEETS ----------
+SCOPES = ["https://www.googleapis.com/auth/spreadsheets",
+          "https://www.googleapis.com/auth/drive"]
+
+# Límite de pedidos por minuto (todo el proceso) y reintentos ante 429 / 5xx
+PEDIDOS_POR_MINUTO = int(os.environ.get("SHEETS_PEDIDOS_MIN", "240"))
+REINTENTOS         = int(os.environ.get("SHEETS_REINTENTOS", "5"))
+
+class _Limitador:
+    """Token bucket: ráfagas de hasta `por_minuto` pedidos y luego tasa
+    constante. 0 desactiva el límite."""
+    def __init__(self, por_minuto: int):
+        self.tasa   = por_minuto / 60.0
+        self.cap    = max(1.0, float(por_minuto))
+        self.fichas = self.cap
+        self.t      = time.monotonic()
+        self.lock   = threading.Lock()
+
+    def esperar(self):
+        if self.tasa <= 0:
+            return
+        with self.lock:
+            ahora = time.monotonic()
+            self.fichas = min(self.cap, self.fichas + (ahora - self.t) * self.tasa)
+            self.t = ahora
+            self.fichas -= 1          # negativo = turno reservado a futuro
+            espera = -self.fichas / self.tasa if self.fichas < 0 else 0
+        if espera:
+            time.sleep(espera)
+
+LIMITADOR = _Limitador(PEDIDOS_POR_MINUTO)
+
+# Pedidos de batchUpdate (de planilla) que dan lo mismo aplicados dos veces:
+# escriben sobre rangos explícitos. deleteDimension, appendCells, addSheet…
+# no: un reintento tras un 5xx que sí llegó borraría o agregaría de más.
+_IDEMPOTENTES = {"updateCells", "repeatCell", "updateBorders", "updateSheetProperties",
+                 "updateDimensionProperties", "updateSpreadsheetProperties"}
+
+def _idempotente(method, endpoint, json=None) -> bool:
+    method = method.lower()
+    if method in ("get", "put"):
+        return True
+    if method != "post":
+        return False
+    if endpoint.endswith(("values:batchUpdate", ":clear", "values:batchClear", "values:batchGet")):
+        return True
+    if endpoint.endswith(":batchUpdate"):
+        return all(set(r) <= _IDEMPOTENTES for r in (json or {}).get("requests", []))
+    return False                                  # values:append, create, copy…
+
+def _reintentable(err) -> bool:
+    code = err.response.status_code
+    return code == 429 or code >= 500
+
+def _espera(intento: int):
+    metricas.contar("api.reintentos")
+    time.sleep(min(2 ** intento + random.random(), 64))
+
+class ClienteHTTP(gspread.http_client.HTTPClient):
+    """HTTP de gspread con límite de tasa y reintentos con backoff exponencial
+    (más jitter) para 429 y errores 5xx. Sólo se reintentan los pedidos
+    idempotentes; las altas (values:append) las reintenta _anexar."""
+    def request(self, method, endpoint, *args, **kwargs):
+        reintentar = _idempotente(method, endpoint, kwargs.get("json"))
+        for intento in range(REINTENTOS + 1):
+            LIMITADOR.esperar()
+            metricas.contar("api.llamadas")
+            try:
+                return super().request(method, endpoint, *args, **kwargs)
+            except gspread.exceptions.APIError as err:
+                if not reintentar or intento == REINTENTOS or not _reintentable(err):
+                    raise
+                _espera(intento)
+
+def conectar_google(info: dict):
+    """Cliente gspread para una cuenta de servicio. google-auth renueva el
+    token por su cuenta al vencer; no hace falta volver a autorizar."""
+    return gspread.service_account_from_dict(info, scopes=SCOPES, http_client=ClienteHTTP)
+
+def _ws_datos(sh):
+    try:
+        return sh.worksheet(DATA_SHEET)
+    except gspread.exceptions.WorksheetNotFound:
+        ws = sh.add_worksheet(title=DATA_SHEET, rows="1000", cols="20")
+        ws.append_row(COLUMNS)
+        return ws
+
+def _ws_config(sh):
+    try:
+        return sh.worksheet(CONFIG_SHEET)
+    except gspread.exceptions.WorksheetNotFound:
+        ws = sh.add_worksheet(title=CONFIG_SHEET, rows="10", cols="5")
+        ws.update(range_name="A1", values=[["Red", "Requerido", "Alias"]] + CONFIG_INICIAL)
+        return ws
+
+def _encabezado(ws, head=None) -> list:
+    """Devuelve la fila 1 y agrega al final las columnas de COLUMNS que falten."""
+    head = list(ws.row_values(1) if head is None else head)
+    faltan = [c for c in COLUMNS if c not in head]
+    if faltan:
+        ws.update(range_name=rowcol_to_a1(1, len(head) + 1), values=[faltan])
+        head += faltan
+    return head
+
+def _col(c: int) -> str:
+    return rowcol_to_a1(1, c)[:-1]
+
+def _tramos(pos: list) -> list:
+    """[3,4,5,9] → [(3,5),(9,9)]: filas contiguas se piden en un solo rango."""
+    out = []
+    for p in pos:
+        if out and p == out[-1][1] + 1:
+            out[-1] = (out[-1][0], p)
+        else:
+            out.append((p, p))
+    return out
+
+def _descarga_completa(ws):
+    """Hoja entera; completa el encabezado y persiste IDs faltantes o repetidos
+    (filas antiguas o cargadas a mano)."""
+    vals = ws.get_all_values()
+    head = _encabezado(ws, vals[0] if vals else [])
+    rows = [list(r) + [""] * (len(head) - len(r)) for r in vals[1:]]
+    metricas.contar("filas.leidas", len(rows))
+    ci, vistos, nuevos = head.index("ID"), set(), False
+    for r in rows:
+        r[ci] = str(r[ci]).strip()
+        if not r[ci] or r[ci] in vistos:
+            r[ci], nuevos = nuevo_id(), True
+        vistos.add(r[ci])
+    if nuevos:
+        ws.update(range_name=f"{rowcol_to_a1(2, ci + 1)}:{rowcol_to_a1(len(rows) + 1, ci + 1)}",
+                  values=[[r[ci]] for r in rows])
+    return head, rows
+
+def _delta(ws, snap):
+    """Compara el manifiesto ID/Rev de la hoja con el snapshot y baja sólo las
+    filas nuevas o modificadas. None si no es seguro (hay que bajar todo)."""
+    head = snap.encabezado
+    ci, cr = head.index("ID") + 1, head.index("Rev") + 1
+    hdr, ids, revs = ws.batch_get(["1:1", f"{_col(ci)}2:{_col(ci)}", f"{_col(cr)}2:{_col(cr)}"])
+    if (hdr[0] if hdr else []) != head:
+        return None
+    ids  = [str(r[0]).strip() if r else "" for r in ids]
+    revs = [str(r[0]) if r else "" for r in revs] + [""] * len(ids)
+    if "" in ids or len(set(ids)) != len(ids):
+        return None
+    cambiadas = [i for i, eid in enumerate(ids)
+                 if eid not in snap.filas or snap.revs.get(eid) != revs[i]]
+    nuevas = {}
+    if cambiadas:
+        rangos = _tramos(cambiadas)
+        res = ws.batch_get([f"A{a + 2}:{_col(len(head))}{b + 2}" for a, b in rangos])
+        for vr in res:
+            for r in vr:
+                r = list(r) + [""] * (len(head) - len(r))
+                nuevas[r[ci - 1]] = r
+        metricas.contar("filas.leidas", len(nuevas))
+    rows = [nuevas.get(eid) or snap.filas.get(eid) for eid in ids]
+    if any(r is None for r in rows):
+        return None
+    return rows, nuevas, set(snap.filas) - set(ids)
+
+def _caduca(metodo):
+    """Tras escribir en la hoja el snapshot local ya no coincide con ella
+    (aunque get_lastUpdateTime tarde en moverse): se caduca su revisión para
+    que la próxima lectura corra el delta. También si la escritura falló a
+    medias."""
+    @functools.wraps(metodo)
+    def envuelto(self, *a, **kw):
+        try:
+            return metodo(self, *a, **kw)
+        finally:
+            cache_local.caducar(f"{self.shid}/{DATA_SHEET}")
+    return envuelto
+
+def _anexar(ws, head, filas):
+    """append_rows con reintentos. Un 5xx no dice si las filas llegaron: antes
+    de reintentar se relee la columna ID y se reenvían sólo las que faltan."""
+    ci = head.index("ID")
+    for intento in range(REINTENTOS + 1):
+        try:
+            ws.append_rows(filas)
+            return
+        except gspread.exceptions.APIError as err:
+            if intento == REINTENTOS or not _reintentable(err):
+                raise
+            _espera(intento)
+            ids = ws.batch_get([f"{_col(ci + 1)}2:{_col(ci + 1)}"])[0]
+            hay = {str(r[0]).strip() for r in ids if r}
+            filas = [f for f in filas if f[ci] not in hay]
+            if not filas:
+                return
+
+def _fila_de_id(ws, head, eid) -> int:
+    """Nº de fila del evento leyendo sólo la columna ID (ws.find baja la hoja entera)."""
+    ci  = head.index("ID") + 1
+    ids = ws.batch_get([f"{_col(ci)}2:{_col(ci)}"])[0]
+    for i, r in enumerate(ids):
+        if r and str(r[0]).strip() == str(eid):
+            return i + 2
+    raise KeyError(f"Evento {eid} no encontrado en la hoja")
+
+
+class HojaGoogle(Almacen):
+    """Planilla de Google. Cada alta / edición / baja toca sólo su fila.
+    Los handles de planilla y hojas se abren una vez y se reutilizan."""
+
+    def __init__(self, cli, shid):
+        self.cli, self.shid = cli, shid
+        self.clave = f"gsheets:{shid}"
+        self._handles = {}
+
+    def _sh(self):
+        if "sh" not in self._handles:
+            self._handles["sh"] = self.cli.open_by_key(self.shid)
+        return self._handles["sh"]
+
+    def _ws(self, nombre):
+        if nombre not in self._handles:
+            abrir = _ws_datos if nombre == DATA_SHEET else _ws_config
+            self._handles[nombre] = abrir(self._sh())
+        return self._handles[nombre]
+
+    def eventos(self, desde=None, hasta=None):
+        """Filas de Data desde el snapshot local. Si la planilla cambió se
+        sincroniza por delta; cada RESYNC_COMPLETO segundos se baja entera.
+        Las fechas de la hoja no están normalizadas: el rango se ignora y la
+        app filtra después de parsear."""
+        sh   = self._sh()
+        ws   = self._ws(DATA_SHEET)
+        hoja = f"{self.shid}/{DATA_SHEET}"
+        snap = cache_local.leer(hoja)
+        try:
+            revision = sh.get_lastUpdateTime()
+        except Exception:
+            revision = ""
+        if snap and revision and snap.revision == revision:
+            return snap.encabezado, list(snap.filas.values())
+
+        delta = None
+        if snap and time.time() - snap.completo < cache_local.RESYNC_COMPLETO:
+            delta = _delta(ws, snap)
+        if delta is None:
+            head, rows = _descarga_completa(ws)
+            ci, cr = head.index("ID"), head.index("Rev")
+            cache_local.reemplazar(hoja, head, {r[ci]: r for r in rows},
+                                   {r[ci]: r[cr] for r in rows}, revision)
+            return head, rows
+        rows, nuevas, borrados = delta
+        cr = snap.encabezado.index("Rev")
+        cache_local.aplicar(hoja, nuevas, {k: r[cr] for k, r in nuevas.items()}, borrados, revision)
+        return snap.encabezado, rows
+
+    def invalidar(self):
+        cache_local.invalidar(f"{self.shid}/{DATA_SHEET}")
+        self._handles.clear()
+
+    def config_rows(self):
+        return self._ws(CONFIG_SHEET).get_all_values()[1:]
+
+    def _actual(self, ws, head, eid):
+        """(nº de fila, fila guardada como dict) o (None, None) si no existe."""
+        try:
+            fila = _fila_de_id(ws, head, eid)
+        except KeyError:
+            return None, None
+        return fila, dict(zip(head, ws.row_values(fila)))
+
+    @_caduca
+    def agregar(self, ev):
+        ws = self._ws(DATA_SHEET)
+        ev = {**ev, "ID": ev.get("ID") or nuevo_id(), "Rev": 1, "Actualizado": _ahora()}
+        head = _encabezado(ws)
+        _anexar(ws, head, [_fila(ev, head)])
+        metricas.contar("filas.escritas")
+        return ev["ID"]
+
+    @_caduca
+    def actualizar(self, anterior, nuevo):
+        """Escribe sólo las celdas que cambiaron respecto a `anterior`, tras
+        comparar su versión con la fila guardada (Sheets no tiene
+        transacciones: la ventana entre lectura y escritura es de una llamada)."""
+        mios = editados(anterior, nuevo)
+        if not mios:
+            return
+        ws   = self._ws(DATA_SHEET)
+        head = _encabezado(ws)
+        fila, actual = self._actual(ws, head, anterior["ID"])
+        cambios = _fusion(anterior, actual, mios)
+        if not cambios:
+            return
+        ws.batch_update([{"range": rowcol_to_a1(fila, head.index(c) + 1), "values": [[v]]}
+                         for c, v in zip(cambios, _fila(cambios, list(cambios)))])
+        metricas.contar("filas.escritas")
+
+    @_caduca
+    def eliminar(self, eid, anterior=None):
+        ws = self._ws(DATA_SHEET)
+        head = _encabezado(ws)
+        if anterior is None:
+            ws.delete_rows(_fila_de_id(ws, head, eid))
+            return
+        fila, actual = self._actual(ws, head, eid)
+        if actual is None:
+            return                                  # ya estaba borrada
+        if not _misma_version(anterior, actual):
+            raise Conflicto(eid, actual, [])
+        ws.delete_rows(fila)
+
+    @_caduca
+    def aplicar_lote(self, altas, cambios, bajas):
+        """Con la columna ID y las filas afectadas en dos lecturas, todas las
+        ediciones van en un batch_update, las bajas en un solo pedido
+        (deleteDimension, de abajo hacia arriba) y las altas en un append_rows."""
+        ws   = self._ws(DATA_SHEET)
+        head = _encabezado(ws)
+        ci   = head.index("ID") + 1
+        ids  = ws.batch_get([f"{_col(ci)}2:{_col(ci)}"])[0]
+        pos  = {str(r[0]).strip(): i + 2 for i, r in enumerate(ids) if r}
+        leer = sorted({pos[e] for e in [a["ID"] for a, _ in cambios] + [e for e, _ in bajas] if e in pos})
+        guardadas = {}
+        if leer:
+            res = ws.batch_get([f"A{p}:{_col(len(head))}{p}" for p in leer])
+            guardadas = {p: dict(zip(head, vr[0] if vr else [])) for p, vr in zip(leer, res)}
+        choques, celdas, borrar, editadas = {}, [], [], 0
+        for anterior, nuevo in cambios:
+            p = pos.get(anterior["ID"])
+            try:
+                cambios_fila = _fusion(anterior, guardadas.get(p), editados(anterior, nuevo))
+            except Conflicto as e:
+                choques[anterior["ID"]] = e
+                continue
+            celdas += [{"range": rowcol_to_a1(p, head.index(c) + 1), "values": [[v]]}
+                       for c, v in zip(cambios_fila, _fila(cambios_fila, list(cambios_fila)))]
+            editadas += bool(cambios_fila)
+        for eid, anterior in bajas:
+            p = pos.get(eid)
+            if p is None:
+                continue                                # ya estaba borrada
+            if anterior is not None and not _misma_version(anterior, guardadas[p]):
+                choques[eid] = Conflicto(eid, guardadas[p], [])
+                continue
+            borrar.append(p)
+        if celdas:
+            ws.batch_update(celdas)
+        if borrar:
+            ws.spreadsheet.batch_update({"requests": [
+                {"deleteDimension": {"range": {"sheetId": ws.id, "dimension": "ROWS",
+                                               "startIndex": p - 1, "endIndex": p}}}
+                for p in sorted(borrar, reverse=True)]})
+        nuevas = [{**ev, "Rev": 1, "Actualizado": _ahora()} for ev in altas if ev["ID"] not in pos]
+        if nuevas:
+            _anexar(ws, head, [_fila(ev, head) for ev in nuevas])
+        metricas.contar("filas.escritas", editadas + len(nuevas))
+        return choques
+
+    def reescribir(self, filas):
+        ws = self._ws(DATA_SHEET)
+        try:
+            ws.clear()
+            ws.update(range_name="A1", values=[COLUMNS] + filas)
+        finally:
+            cache_local.invalidar(f"{self.shid}/{DATA_SHEET}")
+        metricas.contar("filas.escritas", len(filas))
+
+    def guardar_config(self, cfg, alias):
+        ws = self._ws(CONFIG_SHEET)
+        ws.clear()
+        ws.update(range_name="A1", values=[["Red", "Requerido", "Alias"]] +
+                  [[k, str(v), alias.get(k, "")] for k, v in cfg.items()])
+
+
+# ---------- SQLITE ----------
+class SQLiteLocal(Almacen):
+    """Eventos en SQLite con Fecha ISO e índices sobre Fecha, (Plataforma, Fecha)
+    y (Estado, Fecha): año / mes / día y los filtros de Editar se resuelven con
+    un rango sobre un índice."""
+    filtra_fechas = True
+
+    def __init__(self, ruta):
+        self.ruta  = os.path.abspath(ruta)
+        self.clave = f"sqlite:{self.ruta}"
+        with self._con() as con:
+            con.executescript(f"""
+                CREATE TABLE IF NOT EXISTS eventos(
+                    {", ".join(f"{c} TEXT" if c != "ID" else "ID TEXT PRIMARY KEY" for c in COLUMNS)});
+                CREATE INDEX IF NOT EXISTS ix_eventos_fecha      ON eventos(Fecha);
+                DROP INDEX IF EXISTS ix_eventos_plataforma;
+                DROP INDEX IF EXISTS ix_eventos_estado;
+                CREATE INDEX IF NOT EXISTS ix_eventos_plataforma_fecha ON eventos(Plataforma, Fecha);
+                CREATE INDEX IF NOT EXISTS ix_eventos_estado_fecha     ON eventos(Estado, Fecha);
+                CREATE TABLE IF NOT EXISTS config(Red TEXT PRIMARY KEY, Requerido TEXT, Alias TEXT);
+            """)
+            # Bases creadas con versiones anteriores de COLUMNS
+            tiene = {r[1] for r in con.execute("PRAGMA table_info(eventos)")}
+            for c in COLUMNS:
+                if c not in tiene:
+                    con.execute(f"ALTER TABLE eventos ADD COLUMN {c} TEXT")
+            con.execute("CREATE INDEX IF NOT EXISTS ix_eventos_repetir ON eventos(Repetir)")
+            if con.execute("SELECT COUNT(*) FROM config").fetchone()[0] == 0:
+                con.executemany("INSERT INTO config VALUES (?,?,?)", CONFIG_INICIAL)
+
+    @contextmanager
+    def _con(self):
+        os.makedirs(os.path.dirname(self.ruta), exist_ok=True)
+        con = sqlite3.connect(self.ruta, timeout=30)
+        try:
+            con.execute("PRAGMA journal_mode=WAL")
+            with con:
+                yield con
+        finally:
+            con.close()
+
+    def eventos(self, desde=None, hasta=None):
+        """Con rango, además de las filas del rango vienen todas las de Repetir
+        (series y reemplazos): sus ocurrencias pueden caer en cualquier fecha."""
+        sql, args = f"SELECT {', '.join(COLUMNS)} FROM eventos", []
+        if desde is not None and hasta is not None:
+            sql += " WHERE (Fecha >= ? AND Fecha < ?) OR Repetir > ''"
+            args = [_iso(desde), _iso(hasta)]
+        with self._con() as con:
+            rows = [["" if v is None else v for v in r] for r in con.execute(sql, args)]
+        metricas.contar("filas.leidas", len(rows))
+        return list(COLUMNS), rows
+
+    def buscar(self, desde, hasta, plataformas=(), estados=(), texto="", offset=0, limite=50):
+        """Rango sobre el índice de Fecha + filtros; COUNT y LIMIT/OFFSET en la
+        base: sólo viaja la página pedida."""
+        donde, args = ["Fecha >= ?", "Fecha < ?"], [_iso(desde), _iso(hasta)]
+        with self._con() as con:
+            # Plataforma / Estado: los valores guardados cuya forma normalizada
+            # coincide (DISTINCT sale del índice) → IN sobre la columna indexada
+            for col, valores in (("Plataforma", plataformas), ("Estado", estados)):
+                if valores:
+                    crudos = [v for (v,) in con.execute(f"SELECT DISTINCT {col} FROM eventos")
+                              if norm(v) in set(valores)]
+                    if not crudos:
+                        return 0, list(COLUMNS), []
+                    donde.append(f"{col} IN ({', '.join('?' * len(crudos))})")
+                    args += crudos
+            if texto:                       # subcadena: no hay índice que sirva
+                con.create_function("norm", 1, norm, deterministic=True)
+                donde.append("instr(norm(Titulo), ?) > 0")
+                args.append(texto)
+            where = " AND ".join(donde)
+            total = con.execute(f"SELECT COUNT(*) FROM eventos WHERE {where}", args).fetchone()[0]
+            rows  = [["" if v is None else v for v in r] for r in con.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM eventos WHERE {where} "
+                "ORDER BY Fecha, ID LIMIT ? OFFSET ?", args + [int(limite), int(offset)])]
+        metricas.contar("filas.leidas", len(rows))
+        return total, list(COLUMNS), rows
+
+    def conteos(self, desde, hasta):
+        """GROUP BY en la base: sólo viajan los conteos y las filas con Repetir."""
+        with self._con() as con:
+            conteos = con.execute(
+                "SELECT Plataforma, Estado, COUNT(*) FROM eventos WHERE Fecha >= ? AND Fecha < ? "
+                "AND COALESCE(Repetir, '') NOT LIKE 'FREQ=%' GROUP BY Plataforma, Estado",
+                (_iso(desde), _iso(hasta))).fetchall()
+            series = [["" if v is None else v for v in r] for r in con.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM eventos WHERE Repetir > ''")]
+        metricas.contar("filas.leidas", len(series))
+        conteos = [("" if p is None else p, "" if e is None else e, n) for p, e, n in conteos]
+        return conteos, (list(COLUMNS), series)
+
+    def anios(self):
+        """Años con eventos, incluidas las ocurrencias de las series (las que
+        no terminan cuentan hasta el año en curso o el último con eventos)."""
+        with self._con() as con:
+            anios = {int(a) for (a,) in con.execute(
+                "SELECT DISTINCT substr(Fecha, 1, 4) FROM eventos "
+                "WHERE Fecha GLOB '[0-9][0-9][0-9][0-9]-*'")}
+            series = con.execute("SELECT Fecha, Repetir FROM eventos "
+                                 "WHERE Repetir > '' AND Repetir GLOB 'FREQ=*' AND Fecha > ''").fetchall()
+        tope = max(anios | {datetime.date.today().year})
+        for fecha, regla in series:
+            try:
+                anios |= recurrencia.anios(regla, fecha[:10], tope)
+            except ValueError:
+                pass                          # fecha inválida: no aparece en el calendario
+        return sorted(anios)
+
+    def config_rows(self):
+        with self._con() as con:
+            return [list(r) for r in con.execute("SELECT Red, Requerido, Alias FROM config")]
+
+    def _actual(self, con, eid):
+        r = con.execute(f"SELECT {', '.join(COLUMNS)} FROM eventos WHERE ID=?", (eid,)).fetchone()
+        return dict(zip(COLUMNS, ["" if v is None else v for v in r])) if r else None
+
+    def agregar(self, ev):
+        ev = {**ev, "ID": ev.get("ID") or nuevo_id(), "Rev": 1, "Actualizado": _ahora()}
+        with self._con() as con:
+            con.execute(f"INSERT INTO eventos({', '.join(COLUMNS)}) "
+                        f"VALUES ({', '.join('?' * len(COLUMNS))})", _fila(ev, COLUMNS))
+        metricas.contar("filas.escritas")
+        return ev["ID"]
+
+    def actualizar(self, anterior, nuevo):
+        mios = editados(anterior, nuevo)
+        if not mios:
+            return
+        with self._con() as con:
+            con.execute("BEGIN IMMEDIATE")          # lectura + escritura atómicas
+            cambios = _fusion(anterior, self._actual(con, anterior["ID"]), mios)
+            if not cambios:
+                return
+            con.execute(f"UPDATE eventos SET {', '.join(f'{c}=?' for c in cambios)} WHERE ID=?",
+                        _fila(cambios, list(cambios)) + [anterior["ID"]])
+        metricas.contar("filas.escritas")
+
+    def eliminar(self, eid, anterior=None):
+        with self._con() as con:
+            con.execute("BEGIN IMMEDIATE")
+            actual = self._actual(con, eid)
+            if anterior is not None and actual is not None and not _misma_version(anterior, actual):
+                raise Conflicto(eid, actual, [])
+            con.execute("DELETE FROM eventos WHERE ID=?", (eid,))
+
+    def aplicar_lote(self, altas, cambios, bajas):
+        """Todo el lote en una transacción."""
+        choques = {}
+        with self._con() as con:
+            con.execute("BEGIN IMMEDIATE")
+            con.executemany(f"INSERT OR IGNORE INTO eventos({', '.join(COLUMNS)}) "
+                            f"VALUES ({', '.join('?' * len(COLUMNS))})",
+                            [_fila({**ev, "Rev": 1, "Actualizado": _ahora()}, COLUMNS) for ev in altas])
+            for anterior, nuevo in cambios:
+                try:
+                    cambios_fila = _fusion(anterior, self._actual(con, anterior["ID"]),
+                                           editados(anterior, nuevo))
+                except Conflicto as e:
+                    choques[anterior["ID"]] = e
+                    continue
+                if cambios_fila:
+                    con.execute(f"UPDATE eventos SET {', '.join(f'{c}=?' for c in cambios_fila)} WHERE ID=?",
+                                _fila(cambios_fila, list(cambios_fila)) + [anterior["ID"]])
+            for eid, anterior in bajas:
+                actual = self._actual(con, eid)
+                if anterior is not None and actual is not None and not _misma_version(anterior, actual):
+                    choques[eid] = Conflicto(eid, actual, [])
+                    continue
+                con.execute("DELETE FROM eventos WHERE ID=?", (eid,))
+        metricas.contar("filas.escritas", len(altas) + len(cambios) - len(choques))
+        return choques
+
+    def reescribir(self, filas):
+        with self._con() as con:
+            con.execute("DELETE FROM eventos")
+            con.executemany(f"INSERT INTO eventos({', '.join(COLUMNS)}) "
+                            f"VALUES ({', '.join('?' * len(COLUMNS))})", filas)
+        metricas.contar("filas.escritas", len(filas))
+
+    def guardar_config(self, cfg, alias):
+        with self._con() as con:
+            con.execute("DELETE FROM config")
+            con.executemany("INSERT INTO config VALUES (?,?,?)",
+                            [[k, str(v), alias.get(k, "")] for k, v in cfg.items()])
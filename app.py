@@ -8,22 +8,20 @@
 
 import streamlit as st
 import pandas as pd
-import json, gspread, datetime, calendar, unicodedata
-from oauth2client.service_account import ServiceAccountCredentials
+import os, json, html, datetime, calendar
+from urllib.parse import quote
 import plotly.express as px
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+import almacen, nucleo, metricas, cola, intercambio, recurrencia, calendarios
+from nucleo import COLUMNS, ESTADOS, MESES, DIAS, IndiceEventos
 
 # ---------- CONFIG BÁSICA ----------
-st.set_page_config(page_title="Calendario de Contenidos", layout="wide")
-
-DATA_SHEET   = "Data"
-CONFIG_SHEET = "Config"
-COLUMNS      = ["Fecha","Titulo","Festividad","Plataforma","Estado","Notas"]
-MESES        = ["Enero","Febrero","Marzo","Abril","Mayo","Junio","Julio",
-                "Agosto","Septiembre","Octubre","Noviembre","Diciembre"]
 REDES_PREDEFINIDAS = ["Instagram","Facebook","TikTok","Blog","Twitter"]
 
 # ---------- CSS ----------
-st.markdown("""
+# Se inyecta en main(): importar app.py no toca la página
+CSS_BASE = """
 <style>
 .modal{position:fixed;top:0;left:0;width:100%;height:100%;
        background:rgba(0,0,0,.55);display:flex;justify-content:center;
@@ -33,14 +31,9 @@ st.markdown("""
                box-shadow:0 4px 10px rgba(0,0,0,.25)}
 .stButton>button{margin-top:18px}
 </style>
-""", unsafe_allow_html=True)
+"""
 
 # ---------- UTILIDADES ----------
-def norm(t:str)->str:
-    if not isinstance(t,str): return ""
-    return "".join(c for c in unicodedata.normalize("NFD",t.replace("\u00a0"," "))
-                   if unicodedata.category(c)!="Mn").lower().strip()
-
 def status_html(p:int,r:int)->str:
     txt=f"{p}/{r}"
     if p==0:        return f"<span style='color:red'>{txt}</span>"
@@ -48,94 +41,289 @@ def status_html(p:int,r:int)->str:
     if p>r/2:       return f"<span style='color:blue'>{txt}</span>"
     return txt
 
+@st.cache_resource
 def get_gsheet_connection():
-    creds=json.loads(st.secrets["gcp_service_account"])
-    scope=["https://www.googleapis.com/auth/spreadsheets",
-           "https://www.googleapis.com/auth/drive"]
-    return gspread.authorize(
-        ServiceAccountCredentials.from_json_keyfile_dict(creds,scope))
+    """Un cliente por proceso: los reruns no vuelven a autenticar."""
+    return almacen.conectar_google(json.loads(st.secrets["gcp_service_account"]))
+
+@st.cache_resource
+def _hoja_google(shid):
+    return almacen.HojaGoogle(get_gsheet_connection(), shid)
+
+@st.cache_resource
+def _sqlite_local(ruta):
+    return almacen.SQLiteLocal(ruta)
+
+def _usa_sqlite() -> bool:
+    return os.environ.get("CALENDARIO_BACKEND", "").lower() == "sqlite"
+
+def calendarios_registrados() -> dict:
+    """slug → Calendario. Google Sheets: tabla [calendarios] de secrets
+    (slug = "ID de planilla", o slug = {nombre, sheet_id}) o un único SHEET_ID.
+    SQLite: CALENDARIOS="slug=ruta,slug=ruta" o un único CALENDARIO_DB."""
+    if _usa_sqlite():
+        return calendarios.registro(os.environ.get("CALENDARIOS"),
+                                    os.environ.get("CALENDARIO_DB", "calendario.db"))
+    return calendarios.registro(st.secrets.get("calendarios"), st.secrets.get("SHEET_ID", ""))
+
+def abrir_almacen(cal: calendarios.Calendario):
+    """Google Sheets por defecto (un solo cliente para todas las planillas).
+    Con CALENDARIO_BACKEND=sqlite cada calendario es una base local y no
+    hacen falta credenciales."""
+    if _usa_sqlite():
+        return _sqlite_local(cal.fuente)
+    return _hoja_google(cal.fuente)
+
+# Tope de memoria de los df cacheados (todas las sesiones y calendarios)
+@st.cache_resource
+def _memoria():
+    return calendarios.MemoriaLRU(int(float(os.environ.get("CALENDARIO_CACHE_MB", "512")) * 2**20))
+
+def _liberar(fuera: list):
+    """Vacía las cachés de los calendarios desalojados por _memoria()."""
+    for clave, liberar in fuera:
+        for f in liberar:
+            f()
+        metricas.contar("memoria.desalojos")
+
+def _registrar(clave: str, parte: str, df: pd.DataFrame, liberar, ttl=None, cupo=None):
+    """`parte` lleva la clave de caché completa; `ttl` / `cupo` son los de la
+    caché que guarda el df (ver MemoriaLRU.registrar)."""
+    _liberar(_memoria().registrar(clave, parte, df.memory_usage(deep=True).sum(), liberar,
+                                  ttl=ttl, cupo=cupo))
+
+# Marca de la última escritura por almacén: forma parte de la clave de las
+# cachés por rango / búsqueda / resumen, así una escritura invalida sólo las
+# de su calendario
+@st.cache_resource
+def _generaciones() -> dict:
+    return {}
+
+def _generacion(alm) -> str:
+    return _generaciones().get(alm.clave, "")
+
+# Las cachés identifican al almacén por su clave (planilla o archivo): cada
+# calendario tiene su propio espacio en load_df / load_cfg / …
+HASH_ALMACEN = {almacen.HojaGoogle: lambda a: a.clave,
+                almacen.SQLiteLocal: lambda a: a.clave}
 
 # ---------- DATA ----------
-@st.cache_data(ttl=60, hash_funcs={gspread.client.Client: lambda _: None})
-def load_df(cli, shid):
-    """Lee Google Sheets y convierte la columna Fecha en datetime robusto."""
-    sh = cli.open_by_key(shid)
-    try:
-        ws = sh.worksheet(DATA_SHEET)
-    except gspread.exceptions.WorksheetNotFound:
-        ws = sh.add_worksheet(title=DATA_SHEET, rows="1000", cols="20")
-        ws.append_row(COLUMNS)
-        return pd.DataFrame(columns=COLUMNS)
-
-    df = pd.DataFrame(ws.get_all_records())
-
-    # Asegurar que las columnas requeridas estén presentes
-    for col in COLUMNS:
-        if col not in df.columns:
-            df[col] = ""
-
-    # --- FECHA: probamos formatos ISO y Latino comunes
-    if "Fecha" in df.columns:
-        df["Fecha"] = (
-            pd.to_datetime(df["Fecha"], errors="coerce", utc=False)
-            .fillna(pd.to_datetime(df["Fecha"], format="%d/%m/%Y", errors="coerce"))
-            .fillna(pd.to_datetime(df["Fecha"], format="%d-%m-%Y", errors="coerce"))
-        )
+@metricas.cacheada("load_df", st.cache_data(ttl=60, hash_funcs=HASH_ALMACEN))
+def load_df(alm):
+    """Todos los eventos del almacén."""
+    head, rows = alm.eventos()
+    df = nucleo.preparar(head, rows, load_cfg(alm), load_alias(alm))
+    df.attrs["almacen"] = alm.clave
+    _registrar(alm.clave, "df", df, lambda: (load_df.clear(alm), load_anios.clear(alm),
+                                             _config_rows.clear(alm)), ttl=60)
+    return df
 
-    for c in ["Plataforma", "Estado"]:
-        df[c] = df[c].astype(str).str.replace("\u00a0", " ").str.strip()
+@metricas.cacheada("load_rango", st.cache_data(ttl=60, max_entries=32, hash_funcs=HASH_ALMACEN))
+def _load_rango(alm, desde, hasta, generacion: str):
+    head, rows = alm.eventos(desde, hasta)
+    df = nucleo.preparar(head, rows, load_cfg(alm), load_alias(alm))
+    df.attrs["almacen"] = alm.clave
+    _registrar(alm.clave, f"rango:{desde}:{hasta}:{generacion}", df,
+               lambda: _load_rango.clear(alm, desde, hasta, generacion), ttl=60, cupo=32)
+    return df
 
-    df["Plataforma_norm"] = df["Plataforma"].apply(norm)
-    df["Estado_norm"]     = df["Estado"].apply(norm)
+@metricas.cacheada("load_anios", st.cache_data(ttl=60, hash_funcs=HASH_ALMACEN))
+def load_anios(alm) -> list:
+    anios = alm.anios()
+    if anios is None:                      # mismo criterio que SQLiteLocal.anios
+        df = load_df(alm)
+        anios = {int(y) for y in df["Fecha"].dt.year.dropna()}
+        tope = max(anios | {datetime.date.today().year})
+        series = df[df["Repetir"].str.startswith("FREQ=") & df["Fecha"].notna()]
+        for rg, ini in zip(series["Repetir"], series["Fecha"]):
+            anios |= recurrencia.anios(rg, ini, tope)
+        anios = sorted(anios)
+    return anios
+
+def load_anio(alm, yr: int) -> pd.DataFrame:
+    """Eventos de un año, con cada serie reemplazada por sus ocurrencias del
+    año. Si el almacén filtra por fecha se consulta sólo ese rango (más las
+    series); si no, es un slice del índice sobre el df completo."""
+    yr = int(yr)
+    desde, hasta = datetime.date(yr, 1, 1), datetime.date(yr + 1, 1, 1)
+    if alm.filtra_fechas:
+        df = _load_rango(alm, desde, hasta, _generacion(alm))
+        ix = indice(df)
+        df_yr = df
+    else:
+        df = load_df(alm)
+        ix = indice(df)
+        df_yr = ix.anio(yr)
+    version = f"{df.attrs.get('version')}:{yr}"
+    if not ix.series.empty:
+        return _expandir(df_yr, ix.series, version, desde, hasta, alm.clave)
+    df_yr.attrs = {"version": version, "almacen": alm.clave}
+    return df_yr
+
+@metricas.cacheada("expandir", st.cache_resource(max_entries=8))
+def _expandir(_df, _series, version, desde, hasta, clave: str):
+    """Ocurrencias de la ventana, cacheadas por versión de datos."""
+    df = recurrencia.expandir(_df, _series, desde, hasta)
+    df.attrs = {"version": version, "almacen": clave}
+    _registrar(clave, f"expandir:{version}:{desde}:{hasta}", df,
+               lambda: _expandir.clear(None, None, version, desde, hasta, clave), cupo=8)
     return df
 
-@st.cache_data(ttl=60, hash_funcs={gspread.client.Client: lambda _: None})
-def load_cfg(cli, shid):
-    sh = cli.open_by_key(shid)
+# ---------- ÍNDICE ----------
+@metricas.cacheada("indice", st.cache_resource(max_entries=4))
+def _indice(_df, version, clave: str):
+    ix = IndiceEventos(_df)
+    if clave:
+        _registrar(clave, f"indice:{version}", _df,
+                   lambda: _indice.clear(None, version, clave), cupo=4)
+    return ix
+
+def indice(df: pd.DataFrame) -> IndiceEventos:
+    """Índice cacheado por versión de datos (se reconstruye sólo si cambian).
+    Queda a cuenta del calendario del df para el tope de memoria."""
+    return _indice(df, df.attrs.get("version"), df.attrs.get("almacen", ""))
+
+@metricas.cacheada("buscar", st.cache_data(ttl=60, max_entries=64, hash_funcs=HASH_ALMACEN))
+def buscar_eventos(alm, desde, hasta, redes: tuple, estados: tuple, texto: str,
+                   offset: int, limite: int, generacion: str) -> tuple:
+    """(total, página) de eventos con desde <= Fecha < hasta y los filtros.
+    Si el almacén filtra en el origen sólo se lee la página; si no, se filtra
+    el df completo (ya cacheado) sobre el índice. `generacion`: _generacion(alm)."""
+    cfg, alias = load_cfg(alm), load_alias(alm)
+    variantes = sorted(k for k, red in nucleo.mapa_redes(cfg, alias).items() if red in redes)
+    res = alm.buscar(desde, hasta, variantes, [nucleo.norm(e) for e in estados],
+                     nucleo.norm(texto), offset, limite)
+    if res is not None:
+        total, head, rows = res
+        return total, nucleo.preparar(head, rows, cfg, alias)
+    df = nucleo.filtrar(indice(load_df(alm)), desde, hasta, redes, estados, texto)
+    return len(df), df.iloc[offset:offset + limite]
+
+@metricas.cacheada("resumen", st.cache_data(ttl=60, max_entries=128, hash_funcs=HASH_ALMACEN))
+def resumen_calendario(alm, yr: int, generacion: str) -> dict:
+    """KPIs de un año sin cargar la tabla: conteos agregados en el almacén más
+    las ocurrencias de las series (pocas filas). `generacion`: _generacion(alm)."""
+    desde, hasta = datetime.date(yr, 1, 1), datetime.date(yr + 1, 1, 1)
+    cfg, alias = load_cfg(alm), load_alias(alm)
+    conteos, (head, filas) = alm.conteos(desde, hasta)
+    if filas:
+        series = nucleo.preparar(head, filas, cfg, alias)
+        occ = recurrencia.expandir(series[series["Repetir"].str.startswith("FREQ=")], series, desde, hasta)
+        conteos = conteos + [(p, e, int(n)) for (p, e), n in occ.groupby(["Plataforma", "Estado"]).size().items()]
+    return nucleo.kpis_conteos(conteos, yr, cfg, alias)
+
+@metricas.cacheada("config_rows", st.cache_data(ttl=60, hash_funcs=HASH_ALMACEN))
+def _config_rows(alm):
+    """Filas de Config: Red | Requerido | Alias (separados por coma)."""
+    return alm.config_rows()
+
+@metricas.medido("load_cfg")
+def load_cfg(alm):
+    return nucleo.cfg_de_filas(_config_rows(alm))
+
+def load_alias(alm):
+    return nucleo.alias_de_filas(_config_rows(alm))
+
+# ---------- ESCRITURA ----------
+# Cada alta / edición / baja toca sólo su fila y, con la cola activa, se envía
+# en segundo plano (en lote con las demás). La reescritura completa queda en
+# guardar_datos() como operación explícita de "compactar".
+def _invalidar(alm):
+    """Sólo las cachés de este almacén: las de rango / búsqueda / resumen
+    quedan viejas al cambiar su generación (y salen por ttl / max_entries)."""
+    load_df.clear(alm)
+    load_anios.clear(alm)
+    _generaciones()[alm.clave] = almacen.nuevo_id()
+
+@st.cache_resource(hash_funcs=HASH_ALMACEN)
+def cola_de(alm):
+    """Cola de escritura del almacén (una por proceso); None si está desactivada."""
+    if cola.INTERVALO <= 0:
+        return None
+    return cola.ColaEscritura(alm, al_vaciar=lambda: _invalidar(alm))
+
+def _sesion() -> str:
+    return st.session_state.setdefault("sesion", almacen.nuevo_id())
+
+@metricas.medido("agregar_evento")
+def agregar_evento(alm, ev: dict) -> str:
+    """Agrega un evento. Devuelve su ID."""
+    q = cola_de(alm)
+    if q:
+        return q.agregar(ev, _sesion())
+    eid = alm.agregar(ev)
+    _invalidar(alm)
+    return eid
+
+@metricas.medido("actualizar_evento")
+def actualizar_evento(alm, anterior, nuevo: dict):
+    """Escribe sólo los campos que cambiaron respecto a `anterior`. Si otra
+    sesión tocó los mismos campos hay conflicto: sin cola se lanza
+    almacen.Conflicto (igual se invalida: lo guardado ya no es lo que había en
+    caché); con cola llega después por ColaEscritura.conflictos_de."""
+    q = cola_de(alm)
+    if q:
+        return q.actualizar(anterior, nuevo, _sesion())
     try:
-        ws = sh.worksheet(CONFIG_SHEET)
-    except gspread.exceptions.WorksheetNotFound:
-        ws = sh.add_worksheet(title=CONFIG_SHEET, rows="10", cols="5")
-        ws.update("A1", [["Red", "Requerido"],
-                         ["Instagram", "5"], ["Facebook", "5"],
-                         ["TikTok", "3"],   ["Blog", "1"]])
-    return {r[0]: int(r[1]) if len(r) > 1 and r[1].isdigit() else 0
-            for r in ws.get_all_values()[1:]}
-
-def guardar_datos(cli, shid, df):
-    sh = cli.open_by_key(shid)
-    out = df[COLUMNS].copy()
-
-    # Reemplazar valores no válidos
-    out = out.fillna("").replace([float("inf"), float("-inf")], "")
-
-    # Guardamos siempre en ISO YYYY‑MM‑DD
-    out["Fecha"] = pd.to_datetime(out["Fecha"]).dt.strftime("%Y-%m-%d")
-    data = [out.columns.tolist()] + out.values.tolist()
+        alm.actualizar(anterior, nuevo)
+    finally:
+        _invalidar(alm)
+
+@metricas.medido("eliminar_evento")
+def eliminar_evento(alm, eid, anterior=None):
+    q = cola_de(alm)
+    if q:
+        return q.eliminar(eid, anterior, _sesion())
     try:
-        ws = sh.worksheet(DATA_SHEET)
-    except gspread.exceptions.WorksheetNotFound:
-        ws = sh.add_worksheet(title=DATA_SHEET, rows="1000", cols="20")
-    ws.clear()
-    ws.update("A1", data)
-    st.cache_data.clear()
-
-def guardar_config(cli, shid, cfg):
-    sh = cli.open_by_key(shid)
+        alm.eliminar(eid, anterior)
+    finally:
+        _invalidar(alm)
+
+@metricas.medido("guardar_datos")
+def guardar_datos(alm, df) -> list:
+    """Compactar: reescribe todos los eventos (orden por fecha, sin huecos).
+    Se relee el origen justo antes: lo que otra sesión cambió, agregó o borró
+    después de cargar `df` se respeta. Devuelve los IDs de `df` rechazados."""
+    if cola_de(alm):
+        cola_de(alm).vaciar()
+    head, rows = alm.eventos()
+    actual = nucleo.preparar(head, rows, load_cfg(alm), load_alias(alm))
+    final, rechazados = nucleo.conservar_vigentes(df, actual)
+    alm.reescribir(nucleo.filas_para_guardar(final))
+    _invalidar(alm)
+    return rechazados
+
+@metricas.medido("importar_eventos")
+def importar_eventos(alm, evs: list) -> int:
+    """Alta masiva: todas las filas en un solo lote (un append en la planilla,
+    una transacción en SQLite), sin pasar por la cola."""
+    evs = [{**ev, "ID": ev.get("ID") or almacen.nuevo_id()} for ev in evs]
     try:
-        ws = sh.worksheet(CONFIG_SHEET)
-    except gspread.exceptions.WorksheetNotFound:
-        ws = sh.add_worksheet(title=CONFIG_SHEET, rows="10", cols="5")
-    ws.clear()
-    ws.update("A1", [["Red", "Requerido"]] + [[k, str(v)] for k, v in cfg.items()])
-    st.cache_data.clear()
+        alm.aplicar_lote(evs, [], [])
+    finally:
+        _invalidar(alm)
+    return len(evs)
+
+@metricas.medido("guardar_config")
+def guardar_config(alm, cfg, alias=None):
+    alm.guardar_config(cfg, alias or {})
+    # La red de cada evento depende de la config: se invalidan ambas
+    _config_rows.clear(alm)
+    _invalidar(alm)
+
+# ---------- ESTADO SEMANAL ----------
+@metricas.cacheada("pendientes", st.cache_data(max_entries=32))
+def _pendientes(_df_yr, version, yr, redes: tuple, tipo: str) -> pd.DataFrame:
+    return nucleo.matriz_pendientes(_df_yr, redes, tipo)
+
+def matriz_pendientes(df: pd.DataFrame, yr: int, cfg: dict, tipo: str = "calendario") -> pd.DataFrame:
+    """(Mes, Semana) × red → eventos no publicados del año, en una sola pasada.
+    Cacheado por año, versión de datos y redes configuradas."""
+    return _pendientes(indice(df).anio(yr), df.attrs.get("version"),
+                       int(yr), tuple(sorted(cfg)), tipo)
 
 # ---------- DASHBOARD ----------
-def weeks_in_year(yr: int) -> int:
-    yr = int(yr)
-    return datetime.date(yr, 12, 28).isocalendar().week
-
-def dashboard(df: pd.DataFrame, cfg: dict):
+def dashboard(alm, cfg: dict):
     st.title("Dashboard – Calendario de Contenidos")
 
     # -------- Navegación rápida
@@ -151,7 +339,7 @@ def dashboard(df: pd.DataFrame, cfg: dict):
     st.write("---")
 
     # -------- Selector de año (±10 alrededor de los datos)
-    years_db = sorted({int(y) for y in df["Fecha"].dt.year.dropna()})
+    years_db = load_anios(alm)
     if not years_db:
         years_db = [datetime.date.today().year]
     span = 10
@@ -160,36 +348,44 @@ def dashboard(df: pd.DataFrame, cfg: dict):
     default_idx = full_years.index(hoy) if hoy in full_years else 0
     yr = int(st.selectbox("Año a visualizar", full_years, index=default_idx))
 
-    df_yr = df[df["Fecha"].dt.year == yr]
-    wks   = weeks_in_year(yr)
+    df_yr = load_anio(alm, yr)
+
+    kpi = kpis_anio(df_yr, df_yr.attrs.get("version"), yr, tuple(sorted(cfg.items())))
 
     # =====================================================
     # 1) KPI global + conteo por estado
     # =====================================================
-    objetivo_total  = sum(v * wks for v in cfg.values())
-    planeado_total  = len(df_yr)
-    pendiente_total = max(objetivo_total - planeado_total, 0)
-
-    st.metric("⏱️ Eventos planificados / objetivo anual",
-              f"{planeado_total}/{objetivo_total}",
-              delta=f"{planeado_total - objetivo_total}")
-
-    vc_estado = df_yr["Estado"].value_counts().reindex(
-        ["Planeación", "Diseño", "Programado", "Publicado"], fill_value=0)
-
-    # Actualizar "Total" para reflejar el objetivo anual
-    vc_estado["Total"] = objetivo_total
+    st.metric("⏱️ Eventos planificados / objetivo anual",
+              f"{kpi['planeado_total']}/{kpi['objetivo_total']}",
+              delta=f"{kpi['planeado_total'] - kpi['objetivo_total']}")
 
     st.subheader("Conteo por estado (año seleccionado)")
-    st.dataframe(vc_estado.rename("Planificados").to_frame())
+    st.dataframe(kpi["vc_estado"].rename("Planificados").to_frame())
+    st.plotly_chart(kpi["fig_estado"], use_container_width=True)
 
-    # Actualizar el gráfico de conteo por estado
-    total_values = vc_estado.values
-    total_sum = sum(total_values)
+    # =====================================================
+    # 2) Por red social
+    # =====================================================
+    st.subheader("Planificado vs objetivo por red social")
+    if not kpi["redes"]:
+        return
+    met_cols = st.columns(len(kpi["redes"]))
+    for i, (red, planeado, objetivo) in enumerate(kpi["redes"]):
+        met_cols[i].metric(red, f"{planeado}/{objetivo}")
+    st.plotly_chart(kpi["fig_redes"], use_container_width=True)
+
+@metricas.cacheada("kpis_anio", st.cache_resource(max_entries=16))
+def kpis_anio(_df_yr, version, yr: int, cfg_items: tuple) -> dict:
+    """KPIs y figuras del Dashboard para un año. Se construyen una vez por
+    (año, versión de datos, config); los reruns de navegación reutilizan las
+    mismas figuras (st.plotly_chart no las modifica)."""
+    kpi       = nucleo.kpis_anio(_df_yr, yr, dict(cfg_items))
+    vc_estado = kpi["vc_estado"]
 
     # Crear etiquetas personalizadas con porcentajes
+    total_sum = sum(vc_estado.values) or 1
     custom_labels = [
-        f"{name} ({value / total_sum:.1%})" for name, value in zip(vc_estado.index, total_values)
+        f"{name} ({value / total_sum:.1%})" for name, value in zip(vc_estado.index, vc_estado.values)
     ]
 
     fig_estado = px.pie(
@@ -217,43 +413,32 @@ def dashboard(df: pd.DataFrame, cfg: dict):
             font=dict(size=20)  # Cambiar el tamaño de la fuente de la leyenda
         )
     )
-    st.plotly_chart(fig_estado, use_container_width=True)
 
-    # =====================================================
-    # 2) Por red social
-    # =====================================================
-    st.subheader("Planificado vs objetivo por red social")
-    redes = sorted(cfg)
-    met_cols = st.columns(len(redes))
-    pie_cols = st.columns(len(redes))
-
-    for i, red in enumerate(redes):
-        objetivo = cfg[red] * wks
-        planeado = len(df_yr[df_yr["Plataforma_norm"].str.contains(norm(red), na=False)])
-        pendiente = max(objetivo - planeado, 0)
-        met_cols[i].metric(red, f"{planeado}/{objetivo}")
-
-        pie = px.pie(
-            values=[planeado, pendiente],
-            names=["Planificado", "Pendiente"],
-            hole=0.55,
-            title=red,
-            color=["Planificado", "Pendiente"],
-            color_discrete_map={
-                "Planificado": "rgb(3, 221, 82)",  # Verde
-                "Pendiente": "rgb(170, 170, 170)",  # Gris
-            },
-        )
-        # Configurar etiquetas externas con nombre y porcentaje
-        pie.update_traces(
-            textinfo="label+percent",  # Mostrar nombre y porcentaje en las etiquetas externas
-            textposition="outside",   # Posicionar las etiquetas fuera del gráfico
-            showlegend=True           # Mantener las etiquetas a la derecha
-        )
-        pie_cols[i].plotly_chart(pie, use_container_width=True)
+    # Un solo gráfico con una dona por red (en vez de N gráficos)
+    redes = kpi["redes"]
+    fig_redes = None
+    if redes:
+        fig_redes = make_subplots(rows=1, cols=len(redes), subplot_titles=[r for r, _, _ in redes],
+                                  specs=[[{"type": "domain"}] * len(redes)])
+        for i, (red, planeado, objetivo) in enumerate(redes, start=1):
+            fig_redes.add_trace(go.Pie(
+                values=[planeado, max(objetivo - planeado, 0)],
+                labels=["Planificado", "Pendiente"],
+                hole=0.55, name=red, sort=False,
+                marker=dict(colors=["rgb(3, 221, 82)",      # Verde
+                                    "rgb(170, 170, 170)"]),  # Gris
+                textinfo="label+percent",  # Mostrar nombre y porcentaje en las etiquetas externas
+                textposition="outside",   # Posicionar las etiquetas fuera del gráfico
+                showlegend=(i == 1),      # Una sola leyenda para todas las donas
+            ), row=1, col=i)
+
+    return {**kpi, "fig_estado": fig_estado, "fig_redes": fig_redes}
 
 # ---------- AGREGAR / EDITAR / MENÚ / CONFIG (igual que 3.0) ----------
-def vista_agregar(df, cli, sheet_id):
+REPETICIONES = {"No se repite": None, "Cada día": "DAILY", "Cada semana": "WEEKLY",
+                "Cada mes": "MONTHLY"}
+
+def vista_agregar(alm):
     st.title("Agregar Evento")
     default_date = datetime.date.today()
     sel = st.session_state.get("selected_date")
@@ -266,7 +451,19 @@ def vista_agregar(df, cli, sheet_id):
         plataforma = st.selectbox("Plataforma", REDES_PREDEFINIDAS + ["Otra"])
         estado = st.selectbox("Estado", ["Planeación", "Diseño", "Programado", "Publicado"])
         notas = st.text_area("Notas", "")
+        with st.expander("Repetición"):
+            frec = st.selectbox("Se repite", list(REPETICIONES))
+            c1, c2, c3 = st.columns(3)
+            cada  = c1.number_input("Cada (días / semanas / meses)", min_value=1, max_value=99, value=1)
+            hasta = c2.date_input("Hasta", value=None)
+            veces = c3.number_input("Veces (0 = sin límite)", min_value=0, max_value=999, value=0)
+            dias  = st.multiselect("Días (semanal; vacío = el de la fecha)", DIAS)
         if st.form_submit_button("Guardar Evento"):
+            repetir = ""
+            if REPETICIONES[frec]:
+                repetir = recurrencia.regla(REPETICIONES[frec], cada,
+                                            [DIAS.index(d) for d in dias] or [fecha.weekday()],
+                                            hasta, veces)
             nuevo = {
                 "Fecha": pd.Timestamp(fecha),
                 "Titulo": titulo.strip(),
@@ -274,17 +471,113 @@ def vista_agregar(df, cli, sheet_id):
                 "Plataforma": plataforma.strip(),
                 "Estado": estado.strip(),
                 "Notas": notas.strip(),
+                "Repetir": repetir,
             }
-            df = pd.concat([df, pd.DataFrame([nuevo])], ignore_index=True)
-            guardar_datos(cli, sheet_id, df)
-            st.success("¡Evento agregado!")
-
-def vista_editar_eliminar(df,cli,sheet_id):
+            agregar_evento(alm, nuevo)
+            st.success("¡Evento agregado!" if not repetir else
+                       f"¡Serie agregada! Se repite {recurrencia.describir(repetir)}.")
+
+TAMANOS_PAGINA = [25, 50, 100]
+
+CAMPOS_EDITABLES = {"Fecha": "Fecha", "Titulo": "Título", "Festividad": "Festividad/Efeméride",
+                    "Plataforma": "Plataforma", "Estado": "Estado", "Notas": "Notas",
+                    "Repetir": "Repetición"}
+
+def _texto_campo(c, v) -> str:
+    if c == "Fecha":
+        f = pd.to_datetime(v, errors="coerce")
+        return "" if pd.isna(f) else f"{f:%d/%m/%Y}"
+    return str(v)
+
+def _resolver_conflicto(alm) -> bool:
+    """Prompt de fusión tras un Conflicto: por cada campo que chocó se elige la
+    versión propia o la guardada; el resto de los cambios propios se aplica
+    sobre la fila guardada. Devuelve True si hay un conflicto en pantalla."""
+    if not st.session_state.get("conflicto") and st.session_state.get("conflictos_cola"):
+        e = st.session_state["conflictos_cola"].pop(0)     # rechazados al sincronizar
+        st.session_state["conflicto"] = {"anterior": e.anterior, "nuevo": e.nuevo,
+                                         "titulo": e.anterior.get("Titulo") or (e.actual or {}).get("Titulo", e.eid),
+                                         "actual": e.actual, "campos": e.campos}
+    cf = st.session_state.get("conflicto")
+    if not cf:
+        return False
+    nuevo, actual = cf["nuevo"], cf["actual"]
+    st.warning(f"Otra sesión modificó «{cf['titulo']}» mientras lo editabas.")
+    if actual is None:
+        st.write("El evento fue **borrado** por otra sesión.")
+        c1, c2 = st.columns(2)
+        if c1.button("Volver a crearlo con mis cambios"):
+            agregar_evento(alm, {**cf["anterior"], **nuevo, "ID": ""})
+            del st.session_state["conflicto"]; st.rerun()
+        if c2.button("Descartar mis cambios"):
+            del st.session_state["conflicto"]; st.rerun()
+        return True
+    if not cf["campos"]:
+        st.write("El evento cambió en el origen; revisa la versión guardada antes de borrarlo.")
+    elegido = {}
+    for c in cf["campos"]:
+        mio, suyo = _texto_campo(c, nuevo[c]), _texto_campo(c, actual.get(c, ""))
+        op = st.radio(CAMPOS_EDITABLES.get(c, c), ["mio", "suyo"], key=f"fusion_{c}", horizontal=True,
+                      format_func=lambda o: f"Mía: {mio}" if o == "mio" else f"Guardada: {suyo}")
+        elegido[c] = nuevo[c] if op == "mio" else actual.get(c, "")
+    c1, c2 = st.columns(2)
+    if cf["campos"] and c1.button("Guardar fusión"):
+        try:
+            actualizar_evento(alm, pd.Series(actual), {**nuevo, **elegido})
+            del st.session_state["conflicto"]; st.success("¡Fusión guardada!")
+        except almacen.Conflicto as e:     # volvió a cambiar mientras tanto
+            st.session_state["conflicto"] = {**cf, "actual": e.actual, "campos": e.campos}
+        st.rerun()
+    if c2.button("Quedarme con la versión guardada"):
+        del st.session_state["conflicto"]; st.rerun()
+    return True
+
+def vista_editar_eliminar(alm):
     st.title("Editar / Eliminar Evento")
-    if df.empty: st.info("No hay eventos registrados."); return
-    st.dataframe(df,use_container_width=True)
-    idx=st.selectbox("Fila",df.index.tolist())
-    row=df.loc[idx]
+    if _resolver_conflicto(alm):
+        return
+    anios=load_anios(alm)
+    if not anios: st.info("No hay eventos registrados."); return
+    if not alm.filtra_fechas:
+        invalidas=load_df(alm).attrs.get("fechas_invalidas",[])
+        if invalidas:
+            with st.expander(f"⚠️ {len(invalidas)} evento(s) con fecha no reconocida"):
+                st.caption("No aparecen en el calendario hasta corregir la fecha (AAAA-MM-DD o DD/MM/AAAA).")
+                st.dataframe(pd.DataFrame(invalidas),hide_index=True,use_container_width=True)
+
+    # -------- Filtros (se resuelven en el almacén; sólo viaja la página)
+    c1,c2,c3,c4=st.columns([1,1,2,2])
+    desde=c1.date_input("Desde",datetime.date(anios[0],1,1),key="ed_desde")
+    hasta=c2.date_input("Hasta",datetime.date(anios[-1],12,31),key="ed_hasta")
+    redes=c3.multiselect("Plataforma",sorted(load_cfg(alm)),key="ed_redes")
+    estados=c4.multiselect("Estado",ESTADOS,key="ed_estados")
+    c1,c2=st.columns([4,1])
+    texto=c1.text_input("Buscar en el título",key="ed_texto").strip()
+    tam=c2.selectbox("Por página",TAMANOS_PAGINA,index=1,key="ed_tam")
+    filtro=(desde,hasta+datetime.timedelta(days=1),tuple(redes),tuple(estados),texto,tam)
+    if st.session_state.get("ed_filtro")!=filtro:      # filtro nuevo: vuelve a la primera página
+        st.session_state["ed_filtro"]=filtro; st.session_state["ed_pagina"]=1
+    pagina=st.session_state.setdefault("ed_pagina",1)
+    total,pag=buscar_eventos(alm,*filtro[:5],(pagina-1)*tam,tam,_generacion(alm))
+    n_pag=max(1,-(-total//tam))
+    if pagina>n_pag:                                     # se borraron eventos de la última página
+        pagina=st.session_state["ed_pagina"]=n_pag
+        total,pag=buscar_eventos(alm,*filtro[:5],(pagina-1)*tam,tam,_generacion(alm))
+    if not total: st.info("Ningún evento coincide con los filtros."); return
+
+    st.dataframe(pag[COLUMNS],use_container_width=True,hide_index=True)
+    c1,c2=st.columns([1,4])
+    c1.number_input("Página",min_value=1,max_value=n_pag,step=1,key="ed_pagina")
+    c2.caption(f"{total} evento(s) · página {pagina} de {n_pag}")
+
+    # -------- Selección por ID (estable entre páginas y recargas)
+    ids=pag["ID"].tolist()
+    etiquetas={i:f"{f:%d/%m/%Y} – {t} ({i})" for i,f,t in zip(ids,pag["Fecha"],pag["Titulo"])}
+    previo=st.session_state.get("ed_id")
+    eid=st.selectbox("Evento",ids,index=ids.index(previo) if previo in ids else 0,
+                     format_func=etiquetas.get)
+    st.session_state["ed_id"]=eid
+    row=pag.iloc[ids.index(eid)]
     with st.form("f_edit",clear_on_submit=True):
         fecha=st.date_input("Fecha",row["Fecha"].date())
         titulo=st.text_input("Título",row["Titulo"])
@@ -297,34 +590,188 @@ def vista_editar_eliminar(df,cli,sheet_id):
         estado=st.selectbox("Estado",estados,
                 index=estados.index(row["Estado"]) if row["Estado"] in estados else 0)
         notas=st.text_area("Notas",row["Notas"])
+        repetir=row["Repetir"]
+        if "@" not in repetir:              # un reemplazo de ocurrencia queda ligado a su serie
+            repetir=st.text_input("Repetición",repetir,
+                help="Vacío = evento único. Ej.: FREQ=WEEKLY;BYDAY=MO,WE;UNTIL=20261231 "
+                     "(FREQ DAILY/WEEKLY/MONTHLY, INTERVAL, BYDAY, BYMONTHDAY, UNTIL, COUNT, EXDATE)").strip()
         c1,c2=st.columns(2)
         with c1:
             if st.form_submit_button("Guardar Cambios"):
-                df.loc[idx]=[pd.Timestamp(fecha),titulo,festividad,plataforma,estado,notas,
-                             norm(plataforma),norm(estado)]
-                guardar_datos(cli,sheet_id,df); st.success("¡Guardado!")
+                nuevo={"Fecha":pd.Timestamp(fecha),"Titulo":titulo,"Festividad":festividad,
+                       "Plataforma":plataforma,"Estado":estado,"Notas":notas,"Repetir":repetir}
+                try:
+                    if repetir and "@" not in repetir:
+                        nuevo["Repetir"]=recurrencia.escribir(recurrencia.leer(repetir))
+                    actualizar_evento(alm,row,nuevo); st.success("¡Guardado!")
+                except ValueError as e:
+                    st.error(f"Repetición inválida: {e}")
+                except almacen.Conflicto as e:
+                    _conflicto(row,nuevo,e)
         with c2:
             if st.form_submit_button("Borrar Evento"):
-                df.drop(index=idx,inplace=True); df.reset_index(drop=True,inplace=True)
-                guardar_datos(cli,sheet_id,df); st.warning("Eliminado"); st.rerun()
-
-def vista_configuracion(cli,sheet_id):
+                try:
+                    eliminar_evento(alm,row["ID"],row); st.warning("Eliminado"); st.rerun()
+                except almacen.Conflicto as e:
+                    _conflicto(row,{},e)
+    if recurrencia.es_serie(row["Repetir"]):
+        _ocurrencias_serie(alm,row,desde,hasta+datetime.timedelta(days=1))
+    elif "@" in row["Repetir"]:
+        sid,_,f=row["Repetir"].partition("@")
+        st.caption(f"🔁 Reemplaza la ocurrencia del {f[6:8]}/{f[4:6]}/{f[:4]} de la serie {sid}. "
+                   "Si se borra, vuelve la ocurrencia original.")
+
+def _ocurrencias_serie(alm, row, desde, hasta):
+    """Ocurrencias de la serie en el rango filtrado: omitir una o crear su
+    reemplazo (una fila propia, editable como cualquier evento)."""
+    st.markdown("#### Ocurrencias")
+    st.caption(f"🔁 Se repite {recurrencia.describir(row['Repetir'])}.")
+    try:
+        fechas=recurrencia.ocurrencias(row["Repetir"],row["Fecha"],desde,hasta)[:500]
+    except ValueError:
+        return
+    if not len(fechas):
+        st.info("Ninguna ocurrencia en el rango de fechas filtrado."); return
+    c1,c2,c3=st.columns([2,1,1])
+    f=c1.selectbox("Ocurrencia",[pd.Timestamp(x).date() for x in fechas],key="ed_ocurrencia",
+                   format_func=lambda d: f"{DIAS[d.weekday()]} {d:%d/%m/%Y}")
+    if c2.button("Omitir esta fecha"):
+        nuevo={"Repetir":recurrencia.con_excepcion(row["Repetir"],f)}
+        try:
+            actualizar_evento(alm,row,nuevo); st.rerun()
+        except almacen.Conflicto as e:
+            _conflicto(row,nuevo,e)
+    if c3.button("Modificar sólo esta"):
+        copia={**{c:row[c] for c in CAMPOS_EDITABLES},"Fecha":pd.Timestamp(f),
+               "Repetir":recurrencia.marca(row["ID"],f)}
+        st.session_state["ed_id"]=agregar_evento(alm,copia)
+        st.success("Se creó una copia editable de la ocurrencia.")
+
+def _conflicto(row, nuevo: dict, e):
+    # Sólo lo que el usuario cambió: el resto del form trae valores viejos que
+    # pisarían lo guardado por la otra sesión (como `mios` en la cola)
+    st.session_state["conflicto"]={"anterior":{c:row[c] for c in CAMPOS_EDITABLES},
+                                   "nuevo":almacen.editados(row,nuevo),
+                                   "titulo":row["Titulo"],"actual":e.actual,"campos":e.campos}
+    st.rerun()
+
+def vista_configuracion(alm):
     st.title("Configuración – Redes Sociales")
-    cfg=load_cfg(cli,sheet_id)
-    nuevos={}
+    cfg=load_cfg(alm); alias=load_alias(alm)
+    nuevos={}; nuevos_alias={}
+    st.caption("Alias: otros nombres de Plataforma que cuentan para la red (separados por coma).")
     for red in sorted(cfg):
-        c1,c2=st.columns([2,1]); c1.write(f"**{red}**")
-        nuevos[red]=c2.number_input("",value=cfg[red],min_value=0,key=f"cfg_{red}")
+        c1,c2,c3=st.columns([2,1,2]); c1.write(f"**{red}**")
+        nuevos[red]=c2.number_input("Requerido",value=cfg[red],min_value=0,key=f"cfg_{red}",
+                                    label_visibility="collapsed")
+        nuevos_alias[red]=c3.text_input("Alias",", ".join(alias.get(red,[])),key=f"alias_{red}",
+                                        label_visibility="collapsed")
     st.markdown("### Nueva red social")
     nueva=st.text_input("Nombre nueva red").strip()
     if nueva:
         req=st.number_input("Requerido",min_value=0,value=1)
         nuevos[nueva]=req
+        nuevos_alias[nueva]=st.text_input("Alias de la nueva red","")
     if st.button("Guardar"):
-        guardar_config(cli,sheet_id,nuevos); st.success("¡Configuración guardada!")
+        guardar_config(alm,nuevos,nuevos_alias); st.success("¡Configuración guardada!")
+    st.markdown("### Mantenimiento")
+    st.caption("Reescribe la hoja Data completa ordenada por fecha (una sola vez, no en cada edición).")
+    if st.button("Compactar hoja de datos"):
+        rechazados=guardar_datos(alm,load_df(alm)); st.success("¡Hoja compactada!")
+        if rechazados:
+            st.warning(f"{len(rechazados)} evento(s) cambiados por otra sesión se conservaron como están en el origen.")
+    if st.button("Recargar todo desde el origen"):
+        alm.invalidar(); _invalidar(alm)
+        st.success("Se descargará la hoja completa en la próxima lectura.")
+
+# ---------- IMPORTAR / EXPORTAR ----------
+def _validar_archivo(alm, archivo) -> dict:
+    """Lee y valida el archivo por lotes; sólo se guardan las filas válidas."""
+    val = intercambio.Validador(load_df(alm), load_cfg(alm), load_alias(alm))
+    validos, errores, dup = [], [], 0
+    with metricas.tramo("importar.validar", archivo=archivo.name) as ev:
+        for lote in intercambio.leer_lotes(archivo, archivo.name):
+            ok, dups, err = val.validar(lote)
+            validos.extend(ok.to_dict("records")); dup += len(dups)
+            if len(errores) < 500:
+                errores.extend(err.to_dict("records"))
+        ev.update(filas=val.filas, validos=len(validos), duplicados=dup)
+    return {"id": archivo.file_id, "filas": val.filas, "validos": validos,
+            "duplicados": dup, "errores": errores[:500]}
+
+def vista_datos(alm):
+    st.title("Importar / Exportar eventos")
+    st.markdown("### Importar")
+    st.caption("CSV, Excel (.xlsx) o iCalendar (.ics). Columnas: " + ", ".join(COLUMNS[:6])
+               + ". Los eventos repetidos (misma fecha, título y plataforma) se omiten.")
+    archivo = st.file_uploader("Archivo", type=["csv", "xlsx", "ics"], key="imp_archivo")
+    prev = st.session_state.get("imp_previa")
+    if archivo is None:
+        st.session_state.pop("imp_previa", None)
+    elif not prev or prev["id"] != archivo.file_id:
+        try:
+            prev = st.session_state["imp_previa"] = _validar_archivo(alm, archivo)
+        except ValueError as e:
+            st.session_state.pop("imp_previa", None); prev = None
+            st.error(str(e))
+    if archivo is not None and prev:
+        c1, c2, c3 = st.columns(3)
+        c1.metric("Válidos", len(prev["validos"]))
+        c2.metric("Duplicados", prev["duplicados"])
+        c3.metric("Con errores", prev["filas"] - len(prev["validos"]) - prev["duplicados"])
+        if prev["errores"]:
+            with st.expander("Filas con errores"):
+                st.dataframe(pd.DataFrame(prev["errores"]), hide_index=True, use_container_width=True)
+        if prev["validos"]:
+            st.dataframe(pd.DataFrame(prev["validos"][:20])[COLUMNS[:6]], hide_index=True,
+                         use_container_width=True)
+            if st.button(f"Importar {len(prev['validos'])} eventos", type="primary"):
+                n = importar_eventos(alm, prev["validos"])
+                prev["validos"] = []          # un segundo clic no los duplica
+                st.success(f"¡{n} eventos importados!")
+
+    st.markdown("### Exportar")
+    hoy = datetime.date.today()
+    c1, c2, c3 = st.columns(3)
+    desde   = c1.date_input("Desde", datetime.date(hoy.year, 1, 1), key="exp_desde")
+    hasta   = c2.date_input("Hasta", datetime.date(hoy.year, 12, 31), key="exp_hasta")
+    formato = c3.radio("Formato", ["csv", "ics"], horizontal=True, key="exp_formato",
+                       format_func=str.upper)
+    if hasta < desde:
+        st.warning("La fecha final es anterior a la inicial."); return
+
+    def _archivo():
+        # Se genera recién al descargar; el almacén ya entrega sólo el rango si puede
+        fin = hasta + datetime.timedelta(days=1)
+        with metricas.tramo("exportar", formato=formato):
+            head, rows = alm.eventos(desde, fin)
+            with intercambio.exportar(head, rows, desde, fin, formato) as f:
+                return f.read()
+    st.download_button(f"Descargar {formato.upper()}", _archivo,
+                       file_name=f"calendario_{desde:%Y%m%d}_{hasta:%Y%m%d}.{formato}",
+                       mime=intercambio.MIME[formato])
 
 # ---------- VISTA MENSUAL ----------
-def vista_mensual(df: pd.DataFrame, cfg: dict):
+CSS_MENSUAL = """
+<style>
+div[data-testid="stDataFrame"]{width:fit-content !important;margin-left:auto;}
+div[data-testid="stDataFrame"] tbody tr td:nth-last-child(-n+2){
+    text-align:right !important;white-space:nowrap !important;}
+.semanas{border-collapse:collapse}
+.semanas th,.semanas td{border:1px solid #e6e6e6;padding:4px 12px;text-align:center}
+</style>"""
+
+def _html_semanas(mat: pd.DataFrame, anio: int, mes: int, cfg: dict) -> str:
+    """Estado de todas las semanas del mes (bloques de 7 días) en una tabla."""
+    ndays = calendar.monthrange(anio, mes)[1]
+    filas = ["<tr><th>Semana</th>" + "".join(f"<th>{html.escape(red)}</th>" for red in sorted(cfg)) + "</tr>"]
+    for semana, d in enumerate(range(1, ndays + 1, 7), start=1):
+        celdas = "".join(f"<td>{status_html(int(mat.at[(mes, semana), red]), cfg[red])}</td>"
+                         for red in sorted(cfg))
+        filas.append(f"<tr><td><b>S{semana}</b> ({d}–{min(d + 6, ndays)})</td>{celdas}</tr>")
+    return f"<table class='semanas'>{''.join(filas)}</table>"
+
+def vista_mensual(alm, cfg: dict):
     st.title("Vista Mensual – Semanas")
 
     # Selector de año (±10 desde hoy)
@@ -333,18 +780,46 @@ def vista_mensual(df: pd.DataFrame, cfg: dict):
         list(range(datetime.date.today().year - 10,
                    datetime.date.today().year + 11)), index=10)
 
-    df_y = df[df["Fecha"].dt.year == anio]
+    df_y = load_anio(alm, anio)
+    ix   = indice(df_y)
     if df_y.empty:
         st.info("Aún no hay eventos para este año, pero puedes cargarlos desde “Agregar Evento”.")
 
     meses = sorted(df_y["Fecha"].dt.month.unique()) if not df_y.empty else list(range(1,13))
     mes = st.selectbox("Mes", meses, format_func=lambda m: MESES[m-1])
-    df_m = df_y[df_y["Fecha"].dt.month == mes]
+    df_m = ix.mes(anio, mes)
+    mat  = matriz_pendientes(df_y, anio, cfg, tipo="bloque")
 
     st.markdown(f"## {MESES[mes-1]} {anio}")
 
     ndays = calendar.monthrange(anio, mes)[1]
-    weekday = ["Lunes","Martes","Miércoles","Jueves","Viernes","Sábado","Domingo"]
+
+    modo = st.radio("Modo", ["Compacto", "Detallado"], horizontal=True,
+                    help="Compacto: una tabla paginada para todo el mes. Detallado: una tabla por día.")
+    st.markdown(CSS_MENSUAL, unsafe_allow_html=True)
+    if modo == "Compacto":
+        st.markdown("**Estado por semana:**")
+        st.markdown(_html_semanas(mat, anio, mes, cfg), unsafe_allow_html=True)
+
+        # Eventos: una sola tabla, paginada en el servidor (sólo viaja la página)
+        con_eventos = sorted(int(x) for x in df_m["Fecha"].dt.day.unique())
+        dia = st.selectbox("Día", [0] + con_eventos, format_func=lambda x: "Todos" if x == 0 else
+                           f"{DIAS[datetime.date(anio, mes, x).weekday()]} {x}")
+        sub = df_m if dia == 0 else ix.dia(datetime.date(anio, mes, dia))
+        c1, c2 = st.columns(2)
+        tam = c1.selectbox("Filas por página", [50, 100, 250], index=1)
+        paginas = max(1, -(-len(sub) // tam))
+        pag = int(c2.number_input("Página", min_value=1, max_value=paginas, value=1))
+        trozo = sub.iloc[(pag - 1) * tam: pag * tam]
+        st.caption(f"{len(sub)} eventos · página {pag} de {paginas}")
+        st.dataframe(nucleo.listado_dia(trozo),
+                     hide_index=True, use_container_width=False,
+                     column_config={
+                         "Título":     st.column_config.TextColumn(width="large"),
+                         "Plataforma": st.column_config.TextColumn(width="small"),
+                         "Estado":     st.column_config.TextColumn(width="small"),
+                     })
+        return
 
     semana, d = 1, 1
     while d <= ndays:
@@ -355,20 +830,14 @@ def vista_mensual(df: pd.DataFrame, cfg: dict):
         # Días
         for day in dias:
             fecha = datetime.date(anio, mes, day)
-            st.markdown(f"**{weekday[fecha.weekday()]} {day}:**")
-            df_d = df_m[df_m["Fecha"].dt.day == day]
+            st.markdown(f"**{DIAS[fecha.weekday()]} {day}:**")
+            df_d = ix.dia(fecha)
 
             if df_d.empty:
                 st.markdown("- (vacío)")
             else:
                 # tabla compacta
                 mini = df_d[["Titulo", "Plataforma", "Estado"]].rename(columns={"Titulo": "Título"})
-                st.markdown("""
-                    <style>
-                    div[data-testid="stDataFrame"]{width:fit-content !important;margin-left:auto;}
-                    div[data-testid="stDataFrame"] tbody tr td:nth-last-child(-n+2){
-                        text-align:right !important;white-space:nowrap !important;}
-                    </style>""", unsafe_allow_html=True)
                 st.dataframe(mini, hide_index=True, use_container_width=False,
                              column_config={
                                  "Título":     st.column_config.TextColumn(width="large"),
@@ -380,32 +849,62 @@ def vista_mensual(df: pd.DataFrame, cfg: dict):
         st.markdown("**Estado de la semana:**")
         cols = st.columns(len(cfg))
         for i, red in enumerate(sorted(cfg)):
-            rn = norm(red)
-            pend = len(df_m[
-                (df_m["Fecha"].dt.day.isin(dias)) &
-                (df_m["Plataforma_norm"].str.contains(rn, na=False)) &
-                (df_m["Estado_norm"] != "publicado")])
+            pend = mat.at[(mes, semana), red]
             cols[i].markdown(
-                f"<div style='text-align:center'><strong>{red}</strong><br/>{status_html(pend, cfg[red])}</div>",
+                f"<div style='text-align:center'><strong>{html.escape(red)}</strong><br/>{status_html(pend, cfg[red])}</div>",
                 unsafe_allow_html=True)
         st.write("---")
         semana += 1
         d = fin + 1
 
 # ---------- VISTA ANUAL ----------
-def vista_anual(df: pd.DataFrame, cfg: dict):
+CSS_ANUAL = """
+<style>
+.anual{display:grid;grid-template-columns:repeat(auto-fill,minmax(330px,1fr));gap:18px}
+.anual table{border-collapse:collapse;width:100%;font-size:.85rem}
+.anual caption{font-weight:700;font-size:1.05rem;text-align:left;padding-bottom:4px}
+.anual th,.anual td{border:1px solid #e6e6e6;text-align:center;padding:3px 2px}
+.anual td a{display:block;color:inherit;text-decoration:none}
+.anual td.est{font-size:.7rem;text-align:left;white-space:nowrap}
+</style>
+"""
+
+@metricas.cacheada("html_anual", st.cache_data(max_entries=16))
+def _html_anual(_year_df, version, yr: int, cfg_items: tuple, cal: str = "") -> str:
+    """Todo el año como un solo bloque HTML: conteo por día (mapa de calor) y
+    estado semanal. Cada día es un link ?fecha=… (y &cal=… con varios
+    calendarios) que abre su detalle."""
+    cfg  = dict(cfg_items)
+    extra = f"&cal={quote(cal, safe='')}" if cal else ""
+    mat  = matriz_pendientes(_year_df, yr, cfg, tipo="calendario")
+    cnt  = nucleo.conteo_por_dia(_year_df)
+    tope = max(int(cnt.max()), 1)
+    meses = []
+    for mes in range(1, 13):
+        filas = ["<tr><th>Sem</th>" + "".join(f"<th>{d}</th>" for d in "LMXJVSD")
+                 + "<th>Estado</th></tr>"]
+        for wnum, week in enumerate(calendar.monthcalendar(yr, mes), start=1):
+            celdas = [f"<td><b>S{wnum}</b></td>"]
+            for d in week:
+                if d == 0:
+                    celdas.append("<td></td>")
+                    continue
+                f = datetime.date(yr, mes, d)
+                n = int(cnt[f.timetuple().tm_yday])
+                fondo = f"background:rgba(3,221,82,{0.15 + 0.85 * n / tope:.2f})" if n else ""
+                celdas.append(f"<td style='{fondo}' title='{n} evento(s)'>"
+                              f"<a href='{html.escape(f'?page=Anual&fecha={f.isoformat()}{extra}')}' target='_self'>{d}</a></td>")
+            estado = "<br>".join(f"{html.escape(red)}: {status_html(int(mat.at[(mes, wnum), red]), cfg[red])}"
+                                 for red in sorted(cfg)) or "-"
+            celdas.append(f"<td class='est'>{estado}</td>")
+            filas.append("<tr>" + "".join(celdas) + "</tr>")
+        meses.append(f"<table><caption>{MESES[mes-1]} {yr}</caption>{''.join(filas)}</table>")
+    return f"<div class='anual'>{''.join(meses)}</div>"
+
+def vista_anual(alm, cfg: dict, cal: str = ""):
     st.title("Vista Anual – Calendario")
 
-    yr = st.selectbox(
-        "Año",
-        list(range(datetime.date.today().year - 10,
-                   datetime.date.today().year + 11)), index=10)
-
-    year_df = df[df["Fecha"].dt.year == yr]
-    if year_df.empty:
-        st.info("Aún no hay eventos para este año, pero puedes cargarlos desde “Agregar Evento”.")
-
-    # Obtener la fecha seleccionada
+    # Obtener la fecha seleccionada (puede venir de ?fecha=AAAA-MM-DD)
     sel = st.session_state.get("selected_date")
     if isinstance(sel, str):
         try:
@@ -414,9 +913,20 @@ def vista_anual(df: pd.DataFrame, cfg: dict):
             sel = None
         st.session_state["selected_date"] = sel
 
+    anios = list(range(datetime.date.today().year - 10,
+                       datetime.date.today().year + 11))
+    yr = st.selectbox(
+        "Año", anios,
+        index=anios.index(sel.year) if isinstance(sel, datetime.date) and sel.year in anios else 10)
+
+    year_df = load_anio(alm, yr)
+    ix      = indice(year_df)
+    if year_df.empty:
+        st.info("Aún no hay eventos para este año, pero puedes cargarlos desde “Agregar Evento”.")
+
     # ---------- MODAL ----------
     if isinstance(sel, datetime.date):
-        dfe = year_df[year_df["Fecha"].dt.date == sel]
+        dfe = ix.dia(sel)
 
         # Mostrar ventana emergente con eventos del día
         with st.container():
@@ -439,8 +949,17 @@ def vista_anual(df: pd.DataFrame, cfg: dict):
         return  # Detener la ejecución para no mostrar el calendario
 
     # ---------- CALENDARIO ----------
+    modo = st.radio("Modo", ["Compacto", "Detallado"], horizontal=True,
+                    help="Compacto: un solo bloque HTML (rápido). Detallado: un botón por día.")
+    if modo == "Compacto":
+        st.markdown(CSS_ANUAL + _html_anual(year_df, year_df.attrs.get("version"), int(yr),
+                                            tuple(sorted(cfg.items())),
+                                            cal),
+                    unsafe_allow_html=True)
+        return
+
+    mat = matriz_pendientes(year_df, yr, cfg, tipo="calendario")
     for mes in range(1, 13):
-        mdf = year_df[year_df["Fecha"].dt.month == mes]
         st.markdown(f"### {MESES[mes-1]} {yr}")
 
         # Encabezado del calendario
@@ -466,46 +985,171 @@ def vista_anual(df: pd.DataFrame, cfg: dict):
 
             # Barra de estado semanal
             if valid:
-                wdf = mdf[mdf["Fecha"].dt.day.isin(valid)]
                 partes = []
                 for red in sorted(cfg):
-                    pend = len(wdf[
-                        (wdf["Plataforma_norm"].str.contains(norm(red), na=False)) &
-                        (wdf["Estado_norm"] != "publicado")
-                    ])
-                    partes.append(f"{red}: {status_html(pend, cfg[red])}")
+                    pend = mat.at[(mes, wnum), red]
+                    partes.append(f"{html.escape(red)}: {status_html(pend, cfg[red])}")
                 estado = "<br>".join(partes)
             else:
                 estado = "-"
             row[8].markdown(estado, unsafe_allow_html=True)
 
 
+# ---------- SINCRONIZACIÓN ----------
+@st.fragment(run_every=max(cola.INTERVALO, 1.0))
+def estado_sincronizacion(alm):
+    """Sidebar: cambios en cola, error del último envío y conflictos de esta
+    sesión. Se refresca solo cada INTERVALO segundos."""
+    q = cola_de(alm)
+    n = q.pendientes()
+    if n:
+        st.info(f"⏳ {n} cambio(s) pendientes de sincronizar")
+        if st.button("Sincronizar ahora", key="sync_ahora"):
+            try:
+                q.vaciar()
+            except Exception:
+                pass                      # se muestra ultimo_error
+            st.rerun()
+    else:
+        st.caption("✅ Todo sincronizado")
+    if q.ultimo_error:
+        st.error(f"No se pudo sincronizar: {q.ultimo_error}")
+    st.session_state.setdefault("conflictos_cola", []).extend(q.conflictos_de(_sesion()))
+    if st.session_state["conflictos_cola"]:
+        st.warning(f"{len(st.session_state['conflictos_cola'])} cambio(s) rechazados: "
+                   "otra sesión editó esos eventos.")
+        if st.button("Resolver", key="sync_resolver"):
+            st.session_state["page"] = "Editar"
+            st.rerun()
+
+# ---------- TODOS LOS CALENDARIOS ----------
+def vista_resumen(cals: dict):
+    """KPIs del año por calendario. Cada uno se resume con conteos agregados
+    (resumen_calendario): no se carga la tabla de eventos de ninguno."""
+    st.title("Resumen – todos los calendarios")
+    hoy = datetime.date.today().year
+    yr  = int(st.selectbox("Año", list(range(hoy - 10, hoy + 11)), index=10, key="res_anio"))
+
+    filas = []
+    for cal in cals.values():
+        try:
+            alm = abrir_almacen(cal)
+            kpi = resumen_calendario(alm, yr, _generacion(alm))
+        except Exception as e:
+            st.warning(f"{cal.nombre}: no se pudo leer ({type(e).__name__}: {e})")
+            continue
+        obj = kpi["objetivo_total"]
+        filas.append({"Calendario": cal.nombre, "Planificados": kpi["planeado_total"],
+                      "Objetivo": obj,
+                      "%": round(100 * kpi["planeado_total"] / obj, 1) if obj else None,
+                      **{e: int(kpi["vc_estado"][e]) for e in ESTADOS}})
+    if not filas:
+        return
+    tabla = pd.DataFrame(filas)
+    total = tabla[["Planificados", "Objetivo", *ESTADOS]].sum()
+    st.metric("⏱️ Eventos planificados / objetivo anual (todos)",
+              f"{total['Planificados']}/{total['Objetivo']}",
+              delta=f"{total['Planificados'] - total['Objetivo']}")
+    tabla = pd.concat([tabla, pd.DataFrame([{"Calendario": "Total", **total.to_dict(),
+        "%": round(100 * total["Planificados"] / total["Objetivo"], 1) if total["Objetivo"] else None}])],
+        ignore_index=True)
+    st.dataframe(tabla, hide_index=True, use_container_width=True)
+    fig = px.bar(tabla.iloc[:-1].melt(id_vars="Calendario", value_vars=ESTADOS,
+                                      var_name="Estado", value_name="Eventos"),
+                 x="Calendario", y="Eventos", color="Estado", barmode="stack")
+    st.plotly_chart(fig, use_container_width=True)
+
+# ---------- PANEL DE TIEMPOS ----------
+def panel_metricas(reg):
+    """Sidebar: tramos del rerun (anidados), contadores y aciertos de caché."""
+    with st.sidebar.expander(f"⏱️ {reg.total_ms():.0f} ms – {reg.etiqueta}", expanded=True):
+        st.dataframe(pd.DataFrame([{
+            "Tramo":  "\u00a0\u00a0" * t.get("nivel", 0) + t["tramo"],
+            "ms":     t.get("ms"),
+            "Caché":  t.get("cache", ""),
+            "API":    t.get("contadores", {}).get("api.llamadas", 0),
+            "Filas":  sum(v for k, v in t.get("contadores", {}).items() if k.startswith("filas.")),
+        } for t in reg.tramos]), hide_index=True, use_container_width=True)
+        st.caption(" · ".join(f"{k}: {v}" for k, v in sorted(reg.contadores.items())
+                              if not k.startswith("cache.")) or "Sin llamadas a la API")
+        mem = _memoria()
+        st.caption(f"Memoria de calendarios: {mem.total() / 2**20:.1f} / {mem.tope / 2**20:.0f} MB · "
+                   + (" · ".join(f"{k}: {b / 2**20:.1f}" for k, b in mem.estado()) or "vacía"))
+        st.markdown("**Caché (rerun / proceso)**")
+        proc = {n: (a, f) for n, a, f in metricas.resumen_cache(metricas.TOTALES)}
+        st.dataframe(pd.DataFrame([{"Función": n, "Aciertos": a, "Fallos": f,
+                                    "Aciertos proc.": proc.get(n, (0, 0))[0],
+                                    "Fallos proc.":   proc.get(n, (0, 0))[1]}
+                                   for n, a, f in metricas.resumen_cache(reg.contadores)]),
+                     hide_index=True, use_container_width=True)
+
 # ---------- MAIN ----------
 def main():
+    st.set_page_config(page_title="Calendario de Contenidos", layout="wide")
+    st.markdown(CSS_BASE, unsafe_allow_html=True)
+    reg = metricas.iniciar()
+
     params = st.query_params
-    if "page" in params:  st.session_state["page"] = params["page"][0]
-    if "fecha" in params: st.session_state["selected_date"] = params["fecha"][0]
+    if "page" in params:  st.session_state["page"] = params["page"]
+    if "fecha" in params: st.session_state["selected_date"] = params["fecha"]
+    # Se consumen una sola vez: si quedaran en la URL pisarían la navegación
+    for k in ("page", "fecha"):
+        if k in params:
+            del params[k]
     st.session_state.setdefault("page", "Dashboard")
 
-    cli = get_gsheet_connection()
-    SHEET_ID = st.secrets["SHEET_ID"]
-    df  = load_df(cli, SHEET_ID)
-    cfg = load_cfg(cli, SHEET_ID)
+    # -------- Calendario: ?cal=<slug> (enlaces) o el selector del sidebar
+    cals = calendarios_registrados()
+    if not cals:
+        st.error("No hay calendarios configurados (SHEET_ID o [calendarios] en secrets).")
+        st.stop()
+    if params.get("cal") in cals and params["cal"] != st.session_state.get("_cal_url"):
+        st.session_state["calendario"] = params["cal"]
+    if st.session_state.get("calendario") not in cals:
+        st.session_state["calendario"] = next(iter(cals))
+    if len(cals) > 1:
+        st.sidebar.selectbox("Calendario", list(cals), key="calendario",
+                             format_func=lambda s: cals[s].nombre)
+    slug = st.session_state["calendario"]
+    if st.session_state.get("_cal_sel") not in (None, slug):
+        # Lo elegido en otro calendario (IDs, archivo a importar) no vale aquí
+        for k in ("ed_id", "ed_pagina", "imp_previa"):
+            st.session_state.pop(k, None)
+    st.session_state["_cal_sel"] = st.session_state["_cal_url"] = slug
+    if len(cals) > 1:
+        params["cal"] = slug
+
+    alm = abrir_almacen(cals[slug])
+    _liberar(_memoria().usar(alm.clave))
+    cfg = load_cfg(alm)
 
     st.sidebar.title("Navegación")
     for lbl, pg in [("Dashboard","Dashboard"),("Agregar Evento","Agregar"),
                     ("Editar/Eliminar","Editar"),("Vista Mensual","Mensual"),
-                    ("Vista Anual","Anual"),("Configuración","Config")]:
+                    ("Vista Anual","Anual"),("Importar/Exportar","Datos"),
+                    ("Configuración","Config")]:
         if st.sidebar.button(lbl, key=f"side_{pg}"):
             st.session_state["page"] = pg
+    if len(cals) > 1 and st.sidebar.button("Todos los calendarios", key="side_Resumen"):
+        st.session_state["page"] = "Resumen"
 
     pg = st.session_state["page"]
-    if pg == "Dashboard": dashboard(df, cfg)
-    elif pg == "Agregar": vista_agregar(df, cli, SHEET_ID)
-    elif pg == "Editar":  vista_editar_eliminar(df, cli, SHEET_ID)
-    elif pg == "Mensual": vista_mensual(df, cfg)
-    elif pg == "Anual":   vista_anual(df, cfg)
-    elif pg == "Config":  vista_configuracion(cli, SHEET_ID)
+    reg.etiqueta = f"{slug}/{pg}" if len(cals) > 1 else pg
+    with metricas.tramo(f"vista.{pg}"):
+        if pg == "Dashboard": dashboard(alm, cfg)
+        elif pg == "Agregar": vista_agregar(alm)
+        elif pg == "Editar":  vista_editar_eliminar(alm)
+        elif pg == "Mensual": vista_mensual(alm, cfg)
+        elif pg == "Anual":   vista_anual(alm, cfg, slug if len(cals) > 1 else "")
+        elif pg == "Datos":   vista_datos(alm)
+        elif pg == "Config":  vista_configuracion(alm)
+        elif pg == "Resumen": vista_resumen(cals)
+    if cola_de(alm):            # después de la vista: ya cuenta lo que se acaba de encolar
+        with st.sidebar:
+            estado_sincronizacion(alm)
+    metricas.cerrar()
+    if st.sidebar.toggle("Panel de tiempos", key="panel_metricas"):
+        panel_metricas(reg)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,179 @@
+# ======================================================
+# HOJA FALSA – reemplazo en memoria de gspread Client / Spreadsheet / Worksheet
+# ------------------------------------------------------
+# * Implementa sólo lo que usa almacen.HojaGoogle
+# * Latencia simulada por llamada y contador de llamadas / celdas transferidas
+# ======================================================
+
+import re, time
+from collections import Counter
+import gspread
+from gspread.utils import a1_to_rowcol
+
+# Métodos que modifican la planilla (cambian la revisión de Drive)
+_ESCRITURAS = {"append_row", "append_rows", "clear", "delete_rows", "update", "batch_update"}
+
+
+class Metricas:
+    def __init__(self):
+        self.llamadas = Counter()
+        self.celdas = 0
+
+    def reset(self):
+        self.llamadas.clear()
+        self.celdas = 0
+
+    def resumen(self) -> dict:
+        return {"llamadas": sum(self.llamadas.values()), "celdas": self.celdas,
+                "por_metodo": dict(self.llamadas)}
+
+
+def _col_num(letras: str) -> int:
+    n = 0
+    for ch in letras:
+        n = n * 26 + ord(ch) - 64
+    return n
+
+
+class HojaFalsa:
+    """Worksheet en memoria (filas como listas de strings)."""
+
+    def __init__(self, planilla, title, rows=None):
+        self.planilla, self.title = planilla, title
+        self.spreadsheet, self.id = planilla, len(planilla.hojas)
+        self.rows = [list(map(str, r)) for r in (rows or [])]
+
+    def _llamada(self, metodo, celdas=0):
+        p = self.planilla
+        p.metricas.llamadas[metodo] += 1
+        p.metricas.celdas += celdas
+        if metodo in _ESCRITURAS:
+            p.revision += 1
+        if p.latencia:
+            time.sleep(p.latencia)
+
+    # --- lectura
+    def _rango(self, rng):
+        a, _, b = rng.split("!")[-1].partition(":")
+        def partes(x):
+            m = re.match(r"([A-Z]*)(\d*)$", x)
+            return (int(m.group(2)) if m.group(2) else None, _col_num(m.group(1)) or None)
+        (r0, c0), (r1, c1) = partes(a), partes(b or a)
+        r0, r1, c0 = r0 or 1, r1 or len(self.rows), c0 or 1
+        out = [r[c0 - 1:c1 or len(r)] for r in self.rows[r0 - 1:r1]]
+        # Como la API: se omiten filas vacías al final y celdas vacías a la derecha
+        out = [r[:max([i + 1 for i, v in enumerate(r) if v != ""], default=0)] for r in out]
+        while out and not out[-1]:
+            out.pop()
+        return out
+
+    def get_all_values(self, *a, **k):
+        self._llamada("get_all_values", sum(map(len, self.rows)))
+        ancho = max(map(len, self.rows), default=0)
+        return [r + [""] * (ancho - len(r)) for r in self.rows]
+
+    def row_values(self, fila, *a, **k):
+        vals = self._rango(f"{fila}:{fila}")
+        self._llamada("row_values", sum(map(len, vals)))
+        return vals[0] if vals else []
+
+    def batch_get(self, rangos, *a, **k):
+        res = [self._rango(r) for r in rangos]
+        self._llamada("batch_get", sum(len(r) for vr in res for r in vr))
+        return res
+
+    def find(self, query, in_row=None, in_column=None, **k):
+        self._llamada("find", sum(map(len, self.rows)))      # gspread baja la hoja entera
+        for i, r in enumerate(self.rows, start=1):
+            if in_column and len(r) >= in_column and r[in_column - 1] == query:
+                return gspread.cell.Cell(i, in_column, query)
+        return None
+
+    # --- escritura
+    def _escribir(self, rng, valores):
+        r0, c0 = a1_to_rowcol(rng.split("!")[-1].split(":")[0])
+        for i, fila in enumerate(valores):
+            while len(self.rows) < r0 + i:
+                self.rows.append([])
+            dest = self.rows[r0 + i - 1]
+            for j, v in enumerate(fila):
+                while len(dest) < c0 + j:
+                    dest.append("")
+                dest[c0 + j - 1] = str(v)
+
+    def update(self, values=None, range_name=None, **k):
+        if isinstance(values, str):           # firma vieja update("A1", valores)
+            values, range_name = range_name, values
+        self._llamada("update", sum(map(len, values)))
+        self._escribir(range_name or "A1", values)
+
+    def batch_update(self, data, **k):
+        self._llamada("batch_update", sum(len(f) for d in data for f in d["values"]))
+        for d in data:
+            self._escribir(d["range"], d["values"])
+
+    def append_row(self, values, **k):
+        self._llamada("append_row", len(values))
+        self.rows.append(list(map(str, values)))
+
+    def append_rows(self, values, **k):
+        self._llamada("append_rows", sum(map(len, values)))
+        self.rows.extend(list(map(str, v)) for v in values)
+
+    def delete_rows(self, inicio, fin=None):
+        self._llamada("delete_rows")
+        del self.rows[inicio - 1:(fin or inicio)]
+
+    def clear(self):
+        self._llamada("clear")
+        self.rows = []
+
+
+class PlanillaFalsa:
+    def __init__(self, clave, latencia=0.0):
+        self.id, self.latencia = clave, latencia
+        self.hojas, self.revision, self.metricas = {}, 0, Metricas()
+
+    def worksheet(self, titulo):
+        self.metricas.llamadas["worksheet"] += 1
+        if titulo not in self.hojas:
+            raise gspread.exceptions.WorksheetNotFound(titulo)
+        return self.hojas[titulo]
+
+    def add_worksheet(self, title, rows=None, cols=None, **k):
+        self.metricas.llamadas["add_worksheet"] += 1
+        self.hojas[title] = HojaFalsa(self, title)
+        return self.hojas[title]
+
+    def batch_update(self, body):
+        """Sólo deleteDimension de filas (lo que usa aplicar_lote)."""
+        self.metricas.llamadas["spreadsheet.batch_update"] += 1
+        self.revision += 1
+        hojas = {h.id: h for h in self.hojas.values()}
+        for req in body["requests"]:
+            r = req["deleteDimension"]["range"]
+            del hojas[r["sheetId"]].rows[r["startIndex"]:r["endIndex"]]
+        if self.latencia:
+            time.sleep(self.latencia)
+
+    def get_lastUpdateTime(self):
+        self.metricas.llamadas["get_lastUpdateTime"] += 1
+        if self.latencia:
+            time.sleep(self.latencia)
+        return str(self.revision)
+
+
+class ClienteFalso:
+    """Sustituto de gspread.Client: open_by_key devuelve planillas en memoria."""
+
+    def __init__(self, latencia=0.0):
+        self.latencia, self.planillas = latencia, {}
+
+    def open_by_key(self, clave):
+        if clave not in self.planillas:
+            self.planillas[clave] = PlanillaFalsa(clave, self.latencia)
+        p = self.planillas[clave]
+        p.metricas.llamadas["open_by_key"] += 1
+        if self.latencia:
+            time.sleep(self.latencia)
+        return p
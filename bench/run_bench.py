@@ -0,0 +1,177 @@
+# ======================================================
+# BENCHMARK – tiempos del calendario sin Streamlit ni credenciales
+# ------------------------------------------------------
+#   python bench/run_bench.py                          # 1k, 10k y 100k eventos
+#   python bench/run_bench.py -n 1000000 --latencia 0.15
+#   python bench/run_bench.py --salida nuevo.json --comparar base.json
+#
+# Usa datos sintéticos (bench/sinteticos.py) sobre una planilla falsa en
+# memoria (bench/hoja_falsa.py) y el snapshot local en un directorio temporal.
+# ======================================================
+
+import os, sys, json, time, logging, argparse, platform, tempfile, statistics, subprocess
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+_TMP = tempfile.mkdtemp()
+os.environ.setdefault("CALENDARIO_CACHE", os.path.join(_TMP, "bench.sqlite"))
+os.environ.setdefault("CALENDARIO_COLA", os.path.join(_TMP, "cola.sqlite"))
+os.environ.setdefault("CALENDARIO_COLA_SEG", "0")     # escrituras directas; la cola se mide aparte
+
+import pandas as pd
+import app, almacen, nucleo, cola, recurrencia
+from bench.hoja_falsa import ClienteFalso
+from bench.sinteticos import generar_eventos, config_para
+
+# En modo "bare" Streamlit avisa en cada llamada cacheada que no hay runtime
+for _n in list(logging.root.manager.loggerDict):
+    if _n.startswith("streamlit"):
+        logging.getLogger(_n).setLevel(logging.ERROR)
+
+
+def _medir(fn, rep: int, antes=None, metricas=None) -> tuple:
+    """Mediana en ms de `rep` ejecuciones y llamadas / celdas por ejecución.
+    `antes` corre fuera del cronómetro y de los contadores."""
+    tiempos, llamadas, celdas = [], 0, 0
+    for _ in range(rep):
+        if antes:
+            antes()
+        if metricas:
+            metricas.reset()
+        t = time.perf_counter()
+        fn()
+        tiempos.append(time.perf_counter() - t)
+        if metricas:
+            api = metricas.resumen()
+            llamadas, celdas = llamadas + api["llamadas"], celdas + api["celdas"]
+    return statistics.median(tiempos) * 1000, llamadas // rep, celdas // rep
+
+
+def bench_tamano(n: int, latencia: float, rep: int) -> dict:
+    cli  = ClienteFalso(latencia)
+    shid = f"bench-{n}"
+    sh   = cli.open_by_key(shid)
+    sh.add_worksheet(almacen.DATA_SHEET).rows   = [list(almacen.COLUMNS)] + generar_eventos(n)
+    sh.add_worksheet(almacen.CONFIG_SHEET).rows = [["Red", "Requerido", "Alias"]] + config_para()
+    alm = almacen.HojaGoogle(cli, shid)
+    res = {}
+
+    def op(nombre, fn, antes=None):
+        ms, llamadas, celdas = _medir(fn, rep, antes, sh.metricas)
+        res[nombre] = {"ms": round(ms, 2), "llamadas": llamadas, "celdas": celdas}
+
+    def en_frio():
+        alm.invalidar()
+        app.load_df.clear()
+        app._config_rows.clear()
+
+    # --- lectura
+    op("load_df_completo", lambda: app.load_df(alm), en_frio)
+    op("load_df_snapshot", lambda: app.load_df(alm), app.load_df.clear)
+    df    = app.load_df(alm)
+    cfg   = app.load_cfg(alm)
+    alias = app.load_alias(alm)
+    head, rows = alm.eventos()
+    op("preparar", lambda: nucleo.preparar(head, rows, cfg, alias))
+    op("indice", lambda: nucleo.IndiceEventos(df))
+
+    # --- vistas (sólo la preparación de datos, sin render)
+    yr    = int(df["Fecha"].dt.year.mode()[0])
+    df_yr = app.load_anio(alm, yr)
+    ver   = df_yr.attrs["version"]
+    items = tuple(sorted(cfg.items()))
+    op("nucleo_kpis", lambda: nucleo.kpis_anio(df_yr, yr, cfg))
+    op("nucleo_pendientes", lambda: nucleo.matriz_pendientes(df_yr, sorted(cfg)))
+    op("dashboard_kpis", lambda: app.kpis_anio(df_yr, ver, yr, items), app.kpis_anio.clear)
+    op("matriz_pendientes", lambda: app.matriz_pendientes(df_yr, yr, cfg), app._pendientes.clear)
+    op("anual_html", lambda: app._html_anual(df_yr, ver, yr, items),
+       lambda: (app._html_anual.clear(), app._pendientes.clear()))
+    fin = pd.Timestamp(f"{yr + 1}-01-01")
+    op("editar_pagina", lambda: app.buscar_eventos(alm, pd.Timestamp(f"{yr}-01-01"), fin,
+                                                   ("Instagram",), (), "evento 1", 0, 50, ""),
+       app.buscar_eventos.clear)
+    # 100 series semanales sobre el año (la vista pide sólo ese año)
+    series = df.iloc[:100].assign(Repetir="FREQ=WEEKLY;BYDAY=MO,TH")
+    op("expandir_anio", lambda: recurrencia.expandir(df_yr, series, f"{yr}-01-01", fin))
+    op("mensual_pagina", lambda: nucleo.listado_dia(app.indice(df_yr).mes(yr, 6).iloc[:100]))
+    # KPIs de un calendario para "Todos los calendarios" (conteos, sin load_df)
+    op("resumen_anio", lambda: app.resumen_calendario(alm, yr, ""), app.resumen_calendario.clear)
+
+    # --- escritura
+    eid   = df["ID"].iloc[len(df) // 2]
+    fila  = lambda: app.indice(app.load_df(alm)).fila(eid)   # versión vigente (Rev)
+    nuevo = {"Fecha": pd.Timestamp(f"{yr}-06-15"), "Titulo": "bench", "Festividad": "",
+             "Plataforma": "Blog", "Estado": "Diseño", "Notas": ""}
+    op("agregar_evento", lambda: app.agregar_evento(alm, nuevo))
+    vigente = {}
+    op("actualizar_evento", lambda: app.actualizar_evento(alm, vigente["fila"], {"Titulo": f"bench {time.time()}"}),
+       lambda: vigente.update(fila=fila()))
+    ids = [app.agregar_evento(alm, nuevo) for _ in range(rep)]
+    op("eliminar_evento", lambda: app.eliminar_evento(alm, ids.pop()))
+    op("load_df_delta", lambda: app.load_df(alm),
+       lambda: (app.actualizar_evento(alm, fila(), {"Notas": f"{time.time()}"}), app.load_df.clear()))
+    # 50 altas seguidas: directas vs. encoladas y enviadas en un lote
+    op("altas_50_directas", lambda: [alm.agregar(nuevo) for _ in range(50)])
+    q = cola.ColaEscritura(alm, intervalo=0)
+    op("altas_50_cola", lambda: ([q.agregar(nuevo) for _ in range(50)], q.vaciar()))
+    op("guardar_datos", lambda: app.guardar_datos(alm, df))
+    return res
+
+
+def _commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ,
+                              capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ""
+
+
+def comparar(base: dict, actual: dict, umbral: float) -> int:
+    """Imprime ms base → actual por operación; devuelve cuántas empeoraron
+    más que `umbral` (1.2 = 20 % más lento)."""
+    peores = 0
+    print(f"\n{'n':>8} {'operación':<20} {'base ms':>10} {'actual ms':>10} {'ratio':>7}")
+    for n, ops in actual["resultados"].items():
+        for nombre, r in ops.items():
+            b = base.get("resultados", {}).get(n, {}).get(nombre)
+            if not b:
+                continue
+            ratio = r["ms"] / b["ms"] if b["ms"] else float("inf")
+            marca = "  ▲ regresión" if ratio > umbral else ""
+            peores += bool(marca)
+            print(f"{n:>8} {nombre:<20} {b['ms']:>10.1f} {r['ms']:>10.1f} {ratio:>7.2f}{marca}")
+    return peores
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("-n", "--tamanos", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    ap.add_argument("--latencia", type=float, default=0.0,
+                    help="segundos simulados por llamada a la API")
+    ap.add_argument("--rep", type=int, default=3, help="repeticiones por operación (mediana)")
+    ap.add_argument("--salida", default=os.path.join(RAIZ, "bench", "resultado.json"))
+    ap.add_argument("--comparar", help="reporte JSON de una versión anterior")
+    ap.add_argument("--umbral", type=float, default=1.2)
+    args = ap.parse_args()
+
+    reporte = {"meta": {"commit": _commit(), "fecha": time.strftime("%Y-%m-%d %H:%M:%S"),
+                        "python": platform.python_version(), "pandas": pd.__version__,
+                        "latencia": args.latencia, "rep": args.rep},
+               "resultados": {}}
+    for n in args.tamanos:
+        print(f"== {n:,} eventos", flush=True)
+        reporte["resultados"][str(n)] = r = bench_tamano(n, args.latencia, args.rep)
+        for nombre, v in r.items():
+            print(f"  {nombre:<20} {v['ms']:>10.1f} ms  {v['llamadas']:>4} llamadas  {v['celdas']:>9} celdas")
+
+    with open(args.salida, "w", encoding="utf-8") as f:
+        json.dump(reporte, f, indent=2, ensure_ascii=False)
+    print(f"\nReporte: {args.salida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            sys.exit(1 if comparar(json.load(f), reporte, args.umbral) else 0)
+
+
+if __name__ == "__main__":
+    main()
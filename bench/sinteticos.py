@@ -0,0 +1,32 @@
+# ======================================================
+# DATOS SINTÉTICOS – calendarios de 1k a 1M eventos
+# ======================================================
+
+import numpy as np
+
+REDES   = ["Instagram", "Facebook", "TikTok", "Blog", "Twitter"]
+ESTADOS = ["Planeación", "Diseño", "Programado", "Publicado"]
+
+
+def generar_eventos(n: int, anios=(2025, 2026), redes=REDES, estados=ESTADOS,
+                    formato_mixto=True, semilla=0) -> list:
+    """Filas de la hoja Data (orden almacen.COLUMNS, todo como texto).
+    Con `formato_mixto` un tercio de las fechas va en DD/MM/AAAA, como pasa
+    en hojas editadas a mano."""
+    rng   = np.random.default_rng(semilla)
+    ini   = np.datetime64(f"{min(anios)}-01-01")
+    dias  = (np.datetime64(f"{max(anios) + 1}-01-01") - ini).astype(int)
+    fecha = ini + rng.integers(0, dias, n).astype("timedelta64[D]")
+    iso   = np.datetime_as_string(fecha, unit="D")
+    if formato_mixto:
+        latino = rng.random(n) < 1 / 3
+        iso[latino] = [f"{s[8:10]}/{s[5:7]}/{s[:4]}" for s in iso[latino]]
+    red    = np.asarray(redes)[rng.integers(0, len(redes), n)]
+    estado = np.asarray(estados)[rng.integers(0, len(estados), n)]
+    return [[f, f"Evento {i}", "", r, e, "", f"ev{i:012x}", "1", "", ""]
+            for i, (f, r, e) in enumerate(zip(iso.tolist(), red.tolist(), estado.tolist()))]
+
+
+def config_para(redes=REDES, requerido=5) -> list:
+    """Filas de la hoja Config para las redes dadas."""
+    return [[r, str(requerido), ""] for r in redes]
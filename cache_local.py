@@ -0,0 +1,100 @@
+# ======================================================
+# SNAPSHOT LOCAL – copia en disco (SQLite) de la hoja Data
+# ------------------------------------------------------
+# * Sobrevive reinicios y se comparte entre procesos de Streamlit (WAL)
+# * Manifiesto ID → Rev para sincronizar sólo las filas que cambiaron
+# ======================================================
+
+import os, json, time, sqlite3
+from contextlib import contextmanager
+from typing import NamedTuple
+
+RUTA = os.environ.get(
+    "CALENDARIO_CACHE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "calendario.sqlite"))
+
+# Cada cuánto se descarta el manifiesto y se baja la hoja completa (segundos).
+# Cubre ediciones hechas a mano en Google Sheets que no incrementan "Rev".
+RESYNC_COMPLETO = int(os.environ.get("CALENDARIO_RESYNC", "3600"))
+
+
+class Snapshot(NamedTuple):
+    encabezado: list
+    filas: dict        # ID → fila (lista de strings, en orden de encabezado)
+    revs: dict         # ID → Rev
+    revision: str      # modifiedTime de la planilla al sincronizar
+    completo: float    # epoch de la última descarga completa
+
+
+@contextmanager
+def _con():
+    """Conexión de corta vida: commit al salir sin error y cierre siempre."""
+    os.makedirs(os.path.dirname(RUTA), exist_ok=True)
+    con = sqlite3.connect(RUTA, timeout=30)
+    try:
+        con.execute("PRAGMA journal_mode=WAL")
+        con.executescript("""
+            CREATE TABLE IF NOT EXISTS filas(
+                hoja TEXT, id TEXT, rev TEXT, datos TEXT, PRIMARY KEY(hoja, id));
+            CREATE TABLE IF NOT EXISTS meta(
+                hoja TEXT PRIMARY KEY, encabezado TEXT, revision TEXT, completo REAL);
+        """)
+        with con:
+            yield con
+    finally:
+        con.close()
+
+
+def leer(hoja: str):
+    """Snapshot guardado para `hoja` o None si no existe."""
+    with _con() as con:
+        meta = con.execute("SELECT encabezado, revision, completo FROM meta WHERE hoja=?",
+                           (hoja,)).fetchone()
+        if meta is None:
+            return None
+        filas, revs = {}, {}
+        for eid, rev, datos in con.execute(
+                "SELECT id, rev, datos FROM filas WHERE hoja=? ORDER BY rowid", (hoja,)):
+            filas[eid] = json.loads(datos)
+            revs[eid]  = rev
+    return Snapshot(json.loads(meta[0]), filas, revs, meta[1] or "", meta[2] or 0.0)
+
+
+def _upsert(con, hoja, filas, revs):
+    con.executemany(
+        "INSERT OR REPLACE INTO filas(hoja, id, rev, datos) VALUES (?,?,?,?)",
+        [(hoja, eid, revs.get(eid, ""), json.dumps(fila, ensure_ascii=False))
+         for eid, fila in filas.items()])
+
+
+def reemplazar(hoja: str, encabezado: list, filas: dict, revs: dict, revision: str):
+    """Guarda una descarga completa (una transacción: los demás procesos nunca
+    ven un snapshot a medias)."""
+    with _con() as con:
+        con.execute("DELETE FROM filas WHERE hoja=?", (hoja,))
+        _upsert(con, hoja, filas, revs)
+        con.execute("INSERT OR REPLACE INTO meta VALUES (?,?,?,?)",
+                    (hoja, json.dumps(encabezado, ensure_ascii=False), revision, time.time()))
+
+
+def aplicar(hoja: str, cambios: dict, revs: dict, borrados, revision: str):
+    """Aplica un delta: upsert de `cambios`, baja de `borrados`, nueva revisión."""
+    with _con() as con:
+        con.executemany("DELETE FROM filas WHERE hoja=? AND id=?",
+                        [(hoja, eid) for eid in borrados])
+        _upsert(con, hoja, cambios, revs)
+        con.execute("UPDATE meta SET revision=? WHERE hoja=?", (revision, hoja))
+
+
+def caducar(hoja: str):
+    """Olvida la revisión guardada: la próxima lectura corre el delta ID/Rev
+    aunque la planilla no informe cambios (p. ej. tras escribir nosotros)."""
+    with _con() as con:
+        con.execute("UPDATE meta SET revision='' WHERE hoja=?", (hoja,))
+
+
+def invalidar(hoja: str):
+    """Fuerza una descarga completa en la próxima lectura."""
+    with _con() as con:
+        con.execute("DELETE FROM filas WHERE hoja=?", (hoja,))
+        con.execute("DELETE FROM meta WHERE hoja=?", (hoja,))
@@ -0,0 +1,118 @@
+# ======================================================
+# CALENDARIOS – varias marcas en una sola instancia de la app
+# ------------------------------------------------------
+# * Registro: slug → (nombre, fuente) desde secrets / variables de entorno
+# * Cada calendario tiene su propio espacio en las cachés (la clave del
+#   almacén); MemoriaLRU pone un tope de memoria a los df cacheados y
+#   desaloja los calendarios usados hace más tiempo
+# ======================================================
+
+import time, threading
+from collections import OrderedDict
+from typing import NamedTuple
+from nucleo import norm
+
+
+class Calendario(NamedTuple):
+    slug: str
+    nombre: str
+    fuente: str        # ID de planilla o ruta de la base SQLite
+
+
+def _slug(t: str) -> str:
+    return "-".join(norm(t).replace("_", " ").split()) or "principal"
+
+def registro(tabla=None, unico: str = "") -> dict:
+    """slug → Calendario. `tabla` es {slug: fuente} o {slug: {nombre, fuente}}
+    (secrets [calendarios]) o el texto "slug=fuente,slug=fuente" (variable
+    de entorno); sin tabla, `unico` es el calendario "principal"."""
+    if isinstance(tabla, str):
+        tabla = dict(p.split("=", 1) for p in tabla.split(",") if "=" in p)
+    cals = {}
+    for clave, v in (tabla or {}).items():
+        if hasattr(v, "get"):
+            nombre, fuente = v.get("nombre", clave), v.get("fuente") or v.get("sheet_id", "")
+        else:
+            nombre, fuente = clave, v
+        slug = _slug(str(clave))
+        cals[slug] = Calendario(slug, str(nombre).strip(), str(fuente).strip())
+    if not cals and unico:
+        cals["principal"] = Calendario("principal", "Principal", unico)
+    return cals
+
+
+class MemoriaLRU:
+    """Presupuesto de memoria (bytes) para lo cacheado por calendario. Cada
+    calendario suma sus partes (df completo, rangos, índice, expansiones):
+    `registrar` anota el tamaño de una parte junto con la función que la
+    libera; `usar` marca el calendario como reciente. Ambos devuelven
+    [(clave, [liberar])] de los calendarios menos recientes a desalojar hasta
+    volver bajo el tope; el actual nunca se desaloja."""
+
+    def __init__(self, tope_bytes: int):
+        self.tope   = tope_bytes
+        self._items = OrderedDict()        # clave → {parte: (bytes, liberar, vence, n)}
+        self._n     = 0                    # orden de registro (para el cupo)
+        self._lock  = threading.Lock()
+
+    def _purgar(self):
+        """Quita las partes vencidas (ttl): Streamlit ya las soltó."""
+        ahora = time.monotonic()
+        for partes in self._items.values():
+            for p in [p for p, (_, _, vence, _) in partes.items() if vence and vence <= ahora]:
+                del partes[p]
+
+    def _total(self) -> int:
+        return sum(b for partes in self._items.values() for b, *_ in partes.values())
+
+    def total(self) -> int:
+        with self._lock:
+            self._purgar()
+            return self._total()
+
+    def _sobrantes(self, actual) -> list:
+        self._purgar()
+        fuera = []
+        while self._total() > self.tope and len(self._items) > 1:
+            clave = next(iter(self._items))
+            if clave == actual:
+                self._items.move_to_end(clave)
+                continue
+            fuera.append((clave, [f for _, f, *_ in self._items.pop(clave).values() if f]))
+        return fuera
+
+    def usar(self, clave) -> list:
+        with self._lock:
+            self._items.setdefault(clave, {})
+            self._items.move_to_end(clave)
+            return self._sobrantes(clave)
+
+    def registrar(self, clave, parte: str, nbytes: int, liberar=None,
+                  ttl: float = None, cupo: int = None) -> list:
+        """`parte` es la clave de caché de lo registrado ("rango:<args>"):
+        registrarla de nuevo reemplaza su tamaño. `ttl` y `cupo` son los de
+        la caché (ttl / max_entries): lo que Streamlit descarta por su cuenta
+        deja de contar. El cupo es por tipo (el prefijo antes de ":") y
+        compartido entre calendarios, como el max_entries de la función."""
+        with self._lock:
+            self._n += 1
+            vence = time.monotonic() + ttl if ttl else None
+            self._items.setdefault(clave, {})[parte] = (int(nbytes), liberar, vence, self._n)
+            self._items.move_to_end(clave)
+            if cupo:
+                tipo = parte.partition(":")[0] + ":"
+                mismas = sorted((n, k, p) for k, partes in self._items.items()
+                                for p, (_, _, _, n) in partes.items() if p.startswith(tipo))
+                for _, k, p in mismas[:-cupo]:
+                    del self._items[k][p]
+            return self._sobrantes(clave)
+
+    def olvidar(self, clave):
+        with self._lock:
+            self._items.pop(clave, None)
+
+    def estado(self) -> list:
+        """[(clave, bytes)] del menos al más reciente."""
+        with self._lock:
+            self._purgar()
+            return [(k, sum(b for b, *_ in partes.values())) for k, partes in self._items.items()]
@@ -0,0 +1,182 @@
+# ======================================================
+# COLA DE ESCRITURA – altas / ediciones / bajas en segundo plano
+# ------------------------------------------------------
+# * El formulario responde al instante: la operación queda en un spool SQLite
+#   (sobrevive a un reinicio) y un hilo la envía cada INTERVALO segundos
+# * Al enviar se combinan las operaciones por evento (alta+edición = alta,
+#   alta+baja = nada, ediciones sucesivas = una) y se aplican en lote
+# * CALENDARIO_COLA_SEG=0 desactiva la cola: cada escritura es inmediata
+# ======================================================
+
+import os, json, time, sqlite3, threading
+from contextlib import contextmanager
+import almacen, metricas
+
+RUTA = os.environ.get(
+    "CALENDARIO_COLA",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "cola.sqlite"))
+INTERVALO = float(os.environ.get("CALENDARIO_COLA_SEG", "3"))
+# Un lote tomado por un proceso que murió a mitad de envío se libera después de esto
+TOMA_VENCE = 120
+
+
+@contextmanager
+def _con():
+    os.makedirs(os.path.dirname(RUTA), exist_ok=True)
+    con = sqlite3.connect(RUTA, timeout=30)
+    try:
+        con.execute("PRAGMA journal_mode=WAL")
+        con.executescript("""
+            CREATE TABLE IF NOT EXISTS cola(
+                n INTEGER PRIMARY KEY AUTOINCREMENT, almacen TEXT, sesion TEXT,
+                op TEXT, datos TEXT, tomado REAL);
+            CREATE TABLE IF NOT EXISTS conflictos(
+                n INTEGER PRIMARY KEY AUTOINCREMENT, almacen TEXT, sesion TEXT, datos TEXT);
+        """)
+        with con:
+            yield con
+    finally:
+        con.close()
+
+
+def _eid(op, datos):
+    return datos["ev"]["ID"] if op == "agregar" else datos["anterior"]["ID"]
+
+def combinar(ops: list) -> tuple:
+    """[(op, datos)] en orden → (altas, cambios, bajas) con una entrada por evento.
+    Cada edición aporta sólo los campos que cambió respecto a lo que leyó: un
+    formulario abierto antes de que se enviara la edición previa no la pisa."""
+    altas, cambios, bajas = {}, {}, {}
+    for op, d in ops:
+        eid = _eid(op, d)
+        if op == "agregar":
+            altas[eid] = dict(d["ev"])
+        elif op == "actualizar":
+            mios = almacen.editados(d["anterior"], d["nuevo"])
+            if eid in altas:
+                altas[eid].update(mios)
+            elif eid in cambios:
+                cambios[eid][1].update(mios)
+            else:
+                cambios[eid] = (d["anterior"], mios)
+        elif op == "eliminar":
+            if altas.pop(eid, None) is not None:
+                continue
+            previo = cambios.pop(eid, None)
+            bajas[eid] = previo[0] if previo else d["anterior"]
+    return list(altas.values()), list(cambios.values()), list(bajas.items())
+
+
+def _datos_conflicto(conf, anterior, nuevo) -> str:
+    actual = almacen.como_texto(conf.actual) if conf.actual is not None else None
+    return json.dumps({"eid": conf.eid, "actual": actual, "campos": conf.campos,
+                       "anterior": anterior, "nuevo": almacen.como_texto(nuevo)},
+                      ensure_ascii=False)
+
+def _conflicto(d) -> almacen.Conflicto:
+    conf = almacen.Conflicto(d["eid"], d["actual"], d["campos"])
+    conf.anterior, conf.nuevo = d["anterior"], d["nuevo"]
+    return conf
+
+
+class ColaEscritura:
+    """Write-behind para un almacén. `al_vaciar` se llama tras cada envío
+    (la app invalida ahí sus cachés). Los conflictos quedan en el spool, junto
+    a las operaciones: cualquier proceso se los entrega a su sesión."""
+
+    def __init__(self, alm, intervalo: float = INTERVALO, al_vaciar=None):
+        self.alm, self.intervalo, self.al_vaciar = alm, intervalo, al_vaciar
+        self.ultimo_error = None
+        self._lock = threading.Lock()
+        if intervalo > 0:
+            threading.Thread(target=self._bucle, daemon=True, name=f"cola:{alm.clave}").start()
+
+    # --- encolar (responde sin tocar el origen)
+    def _encolar(self, op, datos, sesion):
+        with _con() as con:
+            con.execute("INSERT INTO cola(almacen, sesion, op, datos) VALUES (?,?,?,?)",
+                        (self.alm.clave, sesion, op, json.dumps(datos, ensure_ascii=False)))
+        metricas.contar("cola.encoladas")
+
+    def agregar(self, ev: dict, sesion="") -> str:
+        ev = almacen.como_texto({**ev, "ID": ev.get("ID") or almacen.nuevo_id()})
+        self._encolar("agregar", {"ev": ev}, sesion)
+        return ev["ID"]
+
+    def actualizar(self, anterior, nuevo: dict, sesion=""):
+        self._encolar("actualizar", {"anterior": almacen.como_texto(anterior),
+                                     "nuevo": almacen.como_texto(nuevo)}, sesion)
+
+    def eliminar(self, eid, anterior=None, sesion=""):
+        """Sin `anterior` (o sin su Rev) el borrado no se versiona."""
+        ant = almacen.como_texto(anterior) if anterior is not None else {}
+        self._encolar("eliminar", {"anterior": {**ant, "ID": eid}}, sesion)
+
+    def pendientes(self) -> int:
+        with _con() as con:
+            return con.execute("SELECT COUNT(*) FROM cola WHERE almacen=?",
+                               (self.alm.clave,)).fetchone()[0]
+
+    def conflictos_de(self, sesion) -> list:
+        """Saca y devuelve los conflictos de una sesión. No toma `_lock` (que
+        se mantiene durante el envío): la transacción del spool alcanza."""
+        with _con() as con:
+            con.execute("BEGIN IMMEDIATE")
+            filas = con.execute("SELECT n, datos FROM conflictos WHERE almacen=? AND sesion=? "
+                                "ORDER BY n", (self.alm.clave, sesion)).fetchall()
+            con.executemany("DELETE FROM conflictos WHERE n=?", [(n,) for n, _ in filas])
+        return [_conflicto(json.loads(d)) for _, d in filas]
+
+    # --- enviar
+    def _tomar(self):
+        with _con() as con:
+            con.execute("BEGIN IMMEDIATE")       # dos procesos no toman el mismo lote
+            filas = con.execute(
+                "SELECT n, sesion, op, datos FROM cola WHERE almacen=? AND "
+                "(tomado IS NULL OR tomado < ?) ORDER BY n",
+                (self.alm.clave, time.time() - TOMA_VENCE)).fetchall()
+            con.executemany("UPDATE cola SET tomado=? WHERE n=?",
+                            [(time.time(), n) for n, *_ in filas])
+        return filas
+
+    def vaciar(self) -> int:
+        """Envía todo lo pendiente en un lote. Devuelve cuántas operaciones
+        se enviaron; si el origen falla quedan en el spool para el próximo intento."""
+        with self._lock, metricas.tramo("cola.vaciar") as ev:
+            filas = self._tomar()
+            if not filas:
+                return 0
+            ops    = [(op, json.loads(d)) for _, _, op, d in filas]
+            sesion = {_eid(op, d): s for (_, s, _, _), (op, d) in zip(filas, ops)}
+            altas, cambios, bajas = combinar(ops)
+            bajas  = [(eid, ant if "Rev" in ant else None) for eid, ant in bajas]
+            try:
+                choques = self.alm.aplicar_lote(altas, cambios, bajas)
+            except Exception as e:
+                with _con() as con:
+                    con.executemany("UPDATE cola SET tomado=NULL WHERE n=?", [(n,) for n, *_ in filas])
+                self.ultimo_error = f"{type(e).__name__}: {e}"
+                raise
+            # Cada conflicto lleva lo que la sesión leyó y quiso escribir (prompt de fusión)
+            origen = {eid: (ant or {"ID": eid}, {}) for eid, ant in bajas}
+            origen.update({ant["ID"]: (ant, mios) for ant, mios in cambios})
+            with _con() as con:
+                con.executemany("DELETE FROM cola WHERE n=?", [(n,) for n, *_ in filas])
+                con.executemany("INSERT INTO conflictos(almacen, sesion, datos) VALUES (?,?,?)",
+                                [(self.alm.clave, sesion.get(eid, ""),
+                                  _datos_conflicto(conf, *origen.get(eid, ({"ID": eid}, {}))))
+                                 for eid, conf in choques.items()])
+            self.ultimo_error = None
+            ev.update(ops=len(filas), altas=len(altas), cambios=len(cambios), bajas=len(bajas),
+                      conflictos=len(choques))
+        if self.al_vaciar:
+            self.al_vaciar()
+        return len(filas)
+
+    def _bucle(self):
+        while True:
+            time.sleep(self.intervalo)
+            try:
+                self.vaciar()
+            except Exception:
+                pass                  # queda en ultimo_error; se reintenta
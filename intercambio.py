@@ -0,0 +1,278 @@
+# ======================================================
+# IMPORTAR / EXPORTAR – CSV, Excel (.xlsx) e iCalendar (.ics)
+# ------------------------------------------------------
+# * Lectura por lotes: nunca se arma un DataFrame con el archivo entero
+# * Validación contra COLUMNS, Plataforma / Estado normalizados, duplicados
+#   fuera (contra lo existente y dentro del mismo archivo)
+# * Exportación de un rango de fechas escrita por lotes a un archivo temporal
+# ======================================================
+
+import io, csv, datetime, tempfile
+import pandas as pd
+from nucleo import COLUMNS, ESTADOS, norm, parse_fechas, mapa_redes
+import recurrencia
+
+LOTE = 5000
+MIME = {"csv": "text/csv", "ics": "text/calendar"}
+
+# Encabezado del archivo (normalizado) → columna de la app
+_SINONIMOS = {**{norm(c): c for c in COLUMNS},
+              "titulo": "Titulo", "red": "Plataforma", "red social": "Plataforma",
+              "festividad/efemeride": "Festividad", "efemeride": "Festividad",
+              "nota": "Notas", "fecha de publicacion": "Fecha", "rrule": "Repetir",
+              "repeticion": "Repetir"}
+
+
+def _canonicas(encabezado) -> list:
+    cols = [_SINONIMOS.get(norm(str(c))) for c in encabezado]
+    if "Fecha" not in cols or "Titulo" not in cols:
+        raise ValueError("El archivo debe tener al menos las columnas Fecha y Título.")
+    return cols
+
+def _lote(filas, cols) -> pd.DataFrame:
+    """Filas crudas → DataFrame con COLUMNS (columnas desconocidas fuera)."""
+    df = pd.DataFrame(filas, columns=[c or f"_{i}" for i, c in enumerate(cols)], dtype=object)
+    df = df.loc[:, [c for c in df.columns if c in COLUMNS]]
+    return df.reindex(columns=COLUMNS).fillna("").astype(str)
+
+# ---------- LECTURA ----------
+def _lotes_csv(f, tam):
+    muestra = f.read(64 * 1024)
+    f.seek(0)
+    texto = muestra.decode("utf-8-sig", errors="replace") if isinstance(muestra, bytes) else muestra
+    try:
+        sep = csv.Sniffer().sniff(texto.split("\n", 1)[0], delimiters=",;\t").delimiter
+    except csv.Error:
+        sep = ","
+    lector = pd.read_csv(f, sep=sep, dtype=str, keep_default_na=False, chunksize=tam,
+                         encoding="utf-8-sig", skipinitialspace=True)
+    cols = None
+    for trozo in lector:
+        cols = cols or _canonicas(trozo.columns)
+        yield _lote(trozo.to_numpy(), cols)
+
+def _lotes_xlsx(f, tam):
+    try:
+        import openpyxl
+    except ImportError:
+        raise ValueError("Para importar .xlsx hace falta el paquete openpyxl.") from None
+    libro = openpyxl.load_workbook(f, read_only=True, data_only=True)
+    filas = libro.worksheets[0].iter_rows(values_only=True)
+    cols  = _canonicas(next(filas, ()))
+    trozo = []
+    for fila in filas:
+        # Excel entrega fechas como datetime: se pasan a ISO para el parser común
+        trozo.append(["" if v is None else v.strftime("%Y-%m-%d") if hasattr(v, "strftime") else v
+                      for v in fila[:len(cols)]] + [""] * (len(cols) - len(fila)))
+        if len(trozo) == tam:
+            yield _lote(trozo, cols)
+            trozo = []
+    if trozo:
+        yield _lote(trozo, cols)
+    libro.close()
+
+def _ics_texto(v: str) -> str:
+    return (v.replace("\\n", "\n").replace("\\N", "\n").replace("\\,", ",")
+             .replace("\\;", ";").replace("\\\\", "\\"))
+
+def _ics_lineas(f):
+    """Líneas lógicas (desplegadas) de un .ics."""
+    previa = None
+    for cruda in io.TextIOWrapper(f, encoding="utf-8-sig", errors="replace", newline=""):
+        cruda = cruda.rstrip("\r\n")
+        if cruda[:1] in (" ", "\t") and previa is not None:
+            previa += cruda[1:]
+            continue
+        if previa is not None:
+            yield previa
+        previa = cruda
+    if previa is not None:
+        yield previa
+
+_ICS_CAMPOS = {"SUMMARY": "Titulo", "DESCRIPTION": "Notas", "CATEGORIES": "Plataforma",
+               "X-PLATAFORMA": "Plataforma", "X-ESTADO": "Estado", "X-FESTIVIDAD": "Festividad",
+               "RRULE": "Repetir", "X-REPETIR": "Repetir"}
+
+def _lotes_ics(f, tam):
+    trozo, ev = [], None
+    for linea in _ics_lineas(f):
+        nombre, _, valor = linea.partition(":")
+        prop = nombre.split(";")[0].upper()
+        if prop == "BEGIN" and valor.upper() == "VEVENT":
+            ev = {}
+        elif prop == "END" and valor.upper() == "VEVENT" and ev is not None:
+            if ev.get("EXDATE") and recurrencia.es_serie(ev.get("Repetir")):
+                ev["Repetir"] += ";EXDATE=" + ",".join(ev["EXDATE"])
+            trozo.append([ev.get(c, "") for c in COLUMNS])
+            ev = None
+            if len(trozo) == tam:
+                yield _lote(trozo, COLUMNS)
+                trozo = []
+        elif ev is not None:
+            if prop == "DTSTART":
+                d = valor[:8]
+                ev["Fecha"] = f"{d[:4]}-{d[4:6]}-{d[6:8]}" if d.isdigit() else valor
+            elif prop == "EXDATE":
+                ev.setdefault("EXDATE", []).extend(d[:8] for d in valor.split(","))
+            elif prop == "UID" and valor.endswith("@calendario"):
+                ev["ID"] = valor.split("@")[0]
+            elif prop in _ICS_CAMPOS and not (prop == "CATEGORIES" and "Plataforma" in ev):
+                ev[_ICS_CAMPOS[prop]] = _ics_texto(valor)
+    if trozo:
+        yield _lote(trozo, COLUMNS)
+
+def leer_lotes(f, nombre: str, tam: int = LOTE):
+    """Genera DataFrames de hasta `tam` filas con las columnas COLUMNS (texto).
+    `f` es un archivo binario (p. ej. el de st.file_uploader)."""
+    ext = nombre.rsplit(".", 1)[-1].lower()
+    if ext in ("csv", "txt"):
+        return _lotes_csv(f, tam)
+    if ext in ("xlsx", "xlsm"):
+        return _lotes_xlsx(f, tam)
+    if ext == "ics":
+        return _lotes_ics(f, tam)
+    raise ValueError(f"Formato no soportado: .{ext} (usa CSV, XLSX o ICS).")
+
+# ---------- VALIDACIÓN ----------
+def clave_evento(fechas_iso: pd.Series, titulos: pd.Series, plataformas: pd.Series) -> pd.Series:
+    """Clave de duplicado: misma fecha, título y plataforma (sin acentos ni mayúsculas)."""
+    return (fechas_iso.astype(str) + "|" + titulos.map(norm).astype(str)
+            + "|" + plataformas.map(norm).astype(str))
+
+def _canonica(v: str) -> str:
+    v = v.strip()
+    return recurrencia.escribir(recurrencia.leer(v)) if recurrencia.es_serie(v.upper()) else v
+
+def _regla_invalida(v: str) -> bool:
+    if not recurrencia.es_serie(v.strip().upper()):
+        return v.strip() != "" and "@" not in v
+    try:
+        recurrencia.leer(v)
+        return False
+    except ValueError:
+        return True
+
+class Validador:
+    """Valida lotes sucesivos de un mismo archivo. Recuerda lo ya aceptado
+    para descartar duplicados dentro del archivo."""
+
+    def __init__(self, existentes: pd.DataFrame, cfg: dict, alias: dict):
+        fechas = existentes["Fecha"].dt.strftime("%Y-%m-%d").fillna("")
+        self.claves  = set(clave_evento(fechas, existentes["Titulo"], existentes["Plataforma"]))
+        self.ids     = set(existentes["ID"])
+        self.redes   = mapa_redes(cfg, alias)
+        self.estados = {norm(e): e for e in ESTADOS}
+        self.filas   = 0                     # filas leídas (para numerar errores)
+
+    def validar(self, lote: pd.DataFrame) -> tuple:
+        """(válidos, duplicados, errores): DataFrames; `errores` con Fila y Motivo."""
+        n0, self.filas = self.filas, self.filas + len(lote)
+        lote = lote.reset_index(drop=True)
+        lote = lote[lote.ne("").any(axis=1)]          # filas en blanco: se ignoran
+        fechas, invalidas = parse_fechas(lote["Fecha"])
+        plat   = lote["Plataforma"].str.strip()
+        plat   = plat.map(norm).map(self.redes).fillna(plat)
+        est    = lote["Estado"].map(norm).replace("", norm(ESTADOS[0]))
+        motivo = pd.Series("", index=lote.index)
+        for mask, txt in [(lote["Repetir"].map(_regla_invalida), "repetición inválida"),
+                          (lote["Estado"].ne("") & ~est.isin(list(self.estados)), "estado desconocido"),
+                          (plat.eq(""), "sin plataforma"),
+                          (lote["Titulo"].str.strip().eq(""), "sin título"),
+                          (invalidas, "fecha no reconocida"),
+                          (lote["Fecha"].str.strip().eq(""), "sin fecha")]:
+            motivo = motivo.mask(mask, txt)          # queda el más importante
+        errores = lote.loc[motivo.ne(""), ["Fecha", "Titulo"]].assign(
+            Fila=motivo.index[motivo.ne("")] + n0 + 2, Motivo=motivo[motivo.ne("")])
+
+        ok = lote.assign(
+            Fecha=fechas.dt.strftime("%Y-%m-%d"), Plataforma=plat,
+            Estado=est.map(self.estados), Titulo=lote["Titulo"].str.strip(), Rev="", Actualizado="")[motivo.eq("")]
+        ok = ok.assign(Repetir=ok["Repetir"].map(_canonica))
+        clave = clave_evento(ok["Fecha"], ok["Titulo"], ok["Plataforma"])
+        dup = clave.isin(self.claves) | clave.duplicated() | ok["ID"].isin(self.ids)
+        self.claves.update(clave[~dup])
+        self.ids.update(ok.loc[~dup, "ID"].loc[lambda s: s.ne("")])
+        return ok[~dup][COLUMNS], ok[dup][COLUMNS], errores[["Fila", "Fecha", "Titulo", "Motivo"]]
+
+# ---------- EXPORTACIÓN ----------
+def _ics_escapar(v) -> str:
+    return (str(v).replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+                  .replace("\r\n", "\\n").replace("\n", "\\n"))
+
+def _ics_plegar(linea: str) -> str:
+    """RFC 5545: líneas de hasta 75 bytes; la continuación empieza con espacio."""
+    partes, actual, n = [], [], 0
+    for ch in linea:
+        b = len(ch.encode("utf-8"))
+        if n + b > 74:
+            partes.append("".join(actual)); actual, n = [], 0
+        actual.append(ch); n += b
+    partes.append("".join(actual))
+    return "\r\n ".join(partes) + "\r\n"
+
+def _vevento(r: dict, sello: str) -> str:
+    fin = (datetime.date.fromisoformat(r["Fecha"]) + datetime.timedelta(days=1)).strftime("%Y%m%d")
+    props = [("BEGIN", "VEVENT"), ("UID", f"{r['ID']}@calendario"), ("DTSTAMP", sello),
+             ("DTSTART;VALUE=DATE", r["Fecha"].replace("-", "")), ("DTEND;VALUE=DATE", fin),
+             ("SUMMARY", _ics_escapar(r["Titulo"])), ("CATEGORIES", _ics_escapar(r["Plataforma"])),
+             ("X-PLATAFORMA", _ics_escapar(r["Plataforma"])), ("X-ESTADO", _ics_escapar(r["Estado"]))]
+    if r.get("Festividad"):
+        props.append(("X-FESTIVIDAD", _ics_escapar(r["Festividad"])))
+    if r.get("Notas"):
+        props.append(("DESCRIPTION", _ics_escapar(r["Notas"])))
+    if recurrencia.es_serie(r.get("Repetir")):
+        regla, _, exdate = r["Repetir"].partition(";EXDATE=")
+        props.append(("RRULE", regla))
+        if exdate:
+            props.append(("EXDATE;VALUE=DATE", exdate))
+    elif r.get("Repetir"):
+        props.append(("X-REPETIR", _ics_escapar(r["Repetir"])))
+    props.append(("END", "VEVENT"))
+    return "".join(_ics_plegar(f"{k}:{v}") for k, v in props)
+
+def _serie_en_rango(regla, inicio, d, h) -> bool:
+    try:
+        return len(recurrencia.ocurrencias(regla, inicio, d, h)) > 0
+    except ValueError:
+        return False                              # regla rota: cuenta su Fecha
+
+def lotes_rango(head, rows, desde, hasta, tam: int = LOTE):
+    """Filas crudas → DataFrames de hasta `tam` filas con desde <= Fecha < hasta
+    (Fecha ya en ISO), más las series (Repetir = FREQ=…) que empezaron antes
+    pero tienen alguna ocurrencia en el rango. Se procesan de a `tam`: no se
+    arma el df completo."""
+    d, h = pd.Timestamp(desde), pd.Timestamp(hasta)
+    for i in range(0, len(rows), tam):
+        lote = pd.DataFrame(rows[i:i + tam], columns=head).reindex(columns=COLUMNS).fillna("")
+        fechas, _ = parse_fechas(lote["Fecha"])
+        en_rango = (fechas >= d) & (fechas < h)
+        previas = (fechas < d) & lote["Repetir"].astype(str).str.startswith("FREQ=")
+        if previas.any():
+            en_rango[previas] = [_serie_en_rango(r, f, d, h)
+                                 for r, f in zip(lote["Repetir"][previas], fechas[previas])]
+        if en_rango.any():
+            yield lote[en_rango].assign(Fecha=fechas[en_rango].dt.strftime("%Y-%m-%d"))
+
+def exportar(head, rows, desde, hasta, formato: str = "csv"):
+    """Archivo temporal (rebobinado) con los eventos del rango en CSV o ICS.
+    Hasta 8 MB queda en memoria; más grande pasa a disco."""
+    out = tempfile.SpooledTemporaryFile(max_size=8 * 2**20, mode="w+b")
+    txt = io.TextIOWrapper(out, encoding="utf-8", newline="", write_through=True)
+    if formato == "ics":
+        sello = datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        txt.write("BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//Calendario de Contenidos//ES\r\n"
+                  "CALSCALE:GREGORIAN\r\n")
+        for lote in lotes_rango(head, rows, desde, hasta):
+            txt.write("".join(_vevento(r, sello) for r in lote.to_dict("records")))
+        txt.write("END:VCALENDAR\r\n")
+    else:
+        txt.write("\ufeff")                         # Excel abre bien los acentos
+        primero = True
+        for lote in lotes_rango(head, rows, desde, hasta):
+            lote.to_csv(txt, index=False, header=primero)
+            primero = False
+        if primero:
+            txt.write(",".join(COLUMNS) + "\r\n")
+    txt.detach()
+    out.seek(0)
+    return out
@@ -0,0 +1,130 @@
+# ======================================================
+# MÉTRICAS – tiempos y contadores del camino caliente
+# ------------------------------------------------------
+# * tramo("load_df"): mide un bloque; contar("api.llamadas"): suma un contador
+# * Cada rerun junta sus tramos en un Registro (panel de depuración) y cada
+#   tramo sale como una línea JSON por el logger "calendario.metricas"
+# * CALENDARIO_LOG_METRICAS=archivo.jsonl (o "stderr") activa el log
+# ======================================================
+
+import os, sys, json, time, logging, threading, functools
+from contextlib import contextmanager
+from collections import Counter
+
+LOG = logging.getLogger("calendario.metricas")
+LOG.setLevel(logging.INFO)
+LOG.propagate = False
+_destino = os.environ.get("CALENDARIO_LOG_METRICAS", "")
+if _destino:
+    LOG.addHandler(logging.StreamHandler(sys.stderr) if _destino == "stderr"
+                   else logging.FileHandler(_destino, encoding="utf-8"))
+
+# Acumulado del proceso (todas las sesiones) – aciertos/fallos de caché, API…
+TOTALES = Counter()
+_lock   = threading.Lock()
+_local  = threading.local()    # Streamlit corre cada rerun en su propio hilo
+
+
+class Registro:
+    """Tramos y contadores de un rerun."""
+
+    def __init__(self, etiqueta: str = ""):
+        self.etiqueta   = etiqueta
+        self.inicio     = time.perf_counter()
+        self.tramos     = []            # en orden de inicio; "nivel" = anidamiento
+        self.contadores = Counter()
+        self.nivel      = 0
+
+    def total_ms(self) -> float:
+        return (time.perf_counter() - self.inicio) * 1000
+
+
+def iniciar(etiqueta: str = "") -> Registro:
+    """Empieza el registro del rerun actual (reemplaza al anterior del hilo)."""
+    _local.registro = Registro(etiqueta)
+    return _local.registro
+
+def actual():
+    return getattr(_local, "registro", None)
+
+def _emitir(ev: dict):
+    if LOG.handlers:
+        LOG.info(json.dumps({"t": round(time.time(), 3), **ev}, ensure_ascii=False, default=str))
+
+def cerrar():
+    """Loguea el total del rerun y sus contadores."""
+    reg = actual()
+    if reg:
+        _emitir({"rerun": reg.etiqueta, "ms": round(reg.total_ms(), 2),
+                 "contadores": dict(reg.contadores)})
+
+def contar(nombre: str, n: int = 1):
+    with _lock:
+        TOTALES[nombre] += n
+    reg = actual()
+    if reg:
+        reg.contadores[nombre] += n
+
+@contextmanager
+def tramo(nombre: str, **datos):
+    """Mide el bloque. Lo que se agregue al dict devuelto va al registro y al
+    log, junto con los contadores que cambiaron dentro del bloque."""
+    reg = actual()
+    ev  = {"tramo": nombre, **datos}
+    if reg:
+        antes = Counter(reg.contadores)
+        ev["nivel"] = reg.nivel
+        reg.tramos.append(ev)
+        reg.nivel += 1
+    t = time.perf_counter()
+    try:
+        yield ev
+    finally:
+        ev["ms"] = round((time.perf_counter() - t) * 1000, 2)
+        if reg:
+            reg.nivel -= 1
+            ev["contadores"] = {k: v - antes[k] for k, v in reg.contadores.items() if v != antes[k]}
+        _emitir(ev)
+
+def medido(nombre: str):
+    """Decorador: cada llamada es un tramo."""
+    def deco(fn):
+        @functools.wraps(fn)
+        def envoltura(*a, **k):
+            with tramo(nombre):
+                return fn(*a, **k)
+        return envoltura
+    return deco
+
+def _fallos() -> Counter:
+    if not hasattr(_local, "fallos"):
+        _local.fallos = Counter()
+    return _local.fallos
+
+def cacheada(nombre: str, cache):
+    """Aplica el decorador de caché `cache` (st.cache_data / st.cache_resource)
+    y mide cada llamada: si el cuerpo no llegó a ejecutarse fue un acierto.
+    Conserva .clear() de la función cacheada."""
+    def deco(fn):
+        @functools.wraps(fn)
+        def cuerpo(*a, **k):
+            _fallos()[nombre] += 1
+            return fn(*a, **k)
+        cf = cache(cuerpo)
+
+        @functools.wraps(fn)
+        def llamada(*a, **k):
+            previos = _fallos()[nombre]
+            with tramo(nombre) as ev:
+                res = cf(*a, **k)
+                ev["cache"] = "fallo" if _fallos()[nombre] > previos else "acierto"
+                contar(f"cache.{nombre}.{ev['cache']}")
+            return res
+        llamada.clear = cf.clear
+        return llamada
+    return deco
+
+def resumen_cache(contadores: Counter) -> list:
+    """[(función, aciertos, fallos)] a partir de los contadores cache.*."""
+    nombres = sorted({k.split(".")[1] for k in contadores if k.startswith("cache.")})
+    return [(n, contadores[f"cache.{n}.acierto"], contadores[f"cache.{n}.fallo"]) for n in nombres]
@@ -0,0 +1,276 @@
+# ======================================================
+# NÚCLEO – datos y agregaciones del calendario, sin Streamlit
+# ------------------------------------------------------
+# * DataFrame entra, DataFrame (o dict de valores) sale: sin st.*, sin gráficos
+# * Lo usan app.py (detrás de sus cachés), el benchmark y tareas batch
+# ======================================================
+
+import datetime, calendar, unicodedata, hashlib
+import numpy as np
+import pandas as pd
+
+# ID + Rev (revisión) + Actualizado (sello ISO UTC) identifican la versión de cada fila
+COLUMNS = ["Fecha","Titulo","Festividad","Plataforma","Estado","Notas","ID","Rev","Actualizado","Repetir"]
+ESTADOS = ["Planeación","Diseño","Programado","Publicado"]
+MESES   = ["Enero","Febrero","Marzo","Abril","Mayo","Junio","Julio",
+           "Agosto","Septiembre","Octubre","Noviembre","Diciembre"]
+DIAS    = ["Lunes","Martes","Miércoles","Jueves","Viernes","Sábado","Domingo"]
+
+# ---------- UTILIDADES ----------
+def norm(t:str)->str:
+    if not isinstance(t,str): return ""
+    return "".join(c for c in unicodedata.normalize("NFD",t.replace("\u00a0"," "))
+                   if unicodedata.category(c)!="Mn").lower().strip()
+
+# ISO (AAAA-MM-DD, con hora opcional) o latino (DD/MM/AAAA, DD-MM-AA, DD.MM.AAAA)
+_RE_FECHA = (r"^(?:(?P<y1>\d{4})[-/.](?P<m1>\d{1,2})[-/.](?P<d1>\d{1,2})(?:[T ].*)?"
+             r"|(?P<d2>\d{1,2})[-/.](?P<m2>\d{1,2})[-/.](?P<y2>\d{4}|\d{2}))$")
+
+def parse_fechas(s: pd.Series) -> tuple:
+    """Parsea fechas en una sola pasada: cada valor distinto se clasifica con
+    una regex (el año de 4 dígitos decide el orden, nunca se adivina mes/día)
+    y todo se arma en un solo to_datetime vectorial.
+    Devuelve (fechas, máscara de valores no vacíos que no se reconocieron)."""
+    txt = s.fillna("").astype(str).str.strip()
+    codes, uniq = pd.factorize(txt)
+    if len(uniq) == 0:
+        return pd.Series(pd.NaT, index=s.index, dtype="datetime64[ns]"), txt.ne("")
+    p = pd.Series(uniq).str.extract(_RE_FECHA).astype(float)
+    anio = p["y1"].fillna(p["y2"])
+    anio = anio.where(anio >= 100, anio + 2000)
+    uniq_f = pd.to_datetime(pd.DataFrame({"year": anio,
+                                          "month": p["m1"].fillna(p["m2"]),
+                                          "day": p["d1"].fillna(p["d2"])}), errors="coerce")
+    # Respaldo sólo para lo que la regex no reconoce (2026-13-01 encaja y queda NaT)
+    faltan = anio.isna().to_numpy() & (uniq != "")
+    if faltan.any():
+        uniq_f = uniq_f.copy()
+        uniq_f[faltan] = [_fecha_libre(v) for v in uniq[faltan]]
+    fechas = pd.Series(uniq_f.to_numpy()[codes], index=s.index)
+    return fechas, fechas.isna() & txt.ne("")
+
+def _fecha_libre(v: str):
+    """Respaldo para formatos que la regex no cubre ("5/3/2024 10:00",
+    "5 mar 2024"…): to_datetime con día primero, sin hora ni zona."""
+    try:
+        f = pd.Timestamp(pd.to_datetime(v, dayfirst=True))
+    except (ValueError, TypeError, OverflowError):
+        return pd.NaT
+    if f is pd.NaT:
+        return f
+    return (f.tz_localize(None) if f.tzinfo else f).normalize()
+
+def weeks_in_year(yr: int) -> int:
+    yr = int(yr)
+    return datetime.date(yr, 12, 28).isocalendar().week
+
+# ---------- CONFIG ----------
+def cfg_de_filas(rows) -> dict:
+    """Filas de Config (Red | Requerido | Alias) → {red: requerido por semana}."""
+    return {r[0]: int(r[1]) if len(r) > 1 and str(r[1]).isdigit() else 0 for r in rows}
+
+def alias_de_filas(rows) -> dict:
+    """Filas de Config → {red: [alias]} (la columna Alias va separada por coma)."""
+    return {r[0]: [a.strip() for a in (r[2] or "").split(",") if a.strip()] if len(r) > 2 else []
+            for r in rows}
+
+def mapa_redes(cfg: dict, alias: dict) -> dict:
+    """Plataforma normalizada → red configurada (coincidencia exacta o alias)."""
+    mapa = {norm(a): red for red in cfg for a in alias.get(red, [])}
+    mapa.update({norm(red): red for red in cfg})   # el nombre exacto manda
+    return mapa
+
+# ---------- DATA ----------
+def preparar(head, rows, cfg: dict, alias: dict) -> pd.DataFrame:
+    """Filas crudas → df con Fecha en datetime robusto, Red categórica y
+    orden por fecha."""
+    df = pd.DataFrame(rows, columns=head)
+    df = df.loc[:, df.columns != ""]
+
+    # Asegurar que las columnas requeridas estén presentes
+    for col in COLUMNS:
+        if col not in df.columns:
+            df[col] = ""
+
+    # --- FECHA: ISO y latinas en una pasada; las no reconocidas se reportan
+    crudas = df["Fecha"]
+    df["Fecha"], invalidas = parse_fechas(crudas)
+    reporte = df.loc[invalidas, ["ID", "Titulo"]].assign(Fecha=crudas[invalidas])
+    # Texto original de las fechas no reconocidas: al compactar se conserva
+    df["Fecha_txt"] = crudas.astype(str).where(invalidas, "")
+
+    for c in ["Plataforma", "Estado"]:
+        df[c] = df[c].astype(str).str.replace("\u00a0", " ").str.strip()
+
+    df["Plataforma_norm"] = df["Plataforma"].apply(norm)
+    df["Estado_norm"]     = df["Estado"].apply(norm)
+
+    # --- RED: se resuelve una sola vez; fuera de la config queda NaN (código -1)
+    df["Red"] = pd.Categorical(df["Plataforma_norm"].map(mapa_redes(cfg, alias)),
+                               categories=sorted(cfg))
+
+    # Orden por fecha (NaT al final): el índice trabaja sobre slices contiguos
+    df = df.sort_values("Fecha", kind="stable", na_position="last").reset_index(drop=True)
+    df.attrs["version"] = hashlib.sha1(
+        pd.util.hash_pandas_object(df[COLUMNS + ["Red"]], index=False).values.tobytes()).hexdigest()
+    df.attrs["fechas_invalidas"] = reporte.to_dict("records")
+    return df
+
+def filas_para_guardar(df: pd.DataFrame) -> list:
+    """df → filas de la hoja Data (orden por fecha, Fecha en ISO, sin NaN).
+    Una fecha no reconocida se guarda con su texto original (Fecha_txt)."""
+    out = df[COLUMNS].copy()
+    # Guardamos siempre en ISO YYYY‑MM‑DD
+    iso = pd.to_datetime(out["Fecha"]).dt.strftime("%Y-%m-%d")
+    txt = df["Fecha_txt"] if "Fecha_txt" in df else pd.Series("", index=df.index)
+    out = out.assign(_iso=iso, Fecha=iso.fillna(txt.fillna(""))).sort_values("_iso", kind="stable",
+                                                                             na_position="last")
+
+    # Reemplazar valores no válidos
+    out = out[COLUMNS].fillna("").replace([float("inf"), float("-inf")], "")
+    return out.values.tolist()
+
+def conservar_vigentes(df: pd.DataFrame, actual: pd.DataFrame) -> tuple:
+    """Para reescribir `df` sin pisar a otras sesiones: se quedan las filas de
+    `df` cuyo sello (Rev, Actualizado) sigue igual en `actual` (lo guardado
+    ahora) y, del resto, la versión de `actual`; lo borrado en `actual` no
+    vuelve. Devuelve (df final, IDs de `df` rechazados)."""
+    sello = lambda d: (d["Rev"].astype(str) + "|" + d["Actualizado"].astype(str)).to_numpy()
+    guardado = pd.Series(sello(actual), index=actual["ID"].to_numpy())
+    guardado = guardado[~guardado.index.duplicated()]
+    vigente  = guardado.reindex(df["ID"].to_numpy()).to_numpy() == sello(df)
+    final    = pd.concat([df[vigente], actual[~actual["ID"].isin(df["ID"][vigente])]],
+                         ignore_index=True)
+    return final, df["ID"][~vigente].tolist()
+
+# ---------- ÍNDICE ----------
+class IndiceEventos:
+    """ID → posición y fechas ordenadas: cada consulta por día, semana, mes o
+    año es un `searchsorted` + slice en lugar de una máscara sobre todo el df."""
+
+    def __init__(self, df: pd.DataFrame):
+        self.df     = df
+        self.fechas = df["Fecha"].values.astype("datetime64[D]")
+        self.pos    = dict(zip(df["ID"], range(len(df))))
+        # Series y reemplazos de ocurrencias (ver recurrencia): pocas filas
+        self.series = df[df["Repetir"].ne("")] if "Repetir" in df else df.iloc[:0]
+        # Offsets por año: {año: (inicio, fin)}
+        validas = self.fechas[~np.isnat(self.fechas)]
+        anios, ini = np.unique(validas.astype("datetime64[Y]"), return_index=True)
+        fin = np.append(ini[1:], len(validas))
+        self.anios = {int(str(a)): (int(i), int(f)) for a, i, f in zip(anios, ini, fin)}
+
+    def rango(self, desde, hasta) -> pd.DataFrame:
+        """Eventos con desde <= Fecha < hasta."""
+        i, j = np.searchsorted(self.fechas, [np.datetime64(desde, "D"),
+                                             np.datetime64(hasta, "D")])
+        return self.df.iloc[i:j]
+
+    def anio(self, yr: int) -> pd.DataFrame:
+        i, j = self.anios.get(int(yr), (0, 0))
+        return self.df.iloc[i:j]
+
+    def mes(self, yr: int, mes: int) -> pd.DataFrame:
+        yr, mes = int(yr), int(mes)
+        ini = datetime.date(yr, mes, 1)
+        return self.rango(ini, ini + datetime.timedelta(days=calendar.monthrange(yr, mes)[1]))
+
+    def dia(self, fecha: datetime.date) -> pd.DataFrame:
+        return self.rango(fecha, fecha + datetime.timedelta(days=1))
+
+    def fila(self, eid) -> pd.Series:
+        return self.df.iloc[self.pos[eid]]
+
+def filtrar(ix: IndiceEventos, desde, hasta, redes=(), estados=(), texto: str = "") -> pd.DataFrame:
+    """Eventos con desde <= Fecha < hasta (slice del índice) y, si se piden,
+    de esas redes / estados o con `texto` en el título (sin acentos)."""
+    df = ix.rango(desde, hasta)
+    mask = np.ones(len(df), dtype=bool)
+    if redes:
+        mask &= df["Red"].isin(list(redes)).to_numpy()
+    if estados:
+        mask &= df["Estado_norm"].isin([norm(e) for e in estados]).to_numpy()
+    if texto:
+        mask &= df["Titulo"].map(norm).str.contains(norm(texto), regex=False).to_numpy()
+    return df[mask]
+
+# ---------- ESTADO SEMANAL ----------
+def semana_de_mes(fechas: pd.Series, tipo: str) -> pd.Series:
+    dia = fechas.dt.day
+    if tipo == "calendario":
+        # Filas de calendar.monthcalendar (lunes a domingo) – Vista Anual
+        primero = (fechas - pd.to_timedelta(dia - 1, unit="D")).dt.weekday
+        return (dia - 1 + primero) // 7 + 1
+    # Bloques de 7 días desde el día 1 – Vista Mensual
+    return (dia - 1) // 7 + 1
+
+def conteo_redes(df: pd.DataFrame) -> pd.Series:
+    """Eventos por red usando los códigos de la categoría `Red`."""
+    cats = df["Red"].cat.categories
+    cod  = df["Red"].cat.codes.to_numpy()
+    return pd.Series(np.bincount(cod[cod >= 0], minlength=len(cats)), index=cats)
+
+def matriz_pendientes(df_yr: pd.DataFrame, redes, tipo: str = "calendario") -> pd.DataFrame:
+    """(Mes 1-12, Semana 1-6) × red → eventos no publicados de un año, en una
+    sola pasada. `df_yr` son los eventos de un único año."""
+    pend = df_yr[(df_yr["Estado_norm"] != "publicado") & df_yr["Red"].notna()]
+    cats = pend["Red"].cat.categories
+    # Celda (mes, semana, red) → entero plano; un bincount hace todo el conteo
+    clave = (((pend["Fecha"].dt.month - 1) * 6 + semana_de_mes(pend["Fecha"], tipo) - 1)
+             * len(cats) + pend["Red"].cat.codes).to_numpy()
+    full  = pd.MultiIndex.from_product([range(1, 13), range(1, 7)], names=["Mes", "Semana"])
+    cnt   = np.bincount(clave, minlength=72 * len(cats)).reshape(72, len(cats))
+    return pd.DataFrame(cnt, index=full, columns=cats).reindex(columns=list(redes), fill_value=0)
+
+# ---------- AGREGADOS ----------
+def kpis_anio(df_yr: pd.DataFrame, yr: int, cfg: dict) -> dict:
+    """KPIs del Dashboard para un año: objetivo y planificado totales, conteo
+    por estado (con "Total" = objetivo) y (red, planificado, objetivo) por red."""
+    wks = weeks_in_year(yr)
+    objetivo_total = sum(v * wks for v in cfg.values())
+    vc_estado = df_yr["Estado"].value_counts().reindex(ESTADOS, fill_value=0)
+    vc_estado["Total"] = objetivo_total
+    por_red = conteo_redes(df_yr)
+    return {"objetivo_total": objetivo_total, "planeado_total": len(df_yr),
+            "vc_estado": vc_estado,
+            "redes": [(red, int(por_red.get(red, 0)), cfg[red] * wks) for red in sorted(cfg)]}
+
+def conteos_de_filas(head, rows, desde, hasta) -> tuple:
+    """Filas crudas → ([(plataforma, estado, n)] de los eventos con
+    desde <= Fecha < hasta que no son series, filas con Repetir). Sólo se
+    arman las 4 columnas necesarias; nada queda en memoria."""
+    idx = {c: head.index(c) for c in ("Fecha", "Plataforma", "Estado", "Repetir") if c in head}
+    df  = pd.DataFrame({c: [r[i] if i < len(r) else "" for r in rows] for c, i in idx.items()},
+                       dtype=object).reindex(columns=["Fecha", "Plataforma", "Estado", "Repetir"])
+    df  = df.fillna("").astype(str)
+    rep = df["Repetir"].str.strip()
+    sueltos = df[~rep.str.startswith("FREQ=")]
+    fechas, _ = parse_fechas(sueltos["Fecha"])
+    en_rango = sueltos[(fechas >= pd.Timestamp(desde)) & (fechas < pd.Timestamp(hasta))]
+    cnt = en_rango.groupby(["Plataforma", "Estado"]).size()
+    return ([(p, e, int(n)) for (p, e), n in cnt.items()],
+            [r for r, con_rep in zip(rows, rep.ne("")) if con_rep])
+
+def kpis_conteos(conteos, yr: int, cfg: dict, alias: dict) -> dict:
+    """Lo mismo que kpis_anio (sin df) a partir de [(plataforma, estado, n)]."""
+    c = pd.DataFrame(conteos, columns=["Plataforma", "Estado", "n"])
+    for col in ("Plataforma", "Estado"):
+        c[col] = c[col].astype(str).str.replace("\u00a0", " ").str.strip()
+    wks = weeks_in_year(yr)
+    objetivo_total = sum(v * wks for v in cfg.values())
+    vc_estado = c.groupby("Estado")["n"].sum().reindex(ESTADOS, fill_value=0).astype(int)
+    vc_estado["Total"] = objetivo_total
+    por_red = c.groupby(c["Plataforma"].map(norm).map(mapa_redes(cfg, alias)))["n"].sum()
+    return {"objetivo_total": objetivo_total, "planeado_total": int(c["n"].sum()),
+            "vc_estado": vc_estado,
+            "redes": [(red, int(por_red.get(red, 0)), cfg[red] * wks) for red in sorted(cfg)]}
+
+def conteo_por_dia(df_yr: pd.DataFrame) -> np.ndarray:
+    """Eventos por día del año (posición = tm_yday, 1..366)."""
+    return np.bincount(df_yr["Fecha"].dt.dayofyear.dropna().to_numpy(dtype=int), minlength=367)
+
+def listado_dia(df: pd.DataFrame) -> pd.DataFrame:
+    """Tabla de eventos para mostrar: Día ("Lunes 3") | Título | Plataforma | Estado."""
+    return pd.DataFrame({
+        "Día": df["Fecha"].dt.weekday.map(dict(enumerate(DIAS))) + " " + df["Fecha"].dt.day.astype(str),
+        "Título": df["Titulo"], "Plataforma": df["Plataforma"], "Estado": df["Estado"]})
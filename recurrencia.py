@@ -0,0 +1,202 @@
+# ======================================================
+# EVENTOS RECURRENTES – una fila por serie, ocurrencias a demanda
+# ------------------------------------------------------
+# * Columna Repetir con una regla estilo RRULE:
+#     FREQ=WEEKLY;INTERVAL=1;BYDAY=MO,WE;UNTIL=20261231;COUNT=20;EXDATE=20260310
+#   (FREQ = DAILY / WEEKLY / MONTHLY; EXDATE = fechas omitidas)
+# * Una fila con Repetir = "<ID de la serie>@AAAAMMDD" reemplaza esa ocurrencia
+#   (puede cambiar título, estado, incluso la fecha)
+# * Las ocurrencias se generan sólo para la ventana que pide la vista
+# ======================================================
+
+import numpy as np
+import pandas as pd
+
+FRECUENCIAS = {"DAILY": ("día", "días"), "WEEKLY": ("semana", "semanas"),
+               "MONTHLY": ("mes", "meses")}
+DIAS_RRULE  = ["MO", "TU", "WE", "TH", "FR", "SA", "SU"]
+_DIAS_CORTOS = ["lun", "mar", "mié", "jue", "vie", "sáb", "dom"]
+
+
+def es_serie(v) -> bool:
+    return isinstance(v, str) and v.startswith("FREQ=")
+
+def marca(sid: str, fecha) -> str:
+    """Valor de Repetir de la fila que reemplaza la ocurrencia `fecha` de la serie `sid`."""
+    return f"{sid}@{pd.Timestamp(fecha):%Y%m%d}"
+
+def _fecha(v: str, clave: str) -> np.datetime64:
+    if len(v) < 8 or not v[:8].isdigit():
+        raise ValueError(f"{clave}: fecha inválida '{v}' (AAAAMMDD)")
+    try:
+        return np.datetime64(f"{v[:4]}-{v[4:6]}-{v[6:8]}", "D")
+    except ValueError:
+        raise ValueError(f"{clave}: fecha inválida '{v}' (AAAAMMDD)") from None
+
+def leer(regla: str) -> dict:
+    """Regla → dict con FREQ, INTERVAL, BYDAY (0=lunes), BYMONTHDAY, UNTIL,
+    COUNT y EXDATE. Lanza ValueError si algo no se entiende."""
+    r = {"INTERVAL": 1, "BYDAY": [], "BYMONTHDAY": None, "UNTIL": None, "COUNT": None, "EXDATE": []}
+    for parte in filter(None, str(regla).strip().split(";")):
+        k, _, v = parte.partition("=")
+        k, v = k.strip().upper(), v.strip().upper()
+        if k == "FREQ":
+            if v not in FRECUENCIAS:
+                raise ValueError(f"FREQ debe ser {', '.join(FRECUENCIAS)}")
+            r["FREQ"] = v
+        elif k in ("INTERVAL", "COUNT", "BYMONTHDAY"):
+            if not v.isdigit() or int(v) < 1 or (k == "BYMONTHDAY" and int(v) > 31):
+                raise ValueError(f"{k}: valor inválido '{v}'")
+            r[k] = int(v)
+        elif k == "BYDAY":
+            dias = [d.strip() for d in v.split(",") if d.strip()]
+            if not dias or any(d not in DIAS_RRULE for d in dias):
+                # Ordinales como 1MO o -1FR ("primer lunes") no están soportados
+                raise ValueError(f"BYDAY: usa {','.join(DIAS_RRULE)} (sin ordinales como 1MO)")
+            r["BYDAY"] = sorted({DIAS_RRULE.index(d) for d in dias})
+        elif k == "UNTIL":
+            r["UNTIL"] = _fecha(v, k)
+        elif k == "EXDATE":
+            r["EXDATE"] = [_fecha(d.strip(), k) for d in v.split(",") if d.strip()]
+        elif k == "WKST":
+            pass                      # las semanas siempre empiezan el lunes
+        else:
+            raise ValueError(f"Parte no soportada: {k}")
+    if "FREQ" not in r:
+        raise ValueError("Falta FREQ")
+    return r
+
+def escribir(r: dict) -> str:
+    """dict de leer() → regla en forma canónica."""
+    partes = [f"FREQ={r['FREQ']}"]
+    if r.get("INTERVAL", 1) != 1:
+        partes.append(f"INTERVAL={r['INTERVAL']}")
+    if r.get("BYDAY"):
+        partes.append("BYDAY=" + ",".join(DIAS_RRULE[d] for d in r["BYDAY"]))
+    if r.get("BYMONTHDAY"):
+        partes.append(f"BYMONTHDAY={r['BYMONTHDAY']}")
+    if r.get("UNTIL") is not None:
+        partes.append(f"UNTIL={pd.Timestamp(r['UNTIL']):%Y%m%d}")
+    if r.get("COUNT"):
+        partes.append(f"COUNT={r['COUNT']}")
+    if r.get("EXDATE"):
+        partes.append("EXDATE=" + ",".join(f"{pd.Timestamp(d):%Y%m%d}" for d in sorted(r["EXDATE"])))
+    return ";".join(partes)
+
+def regla(frecuencia: str, cada: int = 1, dias=(), hasta=None, veces: int = 0) -> str:
+    """Arma una regla desde el formulario (`dias`: 0=lunes … 6=domingo)."""
+    return escribir({"FREQ": frecuencia, "INTERVAL": int(cada),
+                     "BYDAY": sorted(set(dias)) if frecuencia == "WEEKLY" else [],
+                     "UNTIL": hasta, "COUNT": int(veces) or None})
+
+def con_excepcion(regla_: str, fecha) -> str:
+    """La misma regla omitiendo la ocurrencia `fecha`."""
+    r = leer(regla_)
+    r["EXDATE"] = sorted(set(r["EXDATE"]) | {np.datetime64(pd.Timestamp(fecha).date(), "D")})
+    return escribir(r)
+
+def describir(regla_: str) -> str:
+    try:
+        r = leer(regla_)
+    except ValueError as e:
+        return f"regla inválida ({e})"
+    uno, varios = FRECUENCIAS[r["FREQ"]]
+    txt = f"cada {uno}" if r["INTERVAL"] == 1 else f"cada {r['INTERVAL']} {varios}"
+    if r["BYDAY"]:
+        txt += " (" + ", ".join(_DIAS_CORTOS[d] for d in r["BYDAY"]) + ")"
+    if r["BYMONTHDAY"]:
+        txt += f", día {r['BYMONTHDAY']}"
+    if r["UNTIL"] is not None:
+        txt += f" hasta el {pd.Timestamp(r['UNTIL']):%d/%m/%Y}"
+    if r["COUNT"]:
+        txt += f", {r['COUNT']} veces"
+    if r["EXDATE"]:
+        txt += f" · {len(r['EXDATE'])} fecha(s) omitida(s)"
+    return txt
+
+# ---------- EXPANSIÓN ----------
+def ocurrencias(regla_: str, inicio, desde, hasta) -> np.ndarray:
+    """Fechas (datetime64[D]) de la serie que empieza en `inicio` con
+    desde <= fecha < hasta. Sólo se genera hasta el final de la ventana
+    (o UNTIL); COUNT cuenta desde `inicio`, antes de omitir EXDATE."""
+    r   = leer(regla_)
+    ini = np.datetime64(pd.Timestamp(inicio).date(), "D")
+    d, h = np.datetime64(pd.Timestamp(desde).date(), "D"), np.datetime64(pd.Timestamp(hasta).date(), "D")
+    fin = h - 1 if r["UNTIL"] is None else min(h - 1, r["UNTIL"])
+    if fin < ini or (r["COUNT"] is None and fin < d):
+        return np.array([], dtype="datetime64[D]")
+    paso = r["INTERVAL"]
+    if r["FREQ"] == "DAILY":
+        fechas = np.arange(ini, fin + 1, paso)
+    elif r["FREQ"] == "WEEKLY":
+        lunes  = ini - int(pd.Timestamp(ini).weekday())
+        dias   = np.array(r["BYDAY"] or [pd.Timestamp(ini).weekday()])
+        fechas = (np.arange(lunes, fin + 1, 7 * paso)[:, None] + dias).ravel()
+    else:
+        dia    = r["BYMONTHDAY"] or pd.Timestamp(ini).day
+        meses  = np.arange(ini.astype("datetime64[M]"), fin.astype("datetime64[M]") + 1, paso)
+        fechas = meses.astype("datetime64[D]") + (dia - 1)
+        fechas = fechas[fechas.astype("datetime64[M]") == meses]     # sin 31 de febrero
+    fechas = fechas[(fechas >= ini) & (fechas <= fin)]
+    if r["COUNT"]:
+        fechas = fechas[:r["COUNT"]]
+    if r["EXDATE"]:
+        fechas = fechas[~np.isin(fechas, np.array(r["EXDATE"], dtype="datetime64[D]"))]
+    return fechas[fechas >= d]
+
+def anios(regla_: str, inicio, tope: int) -> set:
+    """Años con alguna ocurrencia de la serie. Las que terminan (UNTIL /
+    COUNT) se recorren enteras; las abiertas, hasta el año `tope` inclusive.
+    Regla rota → el año de `inicio`, como en expandir."""
+    ini = np.datetime64(pd.Timestamp(inicio).date(), "D")
+    try:
+        r = leer(regla_)
+    except ValueError:
+        return {pd.Timestamp(ini).year}
+    if r["UNTIL"] is not None:
+        fin = r["UNTIL"] + 1
+    elif r["COUNT"]:
+        fin = ini + r["COUNT"] * r["INTERVAL"] * 62      # ≥ un mes con ese día cada dos
+    else:
+        fin = np.datetime64(f"{tope + 1}-01-01", "D")
+    fin = min(fin, np.datetime64(f"{pd.Timestamp(ini).year + 100}-01-01", "D"))
+    oc = ocurrencias(regla_, ini, ini, fin)
+    return set((oc.astype("datetime64[Y]").astype(int) + 1970).tolist())
+
+def expandir(eventos: pd.DataFrame, series: pd.DataFrame, desde, hasta) -> pd.DataFrame:
+    """Eventos de la ventana [desde, hasta) con cada serie reemplazada por sus
+    ocurrencias. `eventos` trae al menos las filas de la ventana; `series`,
+    todas las filas con Repetir (reglas y reemplazos), estén donde estén.
+    Cada ocurrencia copia la fila de la serie con ID "<serie>@AAAAMMDD"."""
+    d, h = pd.Timestamp(desde), pd.Timestamp(hasta)
+    base = eventos[~eventos["Repetir"].str.startswith("FREQ=")
+                   & (eventos["Fecha"] >= d) & (eventos["Fecha"] < h)]
+    reglas = series[series["Repetir"].str.startswith("FREQ=")]
+    if reglas.empty:
+        return base if len(base) == len(eventos) else base.reset_index(drop=True)
+    pos, fechas = [], []
+    for i, (rg, ini) in enumerate(zip(reglas["Repetir"], reglas["Fecha"])):
+        if pd.isna(ini):
+            continue
+        try:
+            oc = ocurrencias(rg, ini, d, h)
+        except ValueError:                     # regla rota: cuenta como evento suelto
+            oc = np.array([ini], dtype="datetime64[D]") if d <= ini < h else np.array([], dtype="datetime64[D]")
+        pos.append(np.full(len(oc), i))
+        fechas.append(oc)
+    pos, fechas = np.concatenate(pos or [[]]).astype(int), np.concatenate(fechas or [[]]).astype("datetime64[D]")
+    # AAAAMMDD sin strftime (lento): aritmética sobre datetime64
+    meses = fechas.astype("datetime64[M]")
+    ymd = ((meses.astype("datetime64[Y]").astype(int) + 1970) * 10000
+           + (meses.astype(int) % 12 + 1) * 100 + (fechas - meses).astype(int) + 1)
+    occ = reglas.iloc[pos]
+    occ = occ.assign(Fecha=fechas.astype("datetime64[ns]"), Repetir="",
+                     ID=occ["ID"].to_numpy(dtype=str) + "@" + ymd.astype(str))
+    # Las que tienen su propia fila (reemplazo) no se generan
+    reemplazos = series.loc[series["Repetir"].str.contains("@", regex=False), "Repetir"]
+    if len(reemplazos):
+        occ = occ[~occ["ID"].isin(set(reemplazos))]
+    out = pd.concat([base, occ], ignore_index=True)
+    out = out.sort_values("Fecha", kind="stable").reset_index(drop=True)
+    out.attrs = dict(eventos.attrs)
+    return out
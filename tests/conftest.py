@@ -0,0 +1,6 @@
+# Los módulos viven en la raíz del repo (sin paquete): se importan desde ahí.
+# bench/ aporta la hoja falsa (gspread en memoria con contador de celdas).
+import os, sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [RAIZ, os.path.join(RAIZ, "bench")]
@@ -0,0 +1,205 @@
+import sqlite3, datetime
+from contextlib import contextmanager
+import gspread, pytest, requests
+import almacen, cache_local
+from almacen import COLUMNS, Conflicto, SQLiteLocal
+from hoja_falsa import ClienteFalso
+
+
+def ev(**k):
+    return {"Fecha": "2026-03-04", "Titulo": "t", "Festividad": "", "Plataforma": "Instagram",
+            "Estado": "Planeación", "Notas": "", "Repetir": "", **k}
+
+
+# ---------- FUSIÓN ----------
+def test_editados_compara_como_texto():
+    ant = {"ID": "a", "Rev": "1", "Titulo": "x", "Fecha": "2026-03-04"}
+    assert almacen.editados(ant, {"ID": "a", "Rev": 9, "Titulo": "x", "Fecha": "2026-03-04"}) == {}
+    assert almacen.editados(ant, {"Titulo": "y", "Otra": 1}) == {"Titulo": "y"}
+
+def test_editados_compara_fechas_parseadas():
+    ant = {"ID": "a", "Rev": "1", "Fecha": "05/03/2026"}
+    assert almacen.editados(ant, {"Fecha": "2026-03-05"}) == {}
+    assert almacen.editados(ant, {"Fecha": "2026-05-03"}) == {"Fecha": "2026-05-03"}
+    actual = {**ant, "Rev": "2", "Actualizado": "s2", "Fecha": "2026-03-05", "Notas": "n"}
+    assert almacen._fusion(ant, actual, {"Titulo": "T"}).keys() == {"Titulo", "Rev", "Actualizado"}
+
+def test_fusion_misma_version_sube_rev():
+    ant = {"ID": "a", "Rev": "3", "Actualizado": "s", "Titulo": "x"}
+    out = almacen._fusion(ant, dict(ant), {"Titulo": "y"})
+    assert out["Titulo"] == "y" and out["Rev"] == 4 and out["Actualizado"] != "s"
+
+def test_fusion_conserva_cambios_ajenos_en_otros_campos():
+    ant    = {"ID": "a", "Rev": "1", "Actualizado": "s1", "Titulo": "T0", "Notas": "N0"}
+    actual = {**ant, "Rev": "2", "Actualizado": "s2", "Notas": "N1"}
+    assert set(almacen._fusion(ant, actual, {"Titulo": "T2"})) == {"Titulo", "Rev", "Actualizado"}
+
+def test_fusion_mismo_valor_no_choca():
+    ant    = {"ID": "a", "Rev": "1", "Actualizado": "s1", "Titulo": "T0"}
+    actual = {**ant, "Rev": "2", "Actualizado": "s2", "Titulo": "T1"}
+    assert almacen._fusion(ant, actual, {"Titulo": "T1"}) == {}
+
+def test_fusion_conflicto_y_borrada():
+    ant    = {"ID": "a", "Rev": "1", "Actualizado": "s1", "Titulo": "T0"}
+    actual = {**ant, "Rev": "2", "Actualizado": "s2", "Titulo": "T1"}
+    with pytest.raises(Conflicto) as e:
+        almacen._fusion(ant, actual, {"Titulo": "T2"})
+    assert e.value.campos == ["Titulo"] and e.value.actual is actual
+    with pytest.raises(Conflicto) as e:
+        almacen._fusion(ant, None, {"Titulo": "T2"})
+    assert e.value.actual is None
+
+
+# ---------- SQLITE ----------
+@pytest.fixture
+def sq(tmp_path):
+    return SQLiteLocal(tmp_path / "cal.db")
+
+def _fila(alm, eid):
+    head, rows = alm.eventos()
+    return next(dict(zip(head, r)) for r in rows if r[head.index("ID")] == eid)
+
+def test_sqlite_rango_trae_series(sq):
+    sq.aplicar_lote([ev(ID="a", Fecha="2026-01-10"), ev(ID="b", Fecha="2025-05-01"),
+                     ev(ID="s", Fecha="2020-01-01", Repetir="FREQ=DAILY")], [], [])
+    _, rows = sq.eventos("2026-01-01", "2027-01-01")
+    assert sorted(r[COLUMNS.index("ID")] for r in rows) == ["a", "s"]
+    hasta = max(2026, datetime.date.today().year)              # la serie diaria llena los años
+    assert sq.anios() == list(range(2020, hasta + 1))
+
+def test_sqlite_anios_incluye_ocurrencias_de_series(sq):
+    sq.aplicar_lote([ev(ID="a", Fecha="2026-01-10"),
+                     ev(ID="s", Fecha="2020-12-01", Repetir="FREQ=MONTHLY;COUNT=3"),
+                     ev(ID="u", Fecha="2022-06-01", Repetir="FREQ=WEEKLY;UNTIL=20230105"),
+                     ev(ID="r", Fecha="2010-01-01", Repetir="FREQ=NUNCA"),
+                     ev(ID="x", Fecha="", Repetir="FREQ=DAILY")], [], [])
+    assert sq.anios() == [2010, 2020, 2021, 2022, 2023, 2026]
+
+def test_sqlite_actualizar_fusiona_y_detecta_conflicto(sq):
+    eid = sq.agregar(ev(Titulo="T0", Notas="N0"))
+    leido_a = leido_b = _fila(sq, eid)
+    sq.actualizar(leido_b, {**leido_b, "Titulo": "T1", "Notas": "N1"})
+    with pytest.raises(Conflicto):
+        sq.actualizar(leido_a, {**leido_a, "Titulo": "T2"})
+    sq.actualizar(leido_a, {**leido_a, "Festividad": "F"})
+    fila = _fila(sq, eid)
+    assert (fila["Titulo"], fila["Notas"], fila["Festividad"], fila["Rev"]) == ("T1", "N1", "F", "3")
+
+def test_sqlite_eliminar_versionado(sq):
+    eid = sq.agregar(ev())
+    viejo = _fila(sq, eid)
+    sq.actualizar(viejo, {**viejo, "Titulo": "nuevo"})
+    with pytest.raises(Conflicto):
+        sq.eliminar(eid, viejo)
+    sq.eliminar(eid, _fila(sq, eid))
+    assert sq.eventos()[1] == []
+
+def test_sqlite_aplicar_lote(sq):
+    sq.aplicar_lote([ev(ID="a"), ev(ID="b")], [], [])
+    a, b = _fila(sq, "a"), _fila(sq, "b")
+    sq.actualizar(b, {**b, "Notas": "otra sesión"})
+    choques = sq.aplicar_lote([ev(ID="c")], [(a, {"Titulo": "nuevo"})], [("b", b)])
+    assert list(choques) == ["b"]
+    assert sorted(r[COLUMNS.index("ID")] for r in sq.eventos()[1]) == ["a", "b", "c"]
+    assert _fila(sq, "a")["Titulo"] == "nuevo"
+
+def test_sqlite_buscar_normaliza(sq):
+    sq.aplicar_lote([ev(ID="a", Plataforma="IG", Estado="Planeación", Titulo="Canción"),
+                     ev(ID="b", Plataforma="Blog", Titulo="otra"),
+                     ev(ID="c", Plataforma="ig ", Estado="Publicado", Titulo="cancion 2"),
+                     ev(ID="d", Fecha="2027-01-01", Plataforma="IG")], [], [])
+    total, _, rows = sq.buscar("2026-01-01", "2027-01-01", ["ig"], ["planeacion"], "cancion")
+    assert total == 1 and rows[0][COLUMNS.index("ID")] == "a"
+    total, _, rows = sq.buscar("2026-01-01", "2027-01-01", ["ig"], offset=1, limite=1)
+    assert total == 2 and [r[COLUMNS.index("ID")] for r in rows] == ["c"]
+
+def test_sqlite_consultas_usan_indices(sq, monkeypatch):
+    sq.aplicar_lote([ev(ID=f"e{i}", Fecha=f"2026-01-{i % 28 + 1:02d}") for i in range(50)]
+                    + [ev(ID="s", Repetir="FREQ=DAILY")], [], [])
+    sentencias, abrir = [], SQLiteLocal._con
+
+    @contextmanager
+    def con(self):
+        with abrir(self) as c:
+            c.set_trace_callback(sentencias.append)
+            yield c
+    monkeypatch.setattr(SQLiteLocal, "_con", con)
+    sq.eventos("2026-01-01", "2027-01-01")
+    sq.conteos("2026-01-01", "2027-01-01")
+    sq.buscar("2026-01-01", "2027-01-01", ["instagram"], ["planeacion"])
+    c = sqlite3.connect(sq.ruta)
+    for sql in (s for s in sentencias if s.lstrip().upper().startswith("SELECT")):
+        plan = [fila[-1] for fila in c.execute("EXPLAIN QUERY PLAN " + sql)]
+        assert "SCAN eventos" not in plan, (sql, plan)
+
+def test_sqlite_conteos(sq):
+    sq.aplicar_lote([ev(ID="a"), ev(ID="b"), ev(ID="c", Estado="Publicado"),
+                     ev(ID="d", Fecha="2025-01-01"), ev(ID="s", Repetir="FREQ=DAILY")], [], [])
+    conteos, (head, series) = sq.conteos("2026-01-01", "2027-01-01")
+    assert sorted(conteos) == [("Instagram", "Planeación", 2), ("Instagram", "Publicado", 1)]
+    assert [r[head.index("ID")] for r in series] == ["s"]
+
+
+# ---------- GOOGLE SHEETS (hoja falsa) ----------
+@pytest.fixture
+def hoja(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache_local, "RUTA", str(tmp_path / "cache.sqlite"))
+    cli = ClienteFalso()
+    sh  = cli.open_by_key("H")
+    sh.add_worksheet(almacen.DATA_SHEET).rows = [list(COLUMNS)] + [
+        almacen._fila(ev(ID=f"e{i}", Titulo=f"t{i}", Rev=1, Actualizado="s"), COLUMNS) for i in range(200)]
+    return almacen.HojaGoogle(cli, "H"), sh
+
+def test_hoja_edicion_directa_no_baja_la_hoja(hoja):
+    alm, sh = hoja
+    ws = sh.hojas[almacen.DATA_SHEET]
+    anterior = dict(zip(COLUMNS, ws.rows[101]))
+    sh.metricas.reset()
+    alm.actualizar(anterior, {**anterior, "Titulo": "nuevo"})
+    assert ws.rows[101][COLUMNS.index("Titulo")] == "nuevo"
+    assert sh.metricas.celdas < 2 * len(ws.rows)              # columna ID + una fila
+    alm.eliminar("e100")
+    assert [r[COLUMNS.index("ID")] for r in ws.rows[100:102]] == ["e99", "e101"]
+    with pytest.raises(KeyError):
+        almacen._fila_de_id(ws, COLUMNS, "nope")
+
+def test_hoja_escritura_propia_caduca_el_snapshot(hoja, monkeypatch):
+    alm, sh = hoja
+    monkeypatch.setattr(sh, "get_lastUpdateTime", lambda: "fija")   # revisión que no se mueve
+    head, rows = alm.eventos()
+    anterior = dict(zip(head, rows[5]))
+    alm.actualizar(anterior, {**anterior, "Titulo": "nuevo"})
+    alm.agregar(ev(ID="z"))
+    alm.eliminar("e7")
+    filas = {r[head.index("ID")]: r for r in alm.eventos()[1]}
+    assert filas["e5"][head.index("Titulo")] == "nuevo" and "z" in filas and "e7" not in filas
+    sh.metricas.reset()
+    assert len(alm.eventos()[1]) == len(filas) and sh.metricas.celdas == 0   # de nuevo del snapshot
+
+def _error(code):
+    r = requests.Response()
+    r.status_code, r._content = code, b'{"error": {"code": %d, "message": "x"}}' % code
+    return gspread.exceptions.APIError(r)
+
+def test_solo_se_reintentan_pedidos_idempotentes():
+    base = "https://sheets.googleapis.com/v4/spreadsheets/H"
+    assert almacen._idempotente("get", base + "/values/Data!A1")
+    assert almacen._idempotente("post", base + "/values:batchUpdate")
+    assert not almacen._idempotente("post", base + "/values/Data!A1:append")
+    borrar = {"requests": [{"deleteDimension": {"range": {}}}]}
+    assert not almacen._idempotente("post", base + ":batchUpdate", borrar)
+    assert almacen._idempotente("post", base + ":batchUpdate", {"requests": [{"updateCells": {}}]})
+
+def test_alta_reintentada_no_duplica_filas(hoja, monkeypatch):
+    alm, sh = hoja
+    ws, fallas = sh.hojas[almacen.DATA_SHEET], [503]
+    original = ws.append_rows
+    def append_rows(values, **k):
+        original(values, **k)                  # la fila llega pero la respuesta falla
+        if fallas:
+            raise _error(fallas.pop())
+    monkeypatch.setattr(ws, "append_rows", append_rows)
+    monkeypatch.setattr(almacen.time, "sleep", lambda s: None)
+    alm.aplicar_lote([ev(ID="n1"), ev(ID="n2")], [], [])
+    ids = [r[COLUMNS.index("ID")] for r in ws.rows]
+    assert ids.count("n1") == ids.count("n2") == 1
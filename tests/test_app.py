@@ -0,0 +1,99 @@
+import datetime
+import pytest
+from streamlit.testing.v1 import AppTest
+import almacen, cola
+from almacen import COLUMNS
+
+APP = __file__.rsplit("tests", 1)[0] + "app.py"
+
+
+@pytest.fixture
+def base(tmp_path, monkeypatch):
+    ruta = tmp_path / "cal.db"
+    monkeypatch.setenv("CALENDARIO_BACKEND", "sqlite")
+    monkeypatch.setenv("CALENDARIO_DB", str(ruta))
+    monkeypatch.delenv("CALENDARIOS", raising=False)
+    monkeypatch.setattr(cola, "INTERVALO", 0)          # escrituras directas
+    return almacen.SQLiteLocal(ruta)
+
+def _fila(alm, eid):
+    head, rows = alm.eventos()
+    return next(dict(zip(head, r)) for r in rows if r[head.index("ID")] == eid)
+
+
+def test_fusion_conserva_campos_ajenos_sin_conflicto(base):
+    eid = base.agregar({"Fecha": datetime.date.today().isoformat(), "Titulo": "T0", "Festividad": "",
+                        "Plataforma": "Instagram", "Estado": "Planeación", "Notas": "N0", "Repetir": ""})
+    at = AppTest.from_file(APP, default_timeout=60)
+    at.session_state["page"], at.session_state["ed_id"] = "Editar", eid
+    at.run()
+    # Sesión B guarda Título y Notas mientras A tiene el formulario abierto
+    leido = _fila(base, eid)
+    base.actualizar(leido, {**leido, "Titulo": "T1", "Notas": "N1"})
+    # Sesión A cambia sólo el Título → conflicto en Título
+    next(t for t in at.text_input if t.label == "Título").set_value("T2")
+    next(b for b in at.button if b.label == "Guardar Cambios").click()
+    at.run()
+    assert not at.exception
+    assert "conflicto" in at.session_state
+    next(b for b in at.button if b.label == "Guardar fusión").click()   # "Mía" por defecto
+    at.run()
+    assert not at.exception
+    fila = _fila(base, eid)
+    assert (fila["Titulo"], fila["Notas"]) == ("T2", "N1")
+
+
+# ---------- VARIOS CALENDARIOS (sin servidor: funciones de app.py) ----------
+@pytest.fixture
+def app_mod(monkeypatch):
+    monkeypatch.setattr(cola, "INTERVALO", 0)
+    import app
+    app._memoria.clear()
+    app._generaciones.clear()
+    return app
+
+def _contar_llamadas(monkeypatch, alm, metodo):
+    n, original = [0], getattr(alm, metodo)
+    def contado(*a, **k):
+        n[0] += 1
+        return original(*a, **k)
+    monkeypatch.setattr(alm, metodo, contado)
+    return n
+
+def _cal(tmp_path, nombre, titulos):
+    alm = almacen.SQLiteLocal(tmp_path / f"{nombre}.db")
+    alm.aplicar_lote([{"ID": t, "Fecha": "2026-03-04", "Titulo": t, "Plataforma": "Instagram",
+                       "Estado": "Planeación"} for t in titulos], [], [])
+    return alm
+
+def test_escritura_invalida_solo_su_calendario(app_mod, tmp_path, monkeypatch):
+    a, b = _cal(tmp_path, "a", ["x"]), _cal(tmp_path, "b", ["y", "z"])
+    conteos_b = _contar_llamadas(monkeypatch, b, "conteos")
+    assert app_mod.resumen_calendario(b, 2026, app_mod._generacion(b))["planeado_total"] == 2
+    app_mod.agregar_evento(a, {"Fecha": "2026-05-01", "Titulo": "nuevo", "Plataforma": "Blog",
+                               "Estado": "Diseño"})
+    app_mod.resumen_calendario(b, 2026, app_mod._generacion(b))
+    assert conteos_b[0] == 1                                  # B sigue cacheado
+    assert app_mod.resumen_calendario(a, 2026, app_mod._generacion(a))["planeado_total"] == 2
+
+def test_desalojo_alcanza_indice_y_expansiones(app_mod, tmp_path, monkeypatch):
+    monkeypatch.setattr(app_mod._memoria(), "tope", 1)        # cada calendario nuevo desaloja al resto
+    a, b = _cal(tmp_path, "a", ["x"]), _cal(tmp_path, "b", ["y"])
+    a.agregar({"Fecha": "2026-01-05", "Titulo": "serie", "Plataforma": "Blog", "Repetir": "FREQ=WEEKLY"})
+    df_a = app_mod.load_anio(a, 2026)
+    ix_a = app_mod.indice(df_a)
+    assert len(df_a) == 53 and app_mod.indice(df_a) is ix_a
+    partes = sorted(p.partition(":")[0] for p in app_mod._memoria()._items[a.clave])
+    assert partes == ["expandir", "indice", "indice", "rango"]
+    app_mod._liberar(app_mod._memoria().usar(b.clave))
+    app_mod.load_anio(b, 2026)
+    assert [c for c, _ in app_mod._memoria().estado()] == [b.clave]
+    eventos_a = _contar_llamadas(monkeypatch, a, "eventos")
+    df_a2 = app_mod.load_anio(a, 2026)
+    assert eventos_a[0] == 1 and app_mod.indice(df_a2) is not ix_a
+
+def test_html_anual_escapa_calendario_y_redes(app_mod, tmp_path):
+    df = app_mod.load_anio(_cal(tmp_path, "a", ["x"]), 2026)
+    out = app_mod._html_anual(df, df.attrs["version"], 2026, (("<b>Red</b>", 1),), "a'><script>")
+    assert "<script>" not in out and "<b>Red</b>" not in out
+    assert "&amp;cal=a%27%3E%3Cscript%3E" in out and "&lt;b&gt;Red&lt;/b&gt;" in out
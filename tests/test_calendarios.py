@@ -0,0 +1,49 @@
+import calendarios
+from calendarios import MemoriaLRU
+
+
+def test_registro_desde_tabla_texto_y_unico():
+    cals = calendarios.registro({"Marca A": {"nombre": "Alfa", "sheet_id": " X "}, "b_2": "Y"})
+    assert list(cals) == ["marca-a", "b-2"]
+    assert cals["marca-a"] == calendarios.Calendario("marca-a", "Alfa", "X")
+    assert calendarios.registro("uno=/a.db,dos=/b.db")["dos"].fuente == "/b.db"
+    assert list(calendarios.registro(None, "SHEET")) == ["principal"]
+    assert calendarios.registro(None, "") == {}
+
+
+def test_memoria_desaloja_el_menos_reciente_con_sus_partes():
+    liberados = []
+    mem = MemoriaLRU(100)
+    assert mem.registrar("a", "df", 40, lambda: liberados.append("a.df")) == []
+    mem.registrar("a", "indice", 20, lambda: liberados.append("a.indice"))
+    mem.registrar("b", "df", 30, lambda: liberados.append("b.df"))
+    assert mem.usar("a") == []                       # a pasa a ser el más reciente
+    fuera = mem.registrar("c", "df", 30, lambda: liberados.append("c.df"))
+    assert [c for c, _ in fuera] == ["b"]
+    for _, fs in fuera:
+        for f in fs:
+            f()
+    assert liberados == ["b.df"] and mem.total() == 90
+
+def test_memoria_parte_repetida_reemplaza_y_actual_no_se_desaloja():
+    mem = MemoriaLRU(50)
+    mem.registrar("a", "indice", 30)
+    mem.registrar("a", "indice", 40)
+    assert mem.estado() == [("a", 40)]
+    assert mem.registrar("a", "df", 500) == []       # sólo está el actual
+    fuera = mem.registrar("b", "df", 10)
+    assert [c for c, _ in fuera] == ["a"] and mem.estado() == [("b", 10)]
+
+def test_memoria_olvida_lo_que_la_cache_ya_descarto(monkeypatch):
+    reloj = [0.0]
+    monkeypatch.setattr(calendarios.time, "monotonic", lambda: reloj[0])
+    mem = MemoriaLRU(10**6)
+    mem.registrar("a", "df", 100, ttl=60)
+    mem.registrar("a", "rango:1", 10, cupo=2)
+    mem.registrar("b", "rango:2", 20, cupo=2)
+    mem.registrar("a", "rango:1", 15, cupo=2)          # misma clave de caché: reemplaza
+    assert mem.estado() == [("b", 20), ("a", 115)]
+    mem.registrar("b", "rango:3", 30, cupo=2)          # max_entries: sale rango:2, el más viejo
+    assert mem.estado() == [("a", 115), ("b", 30)]
+    reloj[0] = 61                                      # venció el ttl del df
+    assert mem.total() == 45
@@ -0,0 +1,52 @@
+import cola
+from almacen import SQLiteLocal
+from cola import combinar
+
+
+def alta(eid, **k):
+    return ("agregar", {"ev": {"ID": eid, "Titulo": "t", **k}})
+
+def edicion(eid, anterior, **nuevo):
+    return ("actualizar", {"anterior": {"ID": eid, **anterior}, "nuevo": {"ID": eid, **anterior, **nuevo}})
+
+def baja(eid, **anterior):
+    return ("eliminar", {"anterior": {"ID": eid, **anterior}})
+
+
+def test_alta_mas_edicion_es_una_alta():
+    altas, cambios, bajas = combinar([alta("a"), edicion("a", {"Titulo": "t"}, Titulo="u")])
+    assert altas == [{"ID": "a", "Titulo": "u"}] and cambios == [] and bajas == []
+
+def test_alta_mas_baja_es_nada():
+    assert combinar([alta("a"), baja("a")]) == ([], [], [])
+
+def test_ediciones_sucesivas_se_combinan_por_campo():
+    ant = {"Titulo": "t", "Notas": "n", "Rev": "1"}
+    _, cambios, _ = combinar([edicion("a", ant, Titulo="t2"),
+                              edicion("a", ant, Notas="n2")])     # el segundo form no pisa Titulo
+    assert cambios == [({"ID": "a", **ant}, {"Titulo": "t2", "Notas": "n2"})]
+
+def test_edicion_mas_baja_usa_la_version_leida():
+    ant = {"Titulo": "t", "Rev": "4"}
+    _, cambios, bajas = combinar([edicion("a", ant, Titulo="u"), baja("a", Rev="5")])
+    assert cambios == [] and bajas == [("a", {"ID": "a", **ant})]
+
+
+# ---------- CONFLICTOS EN EL SPOOL ----------
+def test_conflictos_se_guardan_en_el_spool(tmp_path, monkeypatch):
+    monkeypatch.setattr(cola, "RUTA", str(tmp_path / "cola.sqlite"))
+    alm = SQLiteLocal(tmp_path / "cal.db")
+    alm.aplicar_lote([{"ID": "a", "Fecha": "2026-03-04", "Titulo": "t"}], [], [])
+    head, rows = alm.eventos()
+    leida = dict(zip(head, rows[0]))
+    q = cola.ColaEscritura(alm, intervalo=0)
+    q.actualizar(leida, {**leida, "Titulo": "mio"}, sesion="s1")
+    alm.actualizar(leida, {**leida, "Titulo": "ajeno"})           # otra sesión gana
+    q.vaciar()
+    otro = cola.ColaEscritura(alm, intervalo=0)                   # p. ej. otro proceso
+    with q._lock:                                                 # un envío en curso no bloquea
+        assert otro.conflictos_de("s2") == []
+        [c] = otro.conflictos_de("s1")
+    assert c.eid == "a" and c.campos == ["Titulo"] and c.actual["Titulo"] == "ajeno"
+    assert c.anterior["Titulo"] == "t" and c.nuevo == {"Titulo": "mio"}
+    assert q.conflictos_de("s1") == []
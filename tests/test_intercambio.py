@@ -0,0 +1,72 @@
+import io
+import pandas as pd
+import pytest
+import nucleo, intercambio
+from nucleo import COLUMNS
+
+CFG, ALIAS = {"Instagram": 2, "Blog": 1}, {"Instagram": ["IG"]}
+
+FILAS = [
+    ["2026-03-04", "Lanzamiento, parte 1", "Día; del libro", "Instagram", "Diseño",
+     "línea 1\nlínea 2 con acentos ñ y un texto largo que obliga a plegar la línea del ICS", "a1", "1", "", ""],
+    ["2026-03-09", "Serie", "", "Blog", "Planeación", "", "s1", "1", "",
+     "FREQ=WEEKLY;BYDAY=MO;EXDATE=20260316"],
+    ["2025-12-31", "Fuera de rango", "", "Blog", "Publicado", "", "x1", "1", "", ""],
+]
+
+
+def leer(archivo, nombre):
+    return pd.concat(list(intercambio.leer_lotes(archivo, nombre)), ignore_index=True)
+
+@pytest.mark.parametrize("formato", ["csv", "ics"])
+def test_exportar_e_importar_ida_y_vuelta(formato):
+    f = intercambio.exportar(COLUMNS, FILAS, "2026-01-01", "2027-01-01", formato)
+    df = leer(f, f"x.{formato}")
+    assert df["ID"].tolist() == ["a1", "s1"]
+    for original, leido in zip(FILAS, df[COLUMNS].to_numpy().tolist()):
+        for c in ("Fecha", "Titulo", "Festividad", "Plataforma", "Estado", "Notas", "Repetir"):
+            assert leido[COLUMNS.index(c)] == original[COLUMNS.index(c)], c
+
+def test_ics_lineas_plegadas_a_75_bytes():
+    f = intercambio.exportar(COLUMNS, FILAS, "2026-01-01", "2027-01-01", "ics")
+    assert all(len(l) <= 75 for l in f.read().split(b"\r\n"))
+
+def test_exportar_rango_vacio_deja_encabezado():
+    f = intercambio.exportar(COLUMNS, FILAS, "2020-01-01", "2021-01-01", "csv")
+    assert f.read().decode("utf-8-sig").strip() == ",".join(COLUMNS)
+
+def test_exportar_incluye_series_empezadas_antes():
+    filas = FILAS + [["2025-01-01", "Vencida", "", "Blog", "", "", "s2", "1", "", "FREQ=DAILY;COUNT=3"],
+                     ["2025-01-01", "Rota", "", "Blog", "", "", "s3", "1", "", "FREQ=NUNCA"]]
+    lotes = intercambio.lotes_rango(COLUMNS, filas, "2030-01-01", "2031-01-01", tam=2)
+    assert [r for l in lotes for r in l["ID"]] == ["s1"]
+    f = intercambio.exportar(COLUMNS, filas, "2030-01-01", "2031-01-01", "ics")
+    assert b"RRULE:FREQ=WEEKLY" in f.read()
+
+def test_csv_con_punto_y_coma_y_sinonimos():
+    f = io.BytesIO("Fecha de publicación;Título;Red social;Extra\n04/03/2026;Hola;IG;x\n".encode())
+    df = leer(f, "x.csv")
+    assert df.loc[0, ["Fecha", "Titulo", "Plataforma"]].tolist() == ["04/03/2026", "Hola", "IG"]
+
+def test_formato_no_soportado():
+    with pytest.raises(ValueError):
+        intercambio.leer_lotes(io.BytesIO(b""), "x.pdf")
+
+def test_validador_errores_y_duplicados():
+    existentes = nucleo.preparar(COLUMNS, FILAS, CFG, ALIAS)
+    lote = pd.DataFrame([
+        ["2026-03-04", "lanzamiento, PARTE 1", "", "Instagram", "", "", "", "", "", ""],   # ya existe
+        ["2026-05-01", "Nuevo", "", "ig", "diseno", "", "", "", "", "freq=daily;count=2"],
+        ["2026-05-01", "Nuevo", "", "Instagram", "", "", "", "", "", ""],                 # repetido en el archivo
+        ["2026-13-01", "Mala", "", "Blog", "", "", "", "", "", ""],
+        ["2026-05-02", "", "", "Blog", "", "", "", "", "", ""],
+        ["2026-05-03", "Estado", "", "Blog", "Hecho", "", "", "", "", ""],
+        ["2026-05-04", "Regla", "", "Blog", "", "", "", "", "", "FREQ=YEARLY"],
+        [""] * len(COLUMNS),
+    ], columns=COLUMNS)
+    validos, dups, errores = intercambio.Validador(existentes, CFG, ALIAS).validar(lote)
+    assert validos[["Titulo", "Plataforma", "Estado", "Repetir"]].to_numpy().tolist() == [
+        ["Nuevo", "Instagram", "Diseño", "FREQ=DAILY;COUNT=2"]]
+    assert len(dups) == 2
+    assert errores[["Fila", "Motivo"]].to_numpy().tolist() == [
+        [5, "fecha no reconocida"], [6, "sin título"], [7, "estado desconocido"], [8, "repetición inválida"]]
@@ -0,0 +1,127 @@
+import datetime
+import pandas as pd
+import pytest
+import nucleo
+from nucleo import COLUMNS
+
+
+def fila(fecha, titulo="t", plataforma="Instagram", estado="Planeación", eid="", repetir=""):
+    return [fecha, titulo, "", plataforma, estado, "", eid or titulo, "1", "", repetir]
+
+def preparar(rows, cfg=None, alias=None):
+    return nucleo.preparar(COLUMNS, rows, cfg or {"Instagram": 2, "Blog": 1}, alias or {})
+
+
+# ---------- FECHAS ----------
+@pytest.mark.parametrize("txt, esperado", [
+    ("2026-03-04", "2026-03-04"),
+    ("2026/3/4", "2026-03-04"),
+    ("2026-03-04 10:30", "2026-03-04"),
+    ("2026-03-04T10:30:00", "2026-03-04"),
+    ("04/03/2026", "2026-03-04"),        # latino: día primero
+    ("4-3-26", "2026-03-04"),
+    ("04.03.2026", "2026-03-04"),
+    ("4/3/2026 10:00", "2026-03-04"),    # fuera de la regex: respaldo día primero
+    ("4 mar 2026", "2026-03-04"),
+])
+def test_parse_fechas_formatos(txt, esperado):
+    fechas, invalidas = nucleo.parse_fechas(pd.Series([txt]))
+    assert fechas[0] == pd.Timestamp(esperado)
+    assert not invalidas[0]
+
+def test_parse_fechas_invalidas_y_vacias():
+    fechas, invalidas = nucleo.parse_fechas(pd.Series(["2026-13-45", "", None, "mañana"]))
+    assert fechas.isna().all()
+    assert invalidas.tolist() == [True, False, False, True]
+
+def test_parse_fechas_serie_vacia():
+    fechas, invalidas = nucleo.parse_fechas(pd.Series([], dtype=object))
+    assert len(fechas) == 0 and len(invalidas) == 0
+
+
+# ---------- PREPARAR / GUARDAR ----------
+def test_preparar_ordena_y_resuelve_red():
+    df = preparar([fila("2026-05-01", "b", "ig"), fila("2026-01-01", "a", "Blog"),
+                   fila("x", "c")], alias={"Instagram": ["IG"]})
+    assert df["Titulo"].tolist() == ["a", "b", "c"]            # NaT al final
+    assert df["Red"].tolist()[:2] == ["Blog", "Instagram"]
+    assert df.attrs["fechas_invalidas"] == [{"ID": "c", "Titulo": "c", "Fecha": "x"}]
+
+def test_version_cambia_con_los_datos():
+    a = preparar([fila("2026-01-01", "a")])
+    b = preparar([fila("2026-01-01", "b")])
+    assert a.attrs["version"] == preparar([fila("2026-01-01", "a")]).attrs["version"]
+    assert a.attrs["version"] != b.attrs["version"]
+
+def test_filas_para_guardar_iso_y_orden():
+    df = preparar([fila("03/02/2026", "b"), fila("2026-01-10", "a")])
+    rows = nucleo.filas_para_guardar(df)
+    assert [r[:2] for r in rows] == [["2026-01-10", "a"], ["2026-02-03", "b"]]
+
+def test_filas_para_guardar_conserva_fechas_no_reconocidas():
+    df = preparar([fila("2026-13-45", "mala"), fila("2026-01-10", "buena")])
+    rows = nucleo.filas_para_guardar(df)
+    assert [r[:2] for r in rows] == [["2026-01-10", "buena"], ["2026-13-45", "mala"]]
+
+def test_conservar_vigentes_respeta_a_otras_sesiones():
+    leido  = preparar([fila("2026-01-01", "a"), fila("2026-01-02", "b"), fila("2026-01-03", "c")])
+    ahora  = preparar([fila("2026-01-01", "a"), fila("2026-01-02", "b2", eid="b"),
+                       fila("2026-01-04", "d")])
+    ahora.loc[ahora["ID"] == "b", "Rev"] = "2"
+    final, rechazados = nucleo.conservar_vigentes(leido, ahora)
+    assert rechazados == ["b", "c"]
+    assert sorted(final["Titulo"]) == ["a", "b2", "d"]         # c se borró en el origen
+
+
+# ---------- ÍNDICE ----------
+@pytest.fixture
+def ix():
+    rows = [fila(f"2026-{m:02d}-{d:02d}", f"e{m}{d}") for m in (1, 2, 12) for d in (1, 15, 28)]
+    rows += [fila("2025-12-31", "viejo"), fila("2027-01-01", "nuevo"), fila("", "sin fecha")]
+    return nucleo.IndiceEventos(preparar(rows))
+
+def test_indice_anio_mes_dia(ix):
+    assert len(ix.anio(2026)) == 9
+    assert ix.anio(2025)["Titulo"].tolist() == ["viejo"]
+    assert len(ix.anio(1999)) == 0
+    assert ix.mes(2026, 2)["Titulo"].tolist() == ["e21", "e215", "e228"]
+    assert ix.dia(datetime.date(2026, 12, 28))["Titulo"].tolist() == ["e1228"]
+    assert ix.rango(datetime.date(2026, 12, 28), datetime.date(2027, 1, 2))["Titulo"].tolist() == ["e1228", "nuevo"]
+
+def test_indice_fila_por_id(ix):
+    assert ix.fila("e115")["Fecha"] == pd.Timestamp("2026-01-15")
+
+def test_filtrar(ix):
+    df = nucleo.filtrar(ix, datetime.date(2026, 1, 1), datetime.date(2027, 1, 1), texto="E2")
+    assert df["Titulo"].tolist() == ["e21", "e215", "e228"]
+    assert len(nucleo.filtrar(ix, datetime.date(2026, 1, 1), datetime.date(2027, 1, 1),
+                              estados=("Publicado",))) == 0
+
+
+# ---------- ESTADO SEMANAL / KPIs ----------
+def test_matriz_pendientes_semanas():
+    # Marzo 2026 empieza en domingo: el 1 es la semana 1 y el 2 (lunes) la 2
+    df = preparar([fila("2026-03-01", "a"), fila("2026-03-02", "b"), fila("2026-03-02", "c", "Blog"),
+                   fila("2026-03-03", "p", estado="Publicado"), fila("2026-03-03", "x", "Otra")])
+    cal = nucleo.matriz_pendientes(df, ["Blog", "Instagram"], "calendario")
+    assert cal.loc[(3, 1)].tolist() == [0, 1]
+    assert cal.loc[(3, 2)].tolist() == [1, 1]
+    assert cal.to_numpy().sum() == 3                          # ni publicados ni redes fuera de config
+    mensual = nucleo.matriz_pendientes(df, ["Blog", "Instagram"], "mensual")
+    assert mensual.loc[(3, 1)].tolist() == [1, 2]
+
+def test_kpis_conteos_igual_que_kpis_anio():
+    rows = [fila("2026-01-05", "a"), fila("2026-02-05", "b", "IG", "Publicado"),
+            fila("2026-03-05", "c", "Blog", "Diseño"), fila("2025-03-05", "d"),
+            fila("2026-04-01", "s", repetir="FREQ=WEEKLY")]
+    cfg, alias = {"Instagram": 2, "Blog": 1}, {"Instagram": ["IG"]}
+    df = preparar(rows, cfg, alias)
+    df_yr = nucleo.IndiceEventos(df).anio(2026)
+    df_yr = df_yr[df_yr["Repetir"] == ""]
+    esperado = nucleo.kpis_anio(df_yr, 2026, cfg)
+    conteos, series = nucleo.conteos_de_filas(COLUMNS, rows, "2026-01-01", "2027-01-01")
+    kpi = nucleo.kpis_conteos(conteos, 2026, cfg, alias)
+    assert [r[1] for r in series] == ["s"]
+    assert kpi["planeado_total"] == esperado["planeado_total"] == 3
+    assert kpi["redes"] == esperado["redes"]
+    assert kpi["vc_estado"].tolist() == esperado["vc_estado"].tolist()
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import pytest
+import nucleo, recurrencia
+from nucleo import COLUMNS
+
+
+def fechas(regla, inicio, desde="2026-01-01", hasta="2027-01-01"):
+    return [str(f) for f in recurrencia.ocurrencias(regla, inicio, desde, hasta)]
+
+
+# ---------- REGLAS ----------
+def test_leer_y_escribir_canonico():
+    r = recurrencia.leer("freq=weekly;byday=th,MO;interval=2;wkst=SU;exdate=20260310,20260302")
+    assert r["FREQ"] == "WEEKLY" and r["BYDAY"] == [0, 3] and r["INTERVAL"] == 2
+    assert recurrencia.escribir(r) == "FREQ=WEEKLY;INTERVAL=2;BYDAY=MO,TH;EXDATE=20260302,20260310"
+
+@pytest.mark.parametrize("regla", ["", "FREQ=YEARLY", "FREQ=DAILY;COUNT=0", "FREQ=DAILY;BYDAY=XX",
+                                   "FREQ=DAILY;UNTIL=20261340", "FREQ=DAILY;FOO=1",
+                                   "FREQ=MONTHLY;BYDAY=1MO", "FREQ=MONTHLY;BYDAY=-1FR"])
+def test_leer_rechaza(regla):
+    with pytest.raises(ValueError):
+        recurrencia.leer(regla)
+
+def test_regla_y_excepcion():
+    r = recurrencia.regla("WEEKLY", 1, [3, 0], hasta=np.datetime64("2026-06-30"))
+    assert r == "FREQ=WEEKLY;BYDAY=MO,TH;UNTIL=20260630"
+    assert recurrencia.con_excepcion(r, "2026-03-02").endswith(";EXDATE=20260302")
+    assert recurrencia.regla("DAILY", 3, [1], veces=4) == "FREQ=DAILY;INTERVAL=3;COUNT=4"
+
+
+# ---------- OCURRENCIAS ----------
+def test_semanal_con_dias_e_intervalo():
+    assert fechas("FREQ=WEEKLY;INTERVAL=2;BYDAY=MO,TH", "2026-01-05", hasta="2026-02-01") == \
+        ["2026-01-05", "2026-01-08", "2026-01-19", "2026-01-22"]
+
+def test_semanal_sin_dias_usa_el_del_inicio():
+    assert fechas("FREQ=WEEKLY", "2026-01-07", hasta="2026-01-22") == ["2026-01-07", "2026-01-14", "2026-01-21"]
+
+def test_until_inclusivo_y_ventana():
+    assert fechas("FREQ=DAILY;UNTIL=20260105", "2026-01-01", desde="2026-01-03") == \
+        ["2026-01-03", "2026-01-04", "2026-01-05"]
+
+def test_count_cuenta_desde_el_inicio_antes_de_exdate():
+    r = "FREQ=DAILY;COUNT=4;EXDATE=20251231"
+    assert fechas(r, "2025-12-30") == ["2026-01-01", "2026-01-02"]
+
+def test_mensual_salta_meses_sin_el_dia():
+    assert fechas("FREQ=MONTHLY", "2026-01-31", hasta="2026-06-01") == \
+        ["2026-01-31", "2026-03-31", "2026-05-31"]
+    assert fechas("FREQ=MONTHLY;BYMONTHDAY=15;INTERVAL=5", "2026-01-01") == ["2026-01-15", "2026-06-15", "2026-11-15"]
+
+def test_serie_que_empieza_despues_de_la_ventana():
+    assert fechas("FREQ=DAILY", "2027-03-01") == []
+
+
+# ---------- EXPANSIÓN ----------
+def _df(rows):
+    return nucleo.preparar(COLUMNS, rows, {"Blog": 1}, {})
+
+def _fila(fecha, titulo, eid, repetir=""):
+    return [fecha, titulo, "", "Blog", "Planeación", "", eid, "1", "", repetir]
+
+def test_expandir_con_reemplazos_y_excepciones():
+    df = _df([_fila("2026-03-02", "serie", "S", "FREQ=WEEKLY;COUNT=4;EXDATE=20260309"),
+              _fila("2026-03-18", "movida", "R", "S@20260316"),
+              _fila("2026-03-05", "suelto", "X")])
+    ix  = nucleo.IndiceEventos(df)
+    out = recurrencia.expandir(ix.anio(2026), ix.series, "2026-01-01", "2027-01-01")
+    assert list(zip(out["ID"], out["Fecha"].dt.strftime("%m-%d"))) == [
+        ("S@20260302", "03-02"), ("X", "03-05"), ("R", "03-18"), ("S@20260323", "03-23")]
+    assert (out["Repetir"].str.startswith("FREQ=") == False).all()
+
+def test_expandir_regla_rota_cuenta_como_evento_suelto():
+    df = _df([_fila("2026-04-01", "rota", "B", "FREQ=YEARLY")])
+    ix = nucleo.IndiceEventos(df)
+    out = recurrencia.expandir(ix.anio(2026), ix.series, "2026-01-01", "2027-01-01")
+    assert out["ID"].tolist() == ["B@20260401"]
+
+def test_expandir_sin_series_devuelve_la_ventana():
+    df = _df([_fila("2026-04-01", "a", "A"), _fila("2025-04-01", "b", "B")])
+    ix = nucleo.IndiceEventos(df)
+    out = recurrencia.expandir(df, ix.series, "2026-01-01", "2027-01-01")
+    assert out["ID"].tolist() == ["A"]